@@ -0,0 +1,97 @@
+import time
+
+from cdp_client import DEFAULT_TIMEOUT, FILL_STRATEGIES, FILL_STRATEGY, CDPTimeoutError
+
+# Step kinds run_script understands
+SCRIPT_ACTIONS = ("click", "fill", "select", "wait", "get_text")
+
+
+def validate_script(actions):
+    """
+    Rejects a malformed script before any step runs, so it never stops halfway
+    on a typo.
+    """
+    if not isinstance(actions, list) or not actions:
+        raise ValueError("actions must be a non-empty list of steps")
+    for n, step in enumerate(actions, 1):
+        action = step.get("action") if isinstance(step, dict) else None
+        if action not in SCRIPT_ACTIONS:
+            raise ValueError(f"Step {n}: action must be one of {', '.join(SCRIPT_ACTIONS)}")
+        if action in ("click", "fill", "select", "get_text") and not step.get("xpath"):
+            raise ValueError(f"Step {n} ({action}): xpath is required")
+        if action == "fill" and "value" not in step:
+            raise ValueError(f"Step {n} (fill): value is required")
+        if action == "fill" and step.get("strategy", FILL_STRATEGY) not in FILL_STRATEGIES:
+            raise ValueError(f"Step {n} (fill): strategy must be one of {', '.join(FILL_STRATEGIES)}")
+        if action == "select" and all(step.get(k) is None for k in ("value", "label", "index")):
+            raise ValueError(f"Step {n} (select): one of value, label or index is required")
+        if action == "wait" and not (step.get("xpath") or step.get("text")):
+            raise ValueError(f"Step {n} (wait): xpath or text is required")
+
+
+def _run_step(cdp, step, timeout_ms):
+    action, xpath = step["action"], step.get("xpath")
+    if action == "click":
+        cdp.click(xpath, timeout_ms=timeout_ms)
+    elif action == "fill":
+        cdp.fill(xpath, str(step["value"]), timeout_ms=timeout_ms, strategy=step.get("strategy", FILL_STRATEGY))
+    elif action == "select":
+        cdp.select_option(xpath, value=step.get("value"), label=step.get("label"), index=step.get("index"))
+    elif action == "wait":
+        if xpath:
+            cdp.wait_for_visible_element(xpath, timeout_ms=timeout_ms)
+        else:
+            cdp.wait_for_text(step["text"], timeout_ms=timeout_ms)
+    elif action == "get_text":
+        return cdp.get_text(xpath)
+    return None
+
+
+def run_script(cdp, actions, stop_on_error=True, default_timeout_ms=DEFAULT_TIMEOUT):
+    """
+    Runs an ordered list of steps back to back on one ChromeCDP and returns a
+    result dict per step, in order:
+
+        {"action": "fill", "xpath": "//input[@name='user']", "value": "bob"}
+        {"action": "click", "xpath": "e12", "timeout_ms": 5000}
+        {"action": "select", "xpath": "//select", "label": "Germany"}   # or value / index
+        {"action": "wait", "text": "Welcome"}                           # or xpath (visible)
+        {"action": "get_text", "xpath": "//h1"}
+
+    Every step runs under its own budget (timeout_ms, else default_timeout_ms).
+    The page readiness check is shared: it runs in full before the first
+    step (even if the page passed it earlier) and again only after a step
+    navigated. With stop_on_error the steps
+    after a failed one are reported as SKIPPED.
+
+        {"step": 1, "action": "fill", "status": "OK", "elapsed_ms": 41}
+        {"step": 3, "action": "get_text", "status": "OK", "result": "Hi", "elapsed_ms": 12}
+        {"step": 2, "action": "click", "status": "ERROR", "error": "...", "elapsed_ms": 5000}
+    """
+    validate_script(actions)
+    results = []
+    failed = False
+    with cdp.shared_readiness():
+        for n, step in enumerate(actions, 1):
+            outcome = {"step": n, "action": step["action"]}
+            if failed and stop_on_error:
+                outcome["status"] = "SKIPPED"
+                results.append(outcome)
+                continue
+
+            timeout_ms = step.get("timeout_ms") or default_timeout_ms
+            start = time.monotonic()
+            try:
+                with cdp.budget(timeout_ms, f"step {n} ({step['action']})"):
+                    value = _run_step(cdp, step, timeout_ms)
+                outcome["status"] = "OK"
+                if step["action"] == "get_text":
+                    outcome["result"] = value
+            except Exception as e:
+                failed = True
+                outcome.update(status="ERROR", error=str(e))
+                if isinstance(e, CDPTimeoutError):
+                    outcome["timeout"] = e.to_dict()
+            outcome["elapsed_ms"] = int((time.monotonic() - start) * 1000)
+            results.append(outcome)
+    return results
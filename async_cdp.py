@@ -0,0 +1,66 @@
+import asyncio
+import functools
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from cdp_client import ChromeCDP
+
+# Max number of ChromeCDP calls running at the same time (one worker thread each)
+CDP_WORKER_THREADS = int(os.getenv("CDP_WORKER_THREADS", "32"))
+
+
+_shared_executor = None
+_shared_lock = threading.Lock()
+
+
+def shared_executor():
+    """
+    Worker pool shared by every AsyncChromeCDP that was not given its own executor.
+    """
+    global _shared_executor
+    with _shared_lock:
+        if _shared_executor is None:
+            _shared_executor = ThreadPoolExecutor(max_workers=CDP_WORKER_THREADS, thread_name_prefix="cdp-call")
+        return _shared_executor
+
+
+class AsyncChromeCDP:
+    """
+    Asyncio facade over ChromeCDP.
+
+    Every method call runs on a worker thread, so slow page waits never block the
+    event loop. If the awaiting task is cancelled, the ChromeCDP call is aborted at
+    its next CDP wait or sleep (see ChromeCDP.run_cancellable).
+
+        cdp = AsyncChromeCDP()
+        await cdp.click("//button[@id='save']")
+    """
+
+    def __init__(self, cdp: ChromeCDP = None, executor: ThreadPoolExecutor = None):
+        self.cdp = cdp or ChromeCDP()
+        self._executor = executor or shared_executor()
+
+    async def run(self, fn, *args, **kwargs):
+        """
+        Runs a blocking callable off-loop with cancellation support.
+        """
+        cancel_event = threading.Event()
+        loop = asyncio.get_running_loop()
+        call = functools.partial(self.cdp.run_cancellable, cancel_event, fn, *args, **kwargs)
+        try:
+            return await loop.run_in_executor(self._executor, call)
+        except asyncio.CancelledError:
+            cancel_event.set()
+            raise
+
+    def __getattr__(self, name):
+        attr = getattr(self.cdp, name)
+        if not callable(attr):
+            return attr
+
+        @functools.wraps(attr)
+        async def call(*args, **kwargs):
+            return await self.run(attr, *args, **kwargs)
+
+        return call
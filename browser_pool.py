@@ -0,0 +1,135 @@
+import os
+import threading
+import time
+
+from cdp_client import ChromeCDP, VIEWPORT_WIDTH, VIEWPORT_HEIGHT
+
+# Number of pre-created, ready-to-use browser contexts (0 disables the pool)
+BROWSER_POOL_SIZE = int(os.getenv("BROWSER_POOL_SIZE", "2"))
+
+
+class PooledContext:
+    def __init__(self, cdp, context_id, target_id, ready_ms):
+        self.cdp = cdp
+        self.context_id = context_id
+        self.target_id = target_id
+        self.ready_ms = ready_ms # Time it took to create, attach and configure
+
+
+class BrowserPool:
+    """
+    Keeps `size` browser contexts ready inside one running Chrome: target created,
+    websocket attached, domains enabled and viewport forced.
+
+    take() hands one out immediately (a hit) or returns None (a miss, the caller
+    creates one cold with create()). A background thread refills the pool.
+    """
+
+    def __init__(self, browser: ChromeCDP, port, size=BROWSER_POOL_SIZE):
+        self.browser = browser # Browser-level connection used for Target.* commands
+        self.port = port
+        self.size = size
+        self._ready = []
+        self._lock = threading.Lock()
+        self._wakeup = threading.Event()
+        self._stop = threading.Event()
+        self._thread = None
+        self.hits = 0
+        self.misses = 0
+        self._ready_times = []
+
+    def start(self):
+        if self.size <= 0 or self._thread:
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._refill_loop, name="browser-pool", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        self._wakeup.set()
+        if self._thread:
+            self._thread.join(timeout=5)
+        self._thread = None
+        with self._lock:
+            ready, self._ready = self._ready, []
+        for entry in ready:
+            self.dispose(entry.cdp, entry.context_id)
+
+    def take(self):
+        with self._lock:
+            entry = self._ready.pop(0) if self._ready else None
+            if entry:
+                self.hits += 1
+            else:
+                self.misses += 1
+        self._wakeup.set()
+        return entry
+
+    def create(self):
+        """
+        Creates a fresh context + page target and returns it fully configured.
+        """
+        start = time.monotonic()
+        context_id = self.browser.execute("Target.createBrowserContext", {"disposeOnDetach": False})["browserContextId"]
+        try:
+            target_id = self.browser.execute("Target.createTarget", {
+                "url": "about:blank",
+                "browserContextId": context_id,
+                "width": VIEWPORT_WIDTH,
+                "height": VIEWPORT_HEIGHT,
+            })["targetId"]
+            cdp = ChromeCDP(port=self.port)
+            cdp.attach(target_id, browser_context_id=context_id)
+        except Exception:
+            self.dispose(None, context_id)
+            raise
+        ready_ms = (time.monotonic() - start) * 1000
+        with self._lock:
+            self._ready_times = (self._ready_times + [ready_ms])[-50:]
+        return PooledContext(cdp, context_id, target_id, ready_ms)
+
+    def dispose(self, cdp, context_id):
+        if cdp:
+            try:
+                cdp.close()
+            except Exception:
+                pass
+        try:
+            self.browser.execute("Target.disposeBrowserContext", {"browserContextId": context_id}, timeout=5)
+        except Exception as e:
+            print(f"Warning: Could not dispose browser context {context_id}: {e}")
+
+    def stats(self):
+        with self._lock:
+            times = list(self._ready_times)
+            total = self.hits + self.misses
+            return {
+                "size": self.size,
+                "ready": len(self._ready),
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": round(self.hits / total, 3) if total else None,
+                "avg_time_to_ready_ms": round(sum(times) / len(times), 1) if times else None,
+                "last_time_to_ready_ms": round(times[-1], 1) if times else None,
+            }
+
+    def _refill_loop(self):
+        while not self._stop.is_set():
+            with self._lock:
+                missing = self.size - len(self._ready)
+            if missing <= 0:
+                self._wakeup.wait()
+                self._wakeup.clear()
+                continue
+            try:
+                entry = self.create()
+            except Exception as e:
+                print(f"Browser pool refill failed: {e}")
+                self._stop.wait(1.0)
+                continue
+            if self._stop.is_set():
+                self.dispose(entry.cdp, entry.context_id)
+                return
+            with self._lock:
+                self._ready.append(entry)
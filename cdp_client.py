@@ -16,8 +16,19 @@ import shutil
 import glob
 from pathlib import Path
 import re
+import collections
+import contextlib
+import functools
+import inspect
+from concurrent.futures import Future, TimeoutError as FutureTimeoutError
 
 from tracemanager import TraceManager
+from network_tracker import NetworkTracker
+from page_readiness import PageReadiness, DIRTY_BINDING
+from locator_cache import LocatorCache, REF_PATTERN
+from object_handles import HandleTracker, HANDLE_METHODS, LOCATOR_GROUP
+from dom_snapshot import DomSnapshot
+from page_runtime import PAGE_RUNTIME_JS, PAGE_RUNTIME_VERSION, RUNTIME_MISSING
 
 # Load environment variables from the .env file (if present)
 load_dotenv(override=True)
@@ -69,12 +80,44 @@ APP_CLOSE_TIMEOUT = int(os.getenv("APP_CLOSE_TIMEOUT", "2000"))
 NETWORK_IDLE_MS = int(os.getenv("NETWORK_IDLE_DURATION", "500"))
 DOM_IDLE_MS = int(os.getenv("DOM_STABLE_DURATION", "500"))
 
+# Budgets (ms): a public call without its own timeout_ms gets ACTION_TIMEOUT; a single
+# CDP command outside any budget waits at most CDP_COMMAND_TIMEOUT
+ACTION_TIMEOUT = int(os.getenv("ACTION_TIMEOUT", "30000"))
+CDP_COMMAND_TIMEOUT = int(os.getenv("CDP_COMMAND_TIMEOUT", "30000"))
+
+# Element discovery: "catalog" (in-page catalog kept current by a MutationObserver),
+# "snapshot" (one DOMSnapshot.captureSnapshot, filtered in Python)
+# or "runtime" (in-page scan with per-element style/layout reads).
+# Not used by rank_elements (find_element): ranking always runs over the catalog
+DISCOVERY_BACKEND = os.getenv("DISCOVERY_BACKEND", "catalog")
+# Catalog query results remembered per tab, reused while the catalog version is unchanged
+DISCOVERY_CACHE_SIZE = int(os.getenv("DISCOVERY_CACHE_SIZE", "32"))
+# find_element: candidates ranked in the page, best FIND_TOP_K returned;
+# the best one is taken outright when it leads the next by FIND_CONFIDENT_MARGIN points
+FIND_TOP_K = int(os.getenv("FIND_TOP_K", "10"))
+FIND_CONFIDENT_MARGIN = float(os.getenv("FIND_CONFIDENT_MARGIN", "25"))
+# Discovery results tied to their nodes (backendNodeId + cached handle) per call
+DISCOVERY_MAP_LIMIT = int(os.getenv("DISCOVERY_MAP_LIMIT", "50"))
+
+# How long switch_to_tab waits for a matching tab (e.g. a popup that is still opening)
+NEW_TAB_TIMEOUT = int(os.getenv("NEW_TAB_TIMEOUT", "2500"))
+
 # Delays (Seconds - converted from ms)
 HUMAN_DELAY = int(os.getenv("HUMAN_KEY_DELAY", "100")) / 1000.0
 AUTO_DELAY = int(os.getenv("AUTOCOMPLETE_TYPE_DELAY", "100")) / 1000.0
 UI_DELAY = int(os.getenv("UI_ANIMATION_DELAY", "500")) / 1000.0
 STEP_DELAY = int(os.getenv("ACTION_STEP_DELAY", "200")) / 1000.0
 
+# Text entry for fill(): auto | insert (Input.insertText) | ime (composition) | keys (per-key events)
+FILL_STRATEGIES = ("auto", "insert", "ime", "keys")
+FILL_STRATEGY = os.getenv("FILL_STRATEGY", "auto")
+# Values up to this length may be typed key by key when the field needs it; longer ones never are
+FILL_KEYS_MAX_LENGTH = int(os.getenv("FILL_KEYS_MAX_LENGTH", "64"))
+# Inputs that only accept typed keystrokes (insertText is ignored by their segmented editors)
+KEYED_INPUT_TYPES = ("date", "time", "datetime-local", "month", "week")
+# Inputs whose value the browser sanitizes (trims, lowercases, empties if invalid): fill() can't verify them
+SANITIZED_INPUT_TYPES = ("email", "url", "number", "range", "color") + KEYED_INPUT_TYPES
+
 # Viewport
 VIEWPORT_WIDTH = int(os.getenv("VIEWPORT_WIDTH", "1920"))
 VIEWPORT_HEIGHT = int(os.getenv("VIEWPORT_HEIGHT", "1080"))
@@ -103,17 +146,453 @@ KEY_MAP = {
     "PageDown": ("PageDown", "PageDown"),
 }
 
+# Calls window.__mcp.<fn>(this, ...args) on a remote object (constant, so Chrome compiles it once)
+RUNTIME_CALL_ON = "function(fn, ...args) { return window.__mcp[fn](this, ...args); }"
+
+# Calls window.__mcp.<fn>(...args) in an execution context. Arguments travel as
+# CDP values, never as source, so this one declaration serves every locator.
+RUNTIME_CALL = (
+    "function(fn, ...args) { return window.__mcp && __mcp.version === %d ? __mcp[fn](...args) : %s; }"
+    % (PAGE_RUNTIME_VERSION, json.dumps(RUNTIME_MISSING))
+)
+
+# Responses nobody waits for (fire-and-forget _send calls) are kept around for a
+# late _recv, but only up to this many before the oldest are dropped.
+MAX_UNCLAIMED_RESPONSES = 512
+
+
+class OperationCancelled(BaseException):
+    """
+    Raised inside a ChromeCDP call when the caller cancelled it (see run_cancellable).
+    Derives from BaseException, like asyncio.CancelledError, so the retry loops'
+    `except Exception` handlers do not swallow it.
+    """
+
+
+class CDPTimeoutError(TimeoutError):
+    """
+    A call ran out of its time budget. Still a TimeoutError, so existing
+    handlers keep working; to_dict() gives tools a structured error payload.
+    """
+
+    def __init__(self, operation, timeout_ms, elapsed_ms, method=None, detail=None):
+        self.operation = operation
+        self.timeout_ms = timeout_ms
+        self.elapsed_ms = elapsed_ms
+        self.method = method
+        self.detail = detail
+        message = f"{operation} exceeded its {timeout_ms}ms budget after {elapsed_ms}ms"
+        if method:
+            message += f" (waiting for {method})"
+        if detail:
+            message += f": {detail}"
+        super().__init__(message)
+
+    def to_dict(self):
+        return {
+            "operation": self.operation,
+            "timeout_ms": self.timeout_ms,
+            "elapsed_ms": self.elapsed_ms,
+            "method": self.method,
+            "detail": self.detail,
+        }
+
+
+class FillMismatchError(RuntimeError):
+    """
+    fill() typed the value but the field holds something else afterwards (a
+    mask, formatter or maxlength rewrote it). to_dict() is the verification.
+    """
+
+    def __init__(self, xpath, expected, actual):
+        self.xpath = xpath
+        self.expected = expected
+        self.actual = actual
+        super().__init__(f"Field {xpath} holds {actual!r} after typing {expected!r}")
+
+    def to_dict(self):
+        return {"xpath": self.xpath, "expected": self.expected, "actual": self.actual}
+
+
+class Deadline:
+    """
+    Absolute time budget for one public call. Nested calls and waits never get
+    more than what is left of it (see ChromeCDP.budget).
+    """
+
+    def __init__(self, timeout_ms, operation):
+        self.timeout_ms = timeout_ms
+        self.operation = operation
+        self.start = time.monotonic()
+        self.expires = self.start + timeout_ms / 1000
+
+    def remaining(self):
+        return max(0.0, self.expires - time.monotonic())
+
+    def expired(self):
+        return time.monotonic() >= self.expires
+
+    def error(self, method=None, detail=None):
+        elapsed_ms = int((time.monotonic() - self.start) * 1000)
+        return CDPTimeoutError(self.operation, self.timeout_ms, elapsed_ms, method, detail)
+
+
+def check_fill_strategy(strategy):
+    if strategy not in FILL_STRATEGIES:
+        raise ValueError(f"Unknown fill strategy {strategy!r}: use one of {', '.join(FILL_STRATEGIES)}")
+    return strategy
+
+
+def fill_value_matches(actual, expected, field=None):
+    """
+    True if a field holding `actual` kept the `expected` text. Line endings and
+    whitespace runs are compared loosely (textareas store \r\n as \n,
+    contenteditable innerText reflows spaces); inputs the browser sanitizes
+    always pass.
+    """
+    if actual is None or (field or {}).get("type") in SANITIZED_INPUT_TYPES:
+        return True
+    normalize = lambda text: " ".join(text.replace("\r\n", "\n").replace("\r", "\n").split())
+    return actual == expected or normalize(actual) == normalize(expected)
+
+
+def budgeted(fn):
+    """
+    Runs a public ChromeCDP method under one Deadline: its own timeout_ms
+    argument if it has one, ACTION_TIMEOUT otherwise. timeout_ms=None leaves
+    the budget to the method, for work whose length depends on its arguments
+    (pages to scrape, characters to type). Remote objects it creates are
+    released when it returns (see ChromeCDP.object_group). Element refs ("e42")
+    given as locator arguments (xpath, *_xpath) become their locator.
+    """
+    signature = inspect.signature(fn)
+    has_timeout = "timeout_ms" in signature.parameters
+    locator_params = [name for name in signature.parameters if name == "xpath" or name.endswith("_xpath")]
+
+    @functools.wraps(fn)
+    def wrapper(self, *args, **kwargs):
+        timeout_ms = ACTION_TIMEOUT
+        if has_timeout or locator_params:
+            bound = signature.bind(self, *args, **kwargs)
+            bound.apply_defaults()
+            timeout_ms = bound.arguments.get("timeout_ms", ACTION_TIMEOUT)
+            for name in locator_params:
+                bound.arguments[name] = self._ref_locator(bound.arguments[name])
+            args, kwargs = bound.args[1:], bound.kwargs
+        budget = self.budget(timeout_ms, fn.__name__) if timeout_ms is not None else contextlib.nullcontext()
+        with budget, self.object_group():
+            return fn(self, *args, **kwargs)
+
+    return wrapper
+
+
+class InputBatch:
+    """
+    One gesture's Input.* events, pipelined: every event is sent immediately and
+    wait() (or leaving the `with` block) awaits all acks together.
+
+    Chrome acks an input event only after the renderer has handled it, so once
+    the batch returns, the page has seen the whole gesture and the next evaluate
+    observes its effects; no sleeps between sub-steps are needed.
+    """
+
+    def __init__(self, cdp):
+        self.cdp = cdp
+        self._sent = [] # (msg_id, method)
+
+    def send(self, method, params):
+        self._sent.append((self.cdp._send(method, params), method))
+        return self
+
+    def mouse(self, type, x, y, button="left", click_count=1):
+        params = {"type": type, "x": x, "y": y}
+        if type == "mouseMoved":
+            params["buttons"] = 0
+        else:
+            params["button"] = button
+            params["clickCount"] = click_count
+        return self.send("Input.dispatchMouseEvent", params)
+
+    def key(self, type, **params):
+        return self.send("Input.dispatchKeyEvent", {"type": type, **params})
+
+    def wait(self, timeout=None):
+        sent, self._sent = self._sent, []
+        errors = []
+        for msg_id, method in sent:
+            response = self.cdp._recv(msg_id, timeout=timeout)
+            if "error" in response:
+                errors.append(f"{method}: {response['error'].get('message')}")
+        if errors:
+            raise RuntimeError(f"Input events failed: {'; '.join(errors)}")
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        if exc_type is None:
+            self.wait()
+
+
+# Domains served by the browser endpoint itself, never by a page session
+BROWSER_DOMAINS = ("Target.", "Browser.")
+
+
+class TargetState:
+    """
+    One attached tab of a flattened browser connection: its sessionId plus the
+    caches fed by that session's events. Switching tabs only changes which
+    TargetState is current.
+    """
+
+    def __init__(self, target_id, session_id=None, info=None):
+        self.target_id = target_id
+        self.session_id = session_id
+        self.info = info or {} # Target.TargetInfo: url, title, openerId, ...
+        self.network = NetworkTracker()
+        self.readiness = PageReadiness(main_frame_id=target_id) # A page target's main frame shares its id
+        self.locators = LocatorCache()
+        self.handles = HandleTracker() # Remote objects we keep alive in this tab
+        self.context_id = None # Main frame's default execution context, once reported
+        self.discovery = collections.OrderedDict() # (helper, arg) -> last catalog reply
+
+    def track_context(self, method, params):
+        """
+        Follows the main frame's default execution context (Runtime.enable
+        replays the existing ones), so __mcp calls can target it by id.
+        """
+        if method == "Runtime.executionContextCreated":
+            context = params.get("context", {})
+            aux = context.get("auxData", {})
+            if aux.get("isDefault") and aux.get("frameId") == self.readiness.main_frame_id:
+                self.context_id = context.get("id")
+        elif method == "Runtime.executionContextDestroyed":
+            self.forget_context(params.get("executionContextId"))
+        elif method == "Runtime.executionContextsCleared":
+            self.context_id = None
+
+    def forget_context(self, context_id):
+        if context_id == self.context_id: # A newer context may already have replaced it
+            self.context_id = None
+
+
 class ChromeCDP:
-    def __init__(self):
+    def __init__(self, port=None):
         self.process = None
         self.ws = None
+        self.port = port or DEBUG_PORT
+        self.http = None
+        self.browser_context_id = None # Set when attached to an isolated browser context
         self._ids = itertools.count(1)
         self._lock = threading.Lock()
-        self._inflight_requests = 0 #rack in-flight requests
+        self._pending = collections.OrderedDict() # msg_id -> Future, resolved by the reader thread
+        self._listeners = collections.defaultdict(list) # CDP event method -> [callback]
+        self._reader = None
+        self._reader_stop = None
+        self._call_ctx = threading.local() # Per-thread call state (cancel token)
+        self._slot_ids = itertools.count(1) # Tokens for elements handed over by __mcp.prepare
+        self._group_ids = itertools.count(1) # Names for per-action object groups
+        self.cdp_stats = {"commands": 0, "round_trips": 0}
+        self._targets = collections.OrderedDict() # sessionId -> TargetState, oldest tab first
+        self._current = TargetState(None) # Tab commands go to; a placeholder until attach()
+        self._targets_changed = threading.Condition() # Guards _targets / _claimed_targets
+        self._claimed_targets = {} # targetId -> "auto" | "manual" (attach requested)
         self.tracer = TraceManager(enabled=TRACE_ENABLED)
         self.input_ready = False # To track if Input domain is enabled
-        self._clean_old_profiles() #Cleanup stale profiles
-        self.user_data_dir = tempfile.mkdtemp(prefix="cdp-profile-", dir=USER_DATA_DIR)#Create a fresh user data dir for this session
+        self.user_data_dir = None # Created on launch; attached clients never own a profile
+
+    # ---------------- Current tab ----------------
+    @property
+    def _active(self):
+        # Tab this thread's commands go to: the one pinned by on_tab(), else the current tab
+        return getattr(self._call_ctx, "target", None) or self._current
+
+    @property
+    def target_id(self):
+        return self._active.target_id
+
+    @property
+    def network(self):
+        return self._active.network # In-flight requests by requestId, fed by the reader thread
+
+    @property
+    def readiness(self):
+        return self._active.readiness # Cached actionability, invalidated by page events
+
+    @property
+    def locators(self):
+        return self._active.locators # XPath -> objectId for the current document
+
+    @property
+    def handles(self):
+        return self._active.handles # Live remote objects by object group
+
+    @contextlib.contextmanager
+    def on_tab(self, target_id):
+        """
+        Pins this thread's commands to one attached tab without changing the
+        current tab, so several threads can drive different tabs over the same
+        connection (see TabGroup).
+        """
+        with self._targets_changed:
+            state = next((s for s in self._targets.values() if s.target_id == target_id), None)
+        if state is None:
+            raise RuntimeError(f"Tab {target_id} is not attached")
+        previous = getattr(self._call_ctx, "target", None)
+        self._call_ctx.target = state
+        try:
+            yield state
+        finally:
+            self._call_ctx.target = previous
+
+    @contextlib.contextmanager
+    def shared_readiness(self):
+        """
+        Lets consecutive actions on this thread share one page readiness check
+        (see action_script.run_script): the first action runs the full check
+        regardless of earlier verifications; once one passed inside this block,
+        later actions skip it despite the DOM mutations earlier steps caused,
+        until the page navigates.
+        """
+        previous = getattr(self._call_ctx, "shared_readiness", None)
+        self._call_ctx.shared_readiness = (self.readiness, self.readiness.checks)
+        try:
+            yield
+        finally:
+            self._call_ctx.shared_readiness = previous
+
+    # ---------------- Cancellation ----------------
+    def run_cancellable(self, cancel_event, fn, *args, **kwargs):
+        """
+        Runs fn(*args, **kwargs) on the current thread. Setting `cancel_event`
+        from another thread makes the call raise OperationCancelled at its next
+        CDP wait or sleep.
+        """
+        previous = getattr(self._call_ctx, "cancel", None)
+        self._call_ctx.cancel = cancel_event
+        try:
+            return fn(*args, **kwargs)
+        finally:
+            self._call_ctx.cancel = previous
+
+    def carry_call_context(self, fn):
+        """
+        Wraps fn so that, on another thread, it still honours this thread's
+        cancel token and deadline (used to fan a call out over worker threads).
+        """
+        cancel = getattr(self._call_ctx, "cancel", None)
+        deadline = getattr(self._call_ctx, "deadline", None)
+
+        @functools.wraps(fn)
+        def call(*args, **kwargs):
+            # May run on the caller's own thread (a single item): put its context back after
+            previous = getattr(self._call_ctx, "cancel", None), getattr(self._call_ctx, "deadline", None)
+            self._call_ctx.cancel, self._call_ctx.deadline = cancel, deadline
+            try:
+                return fn(*args, **kwargs)
+            finally:
+                self._call_ctx.cancel, self._call_ctx.deadline = previous
+
+        return call
+
+    # ---------------- Remote object lifetime ----------------
+    @contextlib.contextmanager
+    def object_group(self):
+        """
+        Puts every remote object created during the outermost action into one
+        object group and releases the group when the action ends, so handles do
+        not pile up in the renderer until the next navigation. Nested actions
+        share the outer group.
+        """
+        group = getattr(self._call_ctx, "object_group", None)
+        if group is not None:
+            yield group
+            return
+        group = f"mcp-call-{next(self._group_ids)}"
+        self._call_ctx.object_group = group
+        self._call_ctx.object_group_used = False
+        try:
+            yield group
+        finally:
+            self._call_ctx.object_group = None
+            if self._call_ctx.object_group_used: # Replies may still be in flight, so not the live count
+                self._release_object_group(group)
+
+    def _release_object_group(self, group):
+        try:
+            # Sent even when the action was cancelled or ran out of budget
+            self._post("Runtime.releaseObjectGroup", {"objectGroup": group})
+        except Exception:
+            pass # Connection gone; the objects went with it
+
+    def _locator_group(self):
+        # Cached handles must outlive the action; uncached ones die with it
+        return LOCATOR_GROUP if self.locators.size > 0 else None
+
+    def live_handles(self):
+        """
+        Remote objects currently kept alive for us, per attached tab.
+        """
+        with self._targets_changed:
+            states = list(self._targets.values()) or [self._current]
+        return {state.target_id: state.handles.stats() for state in states}
+
+    def _check_cancelled(self):
+        token = getattr(self._call_ctx, "cancel", None)
+        if token is not None and token.is_set():
+            raise OperationCancelled("CDP operation cancelled")
+
+    @contextlib.contextmanager
+    def budget(self, timeout_ms, operation):
+        """
+        Gives the current thread's call a deadline of timeout_ms. Nested budgets
+        only ever shrink it: an inner wait asking for more than is left of the
+        outer budget gets what is left.
+        """
+        outer = getattr(self._call_ctx, "deadline", None)
+        deadline = Deadline(timeout_ms, operation)
+        if outer is not None and outer.expires <= deadline.expires:
+            yield outer
+            return
+        self._call_ctx.deadline = deadline
+        try:
+            yield deadline
+        finally:
+            self._call_ctx.deadline = outer
+
+    def _deadline_for(self, timeout_ms):
+        """
+        Monotonic end time for a wait loop: timeout_ms, capped by the call budget.
+        """
+        end = time.monotonic() + timeout_ms / 1000
+        outer = getattr(self._call_ctx, "deadline", None)
+        return end if outer is None else min(end, outer.expires)
+
+    def _timeout_error(self, detail, timeout_ms=None):
+        """
+        Structured timeout for a wait that gave up (bound to the call budget if any).
+        """
+        outer = getattr(self._call_ctx, "deadline", None)
+        if outer is not None and outer.expired():
+            return outer.error(detail=detail)
+        # The wait's own (shorter) timeout ran out first
+        operation = outer.operation if outer is not None else "wait"
+        return CDPTimeoutError(operation, timeout_ms, timeout_ms, detail=detail)
+
+    def _sleep(self, seconds):
+        """
+        time.sleep that wakes up immediately when the current call is cancelled.
+        Never sleeps past the call budget.
+        """
+        outer = getattr(self._call_ctx, "deadline", None)
+        if outer is not None:
+            seconds = min(seconds, outer.remaining())
+        token = getattr(self._call_ctx, "cancel", None)
+        if token is None:
+            time.sleep(seconds)
+            return
+        if token.wait(seconds):
+            raise OperationCancelled("CDP operation cancelled")
 
     def _save_debug_screenshot(self, prefix="error"):
         """
@@ -162,9 +641,27 @@ class ChromeCDP:
         if self.process:
             return
 
+        self.start_browser()
+
+        r = self.http.get(f"http://localhost:{self.port}/json/new", timeout=1)
+        print(f"New Tab Response: {r.status_code}")
+
+        self.attach(r.json()["id"])
+
+    def start_browser(self):
+        """
+        Spawns Chrome with a fresh profile and waits for the CDP endpoint,
+        without connecting to any tab.
+        """
+        if self.process:
+            return
+
+        self._clean_old_profiles() #Cleanup stale profiles
+        self.user_data_dir = tempfile.mkdtemp(prefix="cdp-profile-", dir=USER_DATA_DIR)#Create a fresh user data dir for this session
+
         args = [
             CHROME_PATH,
-            f"--remote-debugging-port={DEBUG_PORT}",
+            f"--remote-debugging-port={self.port}",
             "--remote-debugging-address=127.0.0.1",
             #f"--user-data-dir={USER_DATA_DIR}",
             f"--user-data-dir={self.user_data_dir}",
@@ -206,6 +703,10 @@ class ChromeCDP:
             if os.name == "nt" else 0
         )
 
+        self._init_http()
+        self._wait_for_cdp()
+
+    def _init_http(self):
         self.http = requests.Session()
         self.http.trust_env = False  # Ignore system proxies
         self.http.proxies = {
@@ -213,13 +714,41 @@ class ChromeCDP:
             "https": None
         }
 
-        self._wait_for_cdp()
+    def connect_browser(self):
+        """
+        Connects to the browser-level endpoint (Target.*, Browser.* commands)
+        of an already running Chrome instead of a page.
+        """
+        if not self.http:
+            self._init_http()
+        info = self.http.get(f"http://localhost:{self.port}/json/version", timeout=2).json()
+        ws = websocket.WebSocket()
+        ws.connect(info["webSocketDebuggerUrl"], timeout=5)
+        ws.settimeout(1)
+        self._attach_ws(ws)
+
+    def attach(self, target_id, browser_context_id=None):
+        """
+        Drives an existing page target of an already running Chrome (see SessionManager).
+        Connects once to the browser endpoint and attaches to the page as a
+        flattened session; other pages of the same browser context (popups, new
+        tabs) are discovered and attached as they open, so switch_to_tab never
+        reconnects. The client does not own the browser process; close() only
+        drops the connection.
+        """
+        self.connect_browser()
 
-        r = self.http.get(f"http://localhost:{DEBUG_PORT}/json/new", timeout=1)
-        print(f"New Tab Response: {r.status_code}")
+        info = self.execute("Target.getTargetInfo", {"targetId": target_id})["targetInfo"]
+        self.browser_context_id = browser_context_id or info.get("browserContextId")
 
-        self._connect_ws()
-        self._enable_domains()
+        with self._targets_changed:
+            self._claimed_targets[target_id] = "manual"
+        self.execute("Target.setDiscoverTargets", {"discover": True})
+        session_id = self.execute("Target.attachToTarget", {"targetId": target_id, "flatten": True})["sessionId"]
+
+        self._current = self._register_target(TargetState(target_id, session_id, info))
+        self._enable_domains(self._current)
+        self._send("Page.bringToFront")
         self.force_viewport(VIEWPORT_WIDTH, VIEWPORT_HEIGHT)
 
     def _ensure_input_ready(self):
@@ -230,6 +759,7 @@ class ChromeCDP:
         self.input_ready = True
 
     def close(self):
+        self._detach_ws()
         if not self.process:
             return
         try:
@@ -247,6 +777,8 @@ class ChromeCDP:
         
         self.process = None
         
+        if not self.user_data_dir:
+            return
         # Wait a little for file locks to release
         time.sleep(UI_DELAY)
         try:
@@ -264,104 +796,412 @@ class ChromeCDP:
                 raise RuntimeError("Chrome process exited unexpectedly")
 
             try:
-                r = self.http.get(f"http://localhost:{DEBUG_PORT}/json/version", timeout=0.5)
+                r = self.http.get(f"http://localhost:{self.port}/json/version", timeout=0.5)
                 print(f"CDP Version Check Status Code: {r.status_code}")
                 if r.status_code == 200:
                     return
             except Exception as e:
                 #pass
                 last_error = e
-            time.sleep(STEP_DELAY)
+            self._sleep(STEP_DELAY)
         raise RuntimeError("CDP endpoint not available")
 
-    def _connect_ws(self, attempts=5, delay=0.2):
-        last_error = None
-        for i in range(attempts):
+    # ---------------- WebSocket reader ----------------
+    def _attach_ws(self, ws):
+        """
+        Makes `ws` the active connection and starts a reader thread that owns it.
+        Any previous connection (and its reader) is shut down first.
+        """
+        self._detach_ws()
+        self.ws = ws
+        self._reader_stop = threading.Event()
+        self._reader = threading.Thread(
+            target=self._reader_loop,
+            args=(ws, self._reader_stop),
+            name="cdp-reader",
+            daemon=True
+        )
+        self._reader.start()
+
+    def _detach_ws(self):
+        if self._reader_stop:
+            self._reader_stop.set()
+        if self.ws:
             try:
-                # 1. Get list of targets
-                resp = self.http.get(f"http://localhost:{DEBUG_PORT}/json", timeout=2)
-                targets = resp.json() if resp.ok else []
-                
-                # 2. Filter for valid pages
-                pages = [t for t in targets if isinstance(t, dict) and t.get("type") == "page"]
-                
-                if pages and pages[0].get("webSocketDebuggerUrl"):
-                    ws_url = pages[0]["webSocketDebuggerUrl"]
-                    
-                    # 3. Try to connect (Wrapped in Try/Except)
-                    self.ws = websocket.WebSocket()
-                    try:
-                        self.ws.connect(ws_url, timeout=5)
-                        self.ws.settimeout(1)
-                        print(f"Connected to target: {pages[0]['id']}")
-                        return
-                    except Exception as e:
-                        # If target vanished (500 Error), ignore and retry loop
-                        print(f"Target {pages[0]['id']} vanished, retrying... ({e})")
-                        last_error = e
-                        self.ws = None
-                        time.sleep(delay)
-                        continue
+                self.ws.close()
+            except Exception:
+                pass
+        if self._reader and self._reader is not threading.current_thread():
+            self._reader.join(timeout=2)
+        self.ws = None
+        self._reader = None
+        self._reader_stop = None
+        self._fail_pending(RuntimeError("WebSocket connection closed"))
 
+    def _reader_loop(self, ws, stop):
+        """
+        Runs on the reader thread. Decodes every frame exactly once, resolves the
+        future waiting on its id, and hands events to _dispatch_event.
+        """
+        while not stop.is_set():
+            try:
+                raw = ws.recv()
+            except websocket.WebSocketTimeoutException:
+                continue
             except Exception as e:
-                last_error = e
-            
-            time.sleep(delay)
-            
-        raise RuntimeError(f"Could not connect to Chrome WS after {attempts} attempts. Last error: {last_error}")
+                if not stop.is_set():
+                    self._fail_pending(RuntimeError(f"WebSocket receive failed: {e}"))
+                return
+            try:
+                msg = json.loads(raw)
+            except Exception:
+                continue
 
-    def _send(self, method, params=None):
+            if "id" in msg:
+                with self._lock:
+                    fut = self._pending.get(msg["id"])
+                if fut and getattr(fut, "handle_owner", None) is not None:
+                    fut.handle_owner.add_from_reply(fut.cdp_method, fut.handle_group, msg)
+                if fut and not fut.done():
+                    fut.set_result(msg)
+                self._prune_pending()
+            elif "method" in msg:
+                self._dispatch_event(msg)
+
+    def _prune_pending(self):
+        # Drop the oldest responses that were never claimed by _recv
         with self._lock:
-            msg_id = next(self._ids)
-            payload = {"id": msg_id, "method": method, "params": params or {}}
-            self.ws.send(json.dumps(payload))
-            return msg_id
+            if len(self._pending) <= MAX_UNCLAIMED_RESPONSES:
+                return
+            for msg_id in list(self._pending):
+                if len(self._pending) <= MAX_UNCLAIMED_RESPONSES:
+                    break
+                if self._pending[msg_id].done():
+                    del self._pending[msg_id]
 
-    def _handle_event(self, msg):
-        if msg.get("method") in (
-            "Network.requestWillBeSent",
-            "Network.responseReceived",
-            "Network.loadingFinished",
-            "Network.loadingFailed",
-        ):
-            with self._lock:
-                if msg["method"] == "Network.requestWillBeSent":
-                    self._inflight_requests += 1
-                elif msg["method"] in ("Network.loadingFinished", "Network.loadingFailed"):
-                    self._inflight_requests = max(0, self._inflight_requests - 1)
+    def _fail_pending(self, error):
+        with self._lock:
+            waiting = [f for f in self._pending.values() if not f.done()]
+            self._pending.clear()
+        for fut in waiting:
+            fut.set_exception(error)
 
-    def _recv(self, msg_id, timeout=None):
-        deadline = None if timeout is None else time.monotonic() + timeout
-        while True:
-            if deadline and time.monotonic() > deadline:
-                raise TimeoutError(f"CDP response timeout for {msg_id}")
+    def on(self, method, callback):
+        """
+        Subscribe to a CDP event (e.g. 'Page.frameNavigated').
+        Callbacks run on the reader thread and must not block on _recv.
+        """
+        with self._lock:
+            self._listeners[method].append(callback)
+
+    def off(self, method, callback):
+        with self._lock:
+            if callback in self._listeners.get(method, []):
+                self._listeners[method].remove(callback)
+
+    def _dispatch_event(self, msg):
+        self._handle_event(msg)
+        # Listeners follow the current tab (plus browser-level events)
+        if msg.get("sessionId") and msg["sessionId"] != self._current.session_id:
+            return
+        with self._lock:
+            callbacks = list(self._listeners.get(msg["method"], ()))
+        for callback in callbacks:
             try:
-                raw = self.ws.recv()
-            except websocket.WebSocketTimeoutException:
-                continue
+                callback(msg.get("params", {}))
             except Exception as e:
-                raise RuntimeError(f"WebSocket receive failed: {e}")
+                print(f"Event listener for {msg['method']} failed: {e}")
+
+    def _send(self, method, params=None, session_id=None):
+        """
+        Sends a command without waiting. The reply is kept until _recv(msg_id) claims it,
+        so several commands can be in flight at once.
+        Page commands go to session_id, or to the current tab's session by default.
+        """
+        self._check_cancelled()
+        outer = getattr(self._call_ctx, "deadline", None)
+        if outer is not None and outer.expired():
+            raise outer.error(method=method) # Fail fast instead of queueing doomed work
+        return self._post(method, params, session_id)
+
+    def _post(self, method, params=None, session_id=None):
+        """
+        Writes one command to the socket (no cancellation or budget checks).
+        Handle-creating commands join the current action's object group, and
+        handles they create or release are tracked per tab.
+        """
+        params = params or {}
+        fut = Future()
+        fut.cdp_method = method
+        if not method.startswith(BROWSER_DOMAINS):
+            session_id = session_id or self._active.session_id
+        state = self._targets.get(session_id, self._active)
+
+        if method in HANDLE_METHODS:
+            group = params.get("objectGroup") or getattr(self._call_ctx, "object_group", None)
+            if group and "objectGroup" not in params:
+                params = {**params, "objectGroup": group}
+                if not params.get("returnByValue"):
+                    self._call_ctx.object_group_used = True
+            fut.handle_owner, fut.handle_group = state.handles, group
+        elif method == "Runtime.releaseObjectGroup":
+            state.handles.release_group(params.get("objectGroup"))
+        elif method == "Runtime.releaseObject":
+            state.handles.release(params.get("objectId"))
+
+        with self._lock:
+            msg_id = next(self._ids)
+            self._pending[msg_id] = fut
+            self.cdp_stats["commands"] += 1
+            payload = {"id": msg_id, "method": method, "params": params}
+            if session_id:
+                payload["sessionId"] = session_id
             try:
-                msg = json.loads(raw)
+                self.ws.send(json.dumps(payload))
             except Exception:
-                continue
-            if "method" in msg:
-                self._handle_event(msg)  # process events, then keep waiting
-                continue
-            if msg.get("id") == msg_id:
-                return msg
-
-    def _enable_domains(self):
-        self._send("Page.enable")
-        self._send("DOM.enable")
-        self._send("CSS.enable")
-        self._send("Runtime.enable")
-        self._send("Input.enable")
-        self._send("Network.enable")
-        self._send("Page.setLifecycleEventsEnabled", {"enabled": True})
-        self._send("Page.bringToFront")
-        self._send("Network.enable")
-        self._send("Network.setCacheDisabled", {"cacheDisabled": True})
+                del self._pending[msg_id]
+                raise
+            return msg_id
+
+    def execute(self, method, params=None, timeout=None):
+        """
+        Sends a command, waits for its reply and returns the 'result' payload.
+        Raises RuntimeError if Chrome answers with a protocol error.
+        """
+        response = self._recv(self._send(method, params), timeout=timeout)
+        if "error" in response:
+            raise RuntimeError(f"{method} failed: {response['error'].get('message')}")
+        return response.get("result", {})
+
+    def _handle_event(self, msg):
+        method = msg.get("method", "")
+        params = msg.get("params", {})
+        if method.startswith("Target."):
+            self._handle_target_event(method, params)
+            return
+
+        # Route to the tab the event came from, whether or not it is current
+        state = self._targets.get(msg["sessionId"]) if msg.get("sessionId") else self._current
+        if state is None:
+            return
+        if method.startswith("Network."):
+            state.network.handle(method, params)
+        elif method.startswith(("Page.", "Runtime.")):
+            state.readiness.handle(method, params)
+            state.locators.handle(method, params, state.readiness.main_frame_id)
+            state.handles.handle(method, params)
+            state.track_context(method, params)
+
+    # ---------------- Flattened targets ----------------
+    def _owns_target(self, info):
+        return info.get("type") == "page" and (
+            self.browser_context_id is None or info.get("browserContextId") == self.browser_context_id
+        )
+
+    def _register_target(self, state):
+        with self._targets_changed:
+            registered = self._targets.setdefault(state.session_id, state)
+            self._targets_changed.notify_all()
+            return registered
+
+    def _wait_for_tab(self, match, deadline):
+        """
+        Waits (event-driven) until match(attached tabs) returns a tab or the
+        deadline passes; returns the match or None.
+        """
+        with self._targets_changed:
+            while True:
+                found = match(list(self._targets.values()))
+                remaining = deadline - time.monotonic()
+                if found or remaining <= 0:
+                    return found
+                if getattr(self._call_ctx, "cancel", None) is not None:
+                    remaining = min(remaining, 0.1)
+                self._targets_changed.wait(remaining)
+                self._check_cancelled()
+
+    def _handle_target_event(self, method, params):
+        """
+        Runs on the reader thread: keeps every page of our browser context
+        attached. Only sends (never waits), so it cannot stall the reader.
+        """
+        if method == "Target.targetCreated":
+            info = params.get("targetInfo", {})
+            if not self._owns_target(info):
+                return
+            with self._targets_changed:
+                if info["targetId"] in self._claimed_targets:
+                    return
+                self._claimed_targets[info["targetId"]] = "auto"
+            self._send("Target.attachToTarget", {"targetId": info["targetId"], "flatten": True})
+
+        elif method == "Target.attachedToTarget":
+            info = params.get("targetInfo", {})
+            if self._claimed_targets.get(info.get("targetId")) != "auto":
+                return # attach() registers and initializes its own target
+            state = TargetState(info["targetId"], params["sessionId"], info)
+            self._enable_domains(state) # Queued before anyone can see (and drive) the tab
+            self._register_target(state)
+            print(f"Attached new tab: {info.get('title') or info.get('url')} ({info['targetId']})")
+
+        elif method == "Target.targetInfoChanged":
+            info = params.get("targetInfo", {})
+            with self._targets_changed:
+                for state in self._targets.values():
+                    if state.target_id == info.get("targetId"):
+                        state.info = info
+                        self._targets_changed.notify_all() # A new title/URL may match a pending switch
+
+        elif method in ("Target.detachedFromTarget", "Target.targetDestroyed"):
+            with self._targets_changed:
+                gone = [
+                    sid for sid, state in self._targets.items()
+                    if sid == params.get("sessionId") or state.target_id == params.get("targetId")
+                ]
+                for sid in gone:
+                    state = self._targets.pop(sid)
+                    self._claimed_targets.pop(state.target_id, None)
+                    if state is self._current:
+                        # Fall back to the most recently opened tab that is still there
+                        self._current = next(reversed(self._targets.values()), TargetState(None))
+                        print(f"Current tab closed; now on {self._current.target_id}")
+                if gone:
+                    self._targets_changed.notify_all()
+
+    def _recv(self, msg_id, timeout=None):
+        with self._lock:
+            fut = self._pending.get(msg_id)
+            if fut is not None and not fut.done():
+                self.cdp_stats["round_trips"] += 1 # Replies that already arrived cost no extra wait
+        if fut is None:
+            raise RuntimeError(f"No pending CDP command with id {msg_id}")
+        token = getattr(self._call_ctx, "cancel", None)
+        # Every command gets what is left of the call budget, and never waits unbounded
+        budget = getattr(self._call_ctx, "deadline", None)
+        limit = CDP_COMMAND_TIMEOUT / 1000 if timeout is None else timeout
+        deadline = time.monotonic() + limit
+        if budget is not None:
+            deadline = min(deadline, budget.expires)
+        try:
+            while True:
+                # Wake up periodically only when there is a cancel token to honour
+                wait = max(0, deadline - time.monotonic())
+                if token is not None:
+                    wait = min(wait, 0.1)
+                try:
+                    return fut.result(timeout=wait)
+                except FutureTimeoutError:
+                    self._check_cancelled()
+                    if time.monotonic() >= deadline:
+                        if budget is not None and budget.expired():
+                            raise budget.error(method=fut.cdp_method)
+                        raise CDPTimeoutError(
+                            "CDP command", int(limit * 1000), int(limit * 1000), method=fut.cdp_method
+                        )
+        finally:
+            with self._lock:
+                self._pending.pop(msg_id, None)
+
+    def _enable_domains(self, state=None):
+        """
+        Enables every domain on one tab's session (this thread's tab by default).
+        Fire-and-forget, so it is also safe on the reader thread.
+        """
+        sid = (state or self._active).session_id
+        self._send("Page.enable", session_id=sid)
+        self._send("DOM.enable", session_id=sid)
+        self._send("CSS.enable", session_id=sid)
+        self._send("Runtime.enable", session_id=sid)
+        self._send("Input.enable", session_id=sid)
+        self._send("Page.setLifecycleEventsEnabled", {"enabled": True}, session_id=sid)
+        self._send("Network.enable", session_id=sid)
+        self._send("Network.setCacheDisabled", {"cacheDisabled": True}, session_id=sid)
+        self._send("Runtime.addBinding", {"name": DIRTY_BINDING}, session_id=sid)
+        self._install_runtime(session_id=sid)
+
+    # ---------------- Page runtime (window.__mcp) ----------------
+    def _install_runtime(self, session_id=None):
+        """
+        Registers the helper library for every new document and installs it in the current one.
+        """
+        self._send("Page.addScriptToEvaluateOnNewDocument", {"source": PAGE_RUNTIME_JS}, session_id=session_id)
+        self._send("Runtime.evaluate", {"expression": PAGE_RUNTIME_JS}, session_id=session_id)
+
+    def _runtime_expr(self, fn, *args):
+        """
+        Guarded `__mcp.fn(args)` expression; evaluates to RUNTIME_MISSING when the
+        current document lacks the library (or has an older version).
+        """
+        call = f"__mcp.{fn}({', '.join(json.dumps(a) for a in args)})"
+        return f'window.__mcp && __mcp.version === {PAGE_RUNTIME_VERSION} ? {call} : "{RUNTIME_MISSING}"'
+
+    def _runtime_request(self, fn, *args):
+        """
+        (method, params) that call window.__mcp.<fn>(*args) in this tab's document.
+        Normally Runtime.callFunctionOn on the constant RUNTIME_CALL with the
+        arguments passed as values, so V8 reuses one compiled function for every
+        locator and no quote in an argument can break the script. Until the
+        main frame's context is known (right after a navigation) it falls back
+        to a guarded Runtime.evaluate.
+        """
+        context_id = self._active.context_id
+        if context_id is None:
+            return "Runtime.evaluate", {"expression": self._runtime_expr(fn, *args)}
+        return "Runtime.callFunctionOn", {
+            "functionDeclaration": RUNTIME_CALL,
+            "executionContextId": context_id,
+            "arguments": [{"value": fn}] + [{"value": a} for a in args],
+        }
+
+    def _runtime_retry(self, method, params, response):
+        """
+        True if a __mcp call has to be sent again: its execution context went
+        away (forgotten, so the retry falls back to evaluate) or the document
+        lacks the library (reinstalled first).
+        """
+        if "error" in response and method == "Runtime.callFunctionOn":
+            self._active.forget_context(params["executionContextId"])
+            return True
+        if response.get("result", {}).get("result", {}).get("value") == RUNTIME_MISSING:
+            self._reinstall_runtime()
+            return True
+        return False
+
+    def _reinstall_runtime(self):
+        self._recv(self._send("Runtime.evaluate", {"expression": PAGE_RUNTIME_JS}))
+
+    def _runtime_eval(self, fn, *args, return_by_value=True, await_promise=False, timeout=None, object_group=None):
+        """
+        Evaluates window.__mcp.<fn>(*args) and returns the raw CDP response.
+        If the current document does not have the library, it is installed and
+        the call retried once. With await_promise the reply arrives only once the
+        promise returned by fn settles. A returned handle belongs to object_group
+        (default: the current action's group).
+        """
+        for _ in range(3):
+            method, params = self._runtime_request(fn, *args)
+            params.update(returnByValue=return_by_value, awaitPromise=await_promise)
+            if object_group:
+                params["objectGroup"] = object_group
+
+            msg_id = self._send(method, params)
+            response = self._recv(msg_id, timeout=timeout)
+            if not self._runtime_retry(method, params, response):
+                return response
+
+        raise RuntimeError("Page runtime could not be installed in the current document")
+
+    def _runtime_call_on(self, object_id, fn, *args):
+        """
+        Calls window.__mcp.<fn>(element, *args) on a remote object and returns the raw CDP response.
+        """
+        msg_id = self._send("Runtime.callFunctionOn", {
+            "objectId": object_id,
+            "functionDeclaration": RUNTIME_CALL_ON,
+            "arguments": [{"value": fn}] + [{"value": a} for a in args],
+            "returnByValue": True
+        })
+        return self._recv(msg_id)
 
     def _parse_key_combo(self, combo: str):
         parts = combo.split("+")
@@ -397,7 +1237,7 @@ class ChromeCDP:
             """
             try:
                 # 1. Get the Window ID of the current target
-                msg_id = self._send("Browser.getWindowForTarget")
+                msg_id = self._send("Browser.getWindowForTarget", {"targetId": self.target_id})
                 result = self._recv(msg_id)["result"]
                 window_id = result["windowId"]
 
@@ -415,9 +1255,11 @@ class ChromeCDP:
                 print(f"Failed to force viewport: {e}")
 
     # ---------------- Page operations ----------------
+    @budgeted
     def navigate(self, url: str):
         self._send("Page.navigate", {"url": url})
 
+    @budgeted
     def get_html(self) -> str:
         msg_id = self._send(
             "Runtime.evaluate",
@@ -426,470 +1268,267 @@ class ChromeCDP:
         return self._recv(msg_id)["result"]["result"]["value"]
 
     # --------------- Wait helpers ----------------
+    def _await_page_condition(self, fn, *args, timeout_ms):
+        """
+        Runs an in-page __mcp.until* promise as ONE awaited Runtime.evaluate, so
+        Python wakes as soon as the page reports the condition (no sleep/poll).
+        Returns False at the deadline. If a navigation destroys the context the
+        promise lived in, it is re-armed in the new document.
+        """
+        deadline = self._deadline_for(timeout_ms)
+
+        while True:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                return False
+            try:
+                # The page resolves at its own deadline; the CDP timeout is only a backstop
+                response = self._runtime_eval(
+                    fn, *args, int(remaining * 1000),
+                    await_promise=True, timeout=remaining + 1
+                )
+                result = response.get("result", {})
+                if "error" not in response and "exceptionDetails" not in result:
+                    return result.get("result", {}).get("value") is True
+            except TimeoutError:
+                return False
+            except RuntimeError:
+                pass # Page runtime missing mid-navigation
+
+            # Context destroyed by a navigation; give the new document a moment
+            self._sleep(min(STEP_DELAY, max(0, deadline - time.monotonic())))
+
+    @budgeted
     def wait_for_element(self, xpath, timeout_ms=DEFAULT_TIMEOUT):
         self.wait_for_dom_stable(timeout_ms)
 
-        deadline = time.monotonic() + timeout_ms / 1000
-
-        expr = f"""
-        (function () {{
-            const snapshot = document.evaluate("{xpath}", document, null,
-                XPathResult.ORDERED_NODE_SNAPSHOT_TYPE, null);
-            
-            for (let i = 0; i < snapshot.snapshotLength; i++) {{
-                const el = snapshot.snapshotItem(i);
-                const r = el.getBoundingClientRect();
-                const s = window.getComputedStyle(el);
-                
-                if (r.width > 0 && r.height > 0 && 
-                    s.visibility !== 'hidden' && s.display !== 'none') {{
-                    return true;
-                }}
-            }}
-            return false;
-        }})()
-        """
-
-        while time.monotonic() < deadline:
-            msg_id = self._send("Runtime.evaluate", {"expression": expr})
-            if self._recv(msg_id)["result"]["result"]["value"]:
-                return True
-            time.sleep(STEP_DELAY)
+        if self._await_page_condition("untilVisible", xpath, timeout_ms=timeout_ms):
+            return True
 
         self._save_debug_screenshot("wait_for_element_failed")
-        raise TimeoutError(f"Element not visible: {xpath}")
+        raise self._timeout_error(f"Element not visible: {xpath}", timeout_ms)
     
+    @budgeted
     def wait_for_visible_element(self, xpath: str, timeout_ms: int = DEFAULT_TIMEOUT):
-        deadline = time.monotonic() + (timeout_ms / 1000)
-
-        expr = f'''
-        (function() {{
-        const el = document.evaluate("{xpath}", document, null,
-            XPathResult.FIRST_ORDERED_NODE_TYPE, null).singleNodeValue;
-        if (!el) return false;
-        const style = window.getComputedStyle(el);
-        const r = el.getBoundingClientRect();
-        return (
-            style.visibility !== "hidden" &&
-            style.display !== "none" &&
-            r.width > 0 &&
-            r.height > 0
-        );
-        }})()
-        '''
-
-        while time.monotonic() < deadline:
-            msg_id = self._send("Runtime.evaluate", {"expression": expr})
-            visible = self._recv(msg_id)["result"]["result"]["value"]
-
-            if visible:
-                return True
-
-            time.sleep(STEP_DELAY)
+        if self._await_page_condition("untilNodeVisible", xpath, timeout_ms=timeout_ms):
+            return True
 
         self._save_debug_screenshot("wait_for_visible_element_failed")
-        raise TimeoutError(f"Element not visible within {timeout_ms}ms: {xpath}")
+        raise self._timeout_error(f"Element not visible within {timeout_ms}ms: {xpath}", timeout_ms)
 
+    @budgeted
     def wait_for_dom_stable(self, timeout_ms=DOM_TIMEOUT, idle_ms=DOM_IDLE_MS):
         """
         Wait until DOM mutations stop for idle_ms duration.
+        The page arms a timer for the remaining idle time instead of being polled.
         """
-        deadline = time.monotonic() + timeout_ms / 1000
-
-        expr = """
-        (function () {
-        if (!window.__domStableTracker) {
-            window.__domStableTracker = { last: Date.now() };
-            new MutationObserver(() => {
-            window.__domStableTracker.last = Date.now();
-            }).observe(document, { subtree: true, childList: true, attributes: true });
-        }
-        return Date.now() - window.__domStableTracker.last;
-        })()
-        """
-
-        while time.monotonic() < deadline:
-            # msg_id = self._send("Runtime.evaluate", {"expression": expr})
-            # idle_time = self._recv(msg_id)["result"]["result"]["value"]
-
-            # if idle_time >= idle_ms:
-            #     return True
-
-            # Added try-except to handle transient errors during navigation
-            try:
-                msg_id = self._send("Runtime.evaluate", {"expression": expr})
-                result = self._recv(msg_id)
-                
-                # Check for error in evaluation (e.g. context destroyed)
-                if "error" in result.get("result", {}):
-                    time.sleep(STEP_DELAY)
-                    continue
-                    
-                idle_time = result["result"]["result"]["value"]
-                if idle_time >= idle_ms:
-                    return True
-                    
-            except Exception:
-                # Ignore transient errors during page loads/navs
-                pass
-
-            time.sleep(STEP_DELAY)
+        if self._await_page_condition("untilDomIdle", idle_ms, timeout_ms=timeout_ms):
+            return True
 
         self._save_debug_screenshot("wait_for_dom_stable_failed")
-        raise TimeoutError("DOM did not stabilize")
+        raise self._timeout_error("DOM did not stabilize", timeout_ms)
 
+    @budgeted
     def wait_for_network_idle(self, timeout_ms=NETWORK_TIMEOUT, idle_ms=NETWORK_IDLE_MS):
         """
-        Wait until there are no pending network requests.
+        Wait until no tracked request has been in flight for idle_ms.
+        Wakes on the finishing event itself rather than polling a counter.
         """
-        deadline = time.monotonic() + timeout_ms / 1000
-        stable_since = None
-        while time.monotonic() < deadline:
-            with self._lock:
-                pending = self._inflight_requests
-            now = time.monotonic()
-            if pending == 0:
-                stable_since = stable_since or now
-                if (now - stable_since) * 1000 >= idle_ms:
-                    return True
-            else:
-                stable_since = None
-            time.sleep(STEP_DELAY)
-        raise TimeoutError("Network did not become idle")
-
+        # Only slice the wait when there is a cancel token to honour
+        check = self._check_cancelled if getattr(self._call_ctx, "cancel", None) else None
+        remaining_ms = (self._deadline_for(timeout_ms) - time.monotonic()) * 1000
+        if self.network.wait_for_idle(idle_ms, max(0, remaining_ms), check=check):
+            return True
+        raise self._timeout_error(f"Network did not become idle; pending: {self.network.pending()}", timeout_ms)
+
+    @budgeted
     def wait_for_text(self, text: str, timeout_ms: int = DEFAULT_TIMEOUT):
         """
         Wait until the given visible text appears anywhere in the document.
         """
-        deadline = time.monotonic() + timeout_ms / 1000
-
-        expr = f"""
-        (function () {{
-        const walker = document.createTreeWalker(
-            document.body,
-            NodeFilter.SHOW_TEXT,
-            null,
-            false
-        );
-
-        while (walker.nextNode()) {{
-            const node = walker.currentNode;
-            if (node.nodeValue && node.nodeValue.includes({json.dumps(text)})) {{
-            const parent = node.parentElement;
-            if (!parent) continue;
-            const style = window.getComputedStyle(parent);
-            if (style && style.visibility !== 'hidden' && style.display !== 'none') {{
-                return true;
-            }}
-            }}
-        }}
-        return false;
-        }})()
-        """
-
-        while time.monotonic() < deadline:
-            msg_id = self._send("Runtime.evaluate", {"expression": expr})
-            result = self._recv(msg_id)["result"]["result"]
-
-            if result.get("value") is True:
-                return
-
-            time.sleep(STEP_DELAY)
+        if self._await_page_condition("untilText", text, timeout_ms=timeout_ms):
+            return
 
         self._save_debug_screenshot("wait_for_text_failed")
-        raise TimeoutError(f"Text not found within {timeout_ms}ms: '{text}'")
+        raise self._timeout_error(f"Text not found within {timeout_ms}ms: '{text}'", timeout_ms)
 
 
     # --------------- mouse handlers ----------------
+    def input_batch(self):
+        return InputBatch(self)
+
+    @budgeted
     def mouse_down(self, x, y, button="left"):
-        self._send("Input.dispatchMouseEvent", {
-            "type": "mousePressed",
-            "x": x,
-            "y": y,
-            "button": button,
-            "clickCount": 1
-        })
+        with self.input_batch() as batch:
+            batch.mouse("mousePressed", x, y, button)
 
+    @budgeted
     def mouse_up(self, x, y, button="left"):
-        self._send("Input.dispatchMouseEvent", {
-            "type": "mouseReleased",
-            "x": x,
-            "y": y,
-            "button": button,
-            "clickCount": 1
-        })
+        with self.input_batch() as batch:
+            batch.mouse("mouseReleased", x, y, button)
 
     #epxerimental method to dispatch hover events
     def _dispatch_synthetic_hover(self, xpath):
         """
         Manually dispatches hover events to the FIRST VISIBLE element.
         """
-        expr = f"""
-        (function() {{
-            const snapshot = document.evaluate("{xpath}", document, null,
-                XPathResult.ORDERED_NODE_SNAPSHOT_TYPE, null);
-
-            let el = null;
-            for (let i = 0; i < snapshot.snapshotLength; i++) {{
-                const item = snapshot.snapshotItem(i);
-                const style = window.getComputedStyle(item);
-                if (style.display !== 'none' && style.visibility !== 'hidden') {{
-                    el = item;
-                    break;
-                }}
-            }}
-
-            if (!el) return;
-            
-            const eventTypes = ['mouseover', 'mouseenter', 'pointerover', 'pointerenter'];
-            eventTypes.forEach(type => {{
-                const e = new MouseEvent(type, {{
-                    view: window,
-                    bubbles: true,
-                    cancelable: true,
-                    buttons: 0,
-                    clientX: el.getBoundingClientRect().left,
-                    clientY: el.getBoundingClientRect().top
-                }});
-                el.dispatchEvent(e);
-            }});
-        }})()
-        """
-        self._send("Runtime.evaluate", {"expression": expr})
+        self._runtime_eval("hoverLocator", xpath)
 
     def _dispatch_synthetic_hover_on_id(self, object_id):
         """
         Dispatches hover events directly to the Object ID.
         """
-        expr = """
-        function(el) {
-            const eventTypes = ['mouseover', 'mouseenter', 'pointerover', 'pointerenter'];
-            eventTypes.forEach(type => {
-                const e = new MouseEvent(type, {
-                    view: window,
-                    bubbles: true,
-                    cancelable: true,
-                    buttons: 0,
-                    clientX: el.getBoundingClientRect().left,
-                    clientY: el.getBoundingClientRect().top
-                });
-                el.dispatchEvent(e);
-            });
-        }
-        """
-        self._send("Runtime.callFunctionOn", {
-            "functionDeclaration": expr,
-            "objectId": object_id
-        })
+        self._runtime_call_on(object_id, "hoverEvents")
 
+    @budgeted
     def hover(self, xpath, timeout_ms=DEFAULT_TIMEOUT):
         self._ensure_page_actionable(timeout_ms=timeout_ms)
-        self.wait_for_element(xpath, timeout_ms=timeout_ms)
-        
-        # 1. Resolve XPath to a permanent Object ID ONE TIME.
-        object_id = self._get_object_id(xpath)
-        if not object_id:
-             raise RuntimeError(f"Element found but ID retrieval failed: {xpath}")
 
-        # 2. Scroll using the ID (Robust against DOM moves)
-        self._send("DOM.scrollIntoViewIfNeeded", {"objectId": object_id})
-        
-        # 3. Get Center using the Box Model of the ID (No XPath re-eval)
-        point = self._get_center_by_id(object_id)
-        if not point:
-             self._save_debug_screenshot("hover_failed")
-             raise RuntimeError(f"Could not calculate geometry for: {xpath}")
+        # 1. Resolve, scroll and measure in one round trip
+        try:
+            target = self._wait_for_target(xpath, timeout_ms=timeout_ms)
+        except TimeoutError:
+            self._save_debug_screenshot("hover_failed")
+            raise
 
-        # 4. Perform the Physical Hover
+        # 2. Perform the Physical Hover
         # "Jitter" to wake up event listeners
-        self.mouse_move(point["x"] - 5, point["y"] - 5)
-        time.sleep(STEP_DELAY)
-        self.mouse_move(point["x"], point["y"])
-        
-        # 5. Synthetic Fallback (using the ID directly)
-        self._dispatch_synthetic_hover_on_id(object_id)
-        
-        time.sleep(UI_DELAY) # Allow hover effects to take hold
+        self.mouse_move(target["x"] - 5, target["y"] - 5)
+        self._sleep(STEP_DELAY)
+        self.mouse_move(target["x"], target["y"])
+
+        # 3. Synthetic Fallback (using the ID directly)
+        self._dispatch_synthetic_hover_on_id(target["objectId"])
 
+        self._sleep(UI_DELAY) # Allow hover effects to take hold
+
+    @budgeted
     def mouse_move(self, x, y):
-        self._send("Input.dispatchMouseEvent", {
-            "type": "mouseMoved",
-            "x": x,
-            "y": y,
-            "buttons": 0
-        })
+        with self.input_batch() as batch:
+            batch.mouse("mouseMoved", x, y)
 
+    @budgeted
     def double_click(self, xpath, timeout_ms=DEFAULT_TIMEOUT):
         self._ensure_page_actionable(timeout_ms=timeout_ms)
-        self.wait_for_element(xpath, timeout_ms=timeout_ms)
-        
-        obj_id = self._get_object_id(xpath)
-        if not obj_id: raise RuntimeError(f"Double click failed; no ID for {xpath}")
+        target = self._wait_for_target(xpath, timeout_ms=timeout_ms)
 
-        self._send("DOM.scrollIntoViewIfNeeded", {"objectId": obj_id})
-        point = self._get_center_by_id(obj_id)
-
-        if point:
-            for i in range(2):
-                self.mouse_down(point["x"], point["y"])
-                self.mouse_up(point["x"], point["y"])
+        if target["hit"]:
+            with self.input_batch() as batch:
+                for count in (1, 2):
+                    batch.mouse("mousePressed", target["x"], target["y"], click_count=count)
+                    batch.mouse("mouseReleased", target["x"], target["y"], click_count=count)
             return
-            
-        # JS Fallback
+
+        # JS Fallback (center is covered by another element)
         self._send("Runtime.callFunctionOn", {
             "functionDeclaration": "function() { this.click(); this.click(); }",
-            "objectId": obj_id
+            "objectId": target["objectId"]
         })
 
+    @budgeted
     def drag_and_drop(self, source_xpath, target_xpath, timeout_ms=DEFAULT_TIMEOUT):
         self._ensure_page_actionable(timeout_ms=timeout_ms)
-        self.wait_for_element(source_xpath, timeout_ms=timeout_ms)
-        self.wait_for_element(target_xpath, timeout_ms=timeout_ms)
-        
-        # 1. Resolve IDs immediately
-        src_id = self._get_object_id(source_xpath)
-        tgt_id = self._get_object_id(target_xpath)
-        
-        if not src_id or not tgt_id:
-            raise RuntimeError("Drag failed: could not resolve source or target ID")
 
-        # 2. Scroll both into view (Sequence matters less now)
-        self._send("DOM.scrollIntoViewIfNeeded", {"objectId": src_id})
-        self._send("DOM.scrollIntoViewIfNeeded", {"objectId": tgt_id})
+        # 1. Resolve, scroll and measure both ends
+        src = self._wait_for_target(source_xpath, timeout_ms=timeout_ms)
+        tgt = self._wait_for_target(target_xpath, timeout_ms=timeout_ms)
 
-        # 3. Get Coordinates from IDs
-        src = self._get_center_by_id(src_id)
-        tgt = self._get_center_by_id(tgt_id)
+        # 2. Scrolling the target into view may have moved the source
+        if tgt["scrolled"]:
+            src = self._measure(src["objectId"])
 
         if src and tgt:
             self.mouse_move(src["x"], src["y"])
             self.mouse_down(src["x"], src["y"])
-            time.sleep(STEP_DELAY) # Small drag delay
+            self._sleep(STEP_DELAY) # Small drag delay
             self.mouse_move(tgt["x"], tgt["y"])
-            time.sleep(STEP_DELAY)
+            self._sleep(STEP_DELAY)
             self.mouse_up(tgt["x"], tgt["y"])
             return
 
         self._save_debug_screenshot("drag_and_drop_failed")
         raise RuntimeError("Drag failed: could not calculate geometry from IDs")
 
+    @budgeted
     def press_key(self, key):
-        self._send("Input.dispatchKeyEvent", {
-            "type": "keyDown",
-            "key": key
-        })
-        self._send("Input.dispatchKeyEvent", {
-            "type": "keyUp",
-            "key": key
-        })
+        with self.input_batch() as batch:
+            batch.key("keyDown", key=key)
+            batch.key("keyUp", key=key)
 
     def _clear_input(self, xpath):
-        expr = f"""
-        (function () {{
-        const el = document.evaluate("{xpath}", document, null,
-            XPathResult.FIRST_ORDERED_NODE_TYPE, null).singleNodeValue;
-        if (!el) return false;
-        el.value = '';
-        el.dispatchEvent(new Event('input', {{ bubbles: true }}));
-        el.dispatchEvent(new Event('change', {{ bubbles: true }}));
-        return true;
-        }})()
-        """
-        msg_id = self._send("Runtime.evaluate", {"expression": expr})
-        return self._recv(msg_id)["result"]["result"].get("value") is True
-
-    def fill(self, xpath: str, value: str, timeout_ms: int = DEFAULT_TIMEOUT):
+        return self._runtime_eval("clearInput", xpath)["result"]["result"].get("value") is True
 
+    @budgeted
+    def fill(self, xpath: str, value: str, timeout_ms: int = DEFAULT_TIMEOUT, strategy: str = FILL_STRATEGY):
+        """
+        Replaces the field's content with value.
+        strategy picks how the text is entered (see _fill_strategy); 'auto'
+        decides per field and value. The resulting value is read back in the
+        same round trip that confirms the input was processed; raises
+        FillMismatchError if it differs from value.
+        """
+        check_fill_strategy(strategy) # Before touching the field
         entry = None
         if self.tracer.enabled:
             entry = self.tracer.start_step(action="fill", target=xpath, params={"value": value})
 
-        deadline = time.monotonic() + timeout_ms / 1000
+        deadline = self._deadline_for(timeout_ms)
+        usage = dict(self.cdp_stats)
         
         try:            
             while time.monotonic() < deadline:
                 try:
                     self._ensure_page_actionable(timeout_ms=PAGE_LOAD_TIMEOUT)
-                    self.wait_for_element(xpath, timeout_ms=DEFAULT_TIMEOUT)
-                    
-                    # 1. Get Stable Reference
-                    obj_id = self._get_object_id(xpath)
-                    if not obj_id: raise RuntimeError("Object ID lookup failed")
-
-                    # 2. Scroll
-                    self._send("DOM.scrollIntoViewIfNeeded", {"objectId": obj_id})                    
-
-                    # 3. Focus (Physical click ensures events fire)
-                    point = self._get_center_by_id(obj_id)
-                    if point:
-                        self.mouse_move(point["x"], point["y"])
-                        self.mouse_down(point["x"], point["y"])
-                        self.mouse_up(point["x"], point["y"])
-                    else:
-                        self._send("Runtime.callFunctionOn", {
-                            "functionDeclaration": "function() { this.focus(); }",
-                            "objectId": obj_id
-                        })
-
-                    # WAIT for focus to settle
-                    time.sleep(STEP_DELAY)
 
-                    # Press Ctrl
-                    self._send("Input.dispatchKeyEvent", {
-                        "type": "keyDown", 
-                        "key": "Control", 
-                        "code": "ControlLeft", 
-                        "modifiers": 2 
-                    })
-                    
-                    # Press A
-                    self._send("Input.dispatchKeyEvent", {
-                        "type": "keyDown", 
-                        "key": "a", 
-                        "code": "KeyA", 
-                        "modifiers": 2, # 2 = Ctrl
-                        "text": "",     # Explicitly say no text
-                        "unmodifiedText": ""
-                    })
-                    
-                    self._send("Input.dispatchKeyEvent", {
-                        "type": "keyUp", 
-                        "key": "a", 
-                        "code": "KeyA", 
-                        "modifiers": 2
-                    })
-                    
-                    # Release Ctrl
-                    self._send("Input.dispatchKeyEvent", {"type": "keyUp", "key": "Control", "code": "ControlLeft", "modifiers": 0})
-                    
-                    time.sleep(0.05) # Pause between Select and Delete
+                    # 1. Resolve, scroll and measure in one round trip
+                    target = self._prepare_element(xpath)
+                    if not target or not target["visible"]:
+                        raise RuntimeError(f"Element not visible: {xpath}")
 
-                    # Press Backspace
-                    self._send("Input.dispatchKeyEvent", {"type": "keyDown", "key": "Backspace", "code": "Backspace"})
-                    self._send("Input.dispatchKeyEvent", {"type": "keyUp", "key": "Backspace", "code": "Backspace"})
+                    # 2. Focus (Physical click ensures events fire); returns once it is handled
+                    self._focus_target(target)
+
+                    self._clear_focused_field()
 
                     # --- CRITICAL FIX: PAUSE HERE ---
                     # Wait for the "Field Required" validation to fire and settle
-                    time.sleep(STEP_DELAY)
-
-                    # 5. Type (Keystrokes go to focused element)
-                    for ch in value:
-                        self._send("Input.dispatchKeyEvent", { "type": "char", "text": ch })
-                        # Optional: Tiny delay for stability
-                        # time.sleep(0.01)
-
-                    if entry: self.tracer.success(entry)
+                    self._sleep(STEP_DELAY)
+
+                    # 3. Type (Input goes to focused element)
+                    chosen = self._fill_strategy(target.get("field"), value, strategy)
+                    self._enter_text(value, chosen)
+
+                    # 4. Verify in one round trip
+                    actual = self._field_value(target["objectId"])
+                    matches = fill_value_matches(actual, value, target.get("field"))
+                    if not matches and chosen != "keys" and len(value) <= FILL_KEYS_MAX_LENGTH:
+                        # Page ignored programmatic text (key-driven mask / handler): retype key by key
+                        self._clear_focused_field()
+                        chosen = "keys"
+                        self._enter_text(value, chosen)
+                        actual = self._field_value(target["objectId"])
+                        matches = fill_value_matches(actual, value, target.get("field"))
+                    if not matches:
+                        raise FillMismatchError(xpath, value, actual)
+
+                    if entry:
+                        entry["params"]["strategy"] = chosen
+                        self._record_cdp_usage(entry, usage)
+                        self.tracer.success(entry)
                     return
 
+                except (FillMismatchError, ValueError):
+                    raise # retyping gives the same result; a bad strategy stays bad
                 except Exception:
                     if entry: self.tracer.record_retry(entry)
-                    time.sleep(STEP_DELAY)
+                    self._sleep(STEP_DELAY)
 
             self._save_debug_screenshot("fill_failed")
-            raise TimeoutError(f"Fill timed out for xpath: {xpath}")
+            raise self._timeout_error(f"Fill timed out for xpath: {xpath}", timeout_ms)
 
         except Exception as e:
             if entry:
+                self._record_cdp_usage(entry, usage)
                 self.tracer.failure(entry, e)
                 self._capture_failure_artifacts(entry)
                 self.tracer.dump()
@@ -897,58 +1536,162 @@ class ChromeCDP:
                 self._save_debug_screenshot("fill_failed")
             raise
 
+    @budgeted
+    def fill_form(self, fields: dict, timeout_ms: int = DEFAULT_TIMEOUT):
+        """
+        Fills several form fields in one call. fields maps what the user sees or
+        the markup says (label, aria-label/labelledby, name, id, placeholder or
+        the text just before the field) to the value: text for text fields, the
+        option text or value for selects, true/false for checkboxes, the chosen
+        option's label or value for a radio group.
+
+        All fields are resolved and, where no keystrokes are needed, set in ONE
+        in-page pass (__mcp.fillForm): text through the native value setter plus
+        input/change events, selects by option, checkboxes and radios by click()
+        when their state differs. Fields that need real keys (masks,
+        autocompletes, date editors, contenteditable) or whose value the page
+        did not keep are typed with fill().
+
+        Returns one verification dict per field, in the given order:
+            {"field": "Email", "status": "OK", "kind": "text", "xpath": ..., "ref": ...,
+             "value": <final value>, "expected": ...}
+        status: OK | MISMATCH (final value differs) | NOT_FOUND | DISABLED
+        """
+        self._ensure_page_actionable()
+        response = self._runtime_eval("fillForm", fields)
+        report = response.get("result", {}).get("result", {}).get("value")
+        if not isinstance(report, list):
+            raise RuntimeError("Form fill failed in the page")
+
+        typed = [item for item in report if item["status"] in ("TYPE", "MISMATCH") and item["kind"] in ("text", "editable")]
+        for item in typed:
+            try:
+                self.fill(item["xpath"], str(item["expected"]), timeout_ms=timeout_ms)
+            except Exception as e:
+                item["error"] = str(e)
+        if typed:
+            response = self._runtime_eval("checkFields", [{"xpath": i["xpath"], "expected": i["expected"]} for i in typed])
+            checked = response.get("result", {}).get("result", {}).get("value") or []
+            for item, check in zip(typed, checked):
+                item.update(check)
+
+        self._assign_refs([item for item in report if item.get("xpath")])
+        return report
+
+    def _fill_strategy(self, field, value, strategy=FILL_STRATEGY):
+        """
+        insert: one Input.insertText frame for the whole value (default).
+        ime:    composition events + commit, for non-ASCII text (CJK-aware editors).
+        keys:   one char event per character; only for short values in fields
+                that react to keystrokes (date/time editors, masks, autocompletes).
+        """
+        if check_fill_strategy(strategy) != "auto":
+            return strategy
+        field = field or {}
+        if len(value) <= FILL_KEYS_MAX_LENGTH and (field.get("type") in KEYED_INPUT_TYPES or field.get("keyed")):
+            return "keys"
+        if not value.isascii():
+            return "ime"
+        return "insert"
+
+    def _enter_text(self, value, strategy):
+        """
+        Types value into the focused element as one acknowledged batch.
+        """
+        with self.input_batch() as batch:
+            if strategy == "keys":
+                for ch in value:
+                    batch.key("char", text=ch)
+            elif strategy == "ime":
+                batch.send("Input.imeSetComposition", {
+                    "text": value,
+                    "selectionStart": len(value),
+                    "selectionEnd": len(value)
+                })
+                batch.send("Input.insertText", {"text": value}) # Commits the composition
+            elif value:
+                batch.send("Input.insertText", {"text": value})
+
+    def _clear_focused_field(self):
+        """
+        Ctrl+A, Backspace on the focused element (real keys, so validation fires).
+        Sent as one acknowledged batch: select-all is handled before the delete.
+        """
+        with self.input_batch() as batch:
+            # Ctrl+A (2 = Ctrl; explicitly no text)
+            batch.key("keyDown", key="Control", code="ControlLeft", modifiers=2)
+            batch.key("keyDown", key="a", code="KeyA", modifiers=2, text="", unmodifiedText="")
+            batch.key("keyUp", key="a", code="KeyA", modifiers=2)
+            batch.key("keyUp", key="Control", code="ControlLeft", modifiers=0)
+
+            # Backspace
+            batch.key("keyDown", key="Backspace", code="Backspace")
+            batch.key("keyUp", key="Backspace", code="Backspace")
+
+    def _focus_target(self, target):
+        """
+        Focuses a prepared element: a real click when its center is uncovered,
+        JS focus() otherwise. Returns once the page has handled it.
+        """
+        if target["hit"]:
+            with self.input_batch() as batch:
+                batch.mouse("mouseMoved", target["x"], target["y"])
+                batch.mouse("mousePressed", target["x"], target["y"])
+                batch.mouse("mouseReleased", target["x"], target["y"])
+        else:
+            self._recv(self._send("Runtime.callFunctionOn", {
+                "functionDeclaration": "function() { this.focus(); }",
+                "objectId": target["objectId"]
+            }))
+
+    def _field_value(self, object_id):
+        """
+        Current value of an input/textarea/contenteditable, or None for other elements.
+        """
+        result = self._runtime_call_on(object_id, "fieldValue").get("result", {}).get("result", {})
+        return result.get("value")
+
+    @budgeted
     def click(self, xpath, timeout_ms=DEFAULT_TIMEOUT):
         entry = self.tracer.start_step(action="click", target=xpath) if self.tracer.enabled else None
-        deadline = time.monotonic() + timeout_ms / 1000
+        deadline = self._deadline_for(timeout_ms)
+        usage = dict(self.cdp_stats)
         try:
             while time.monotonic() < deadline:
                 try:
                     self._ensure_page_actionable(timeout_ms=PAGE_LOAD_TIMEOUT)
-                    self.wait_for_element(xpath, timeout_ms=DEFAULT_TIMEOUT)
-                    
-                    # 1. Get Stable Reference (OBJECT ID)
-                    # We do this BEFORE scrolling to avoid losing the element if the DOM shifts
-                    obj_id = self._get_object_id(xpath)
-                    if not obj_id: raise RuntimeError("Object ID lookup failed")
-
-                    # 2. Scroll & Calculate using ID
-                    self._send("DOM.scrollIntoViewIfNeeded", {"objectId": obj_id})
-                    point = self._get_center_by_id(obj_id)
-                    
-                    if point:
-                        self._send("Input.dispatchMouseEvent", {
-                            "type": "mousePressed",
-                            "x": point["x"],
-                            "y": point["y"],
-                            "button": "left",
-                            "clickCount": 1
-                        })
-                        self._send("Input.dispatchMouseEvent", {
-                            "type": "mouseReleased",
-                            "x": point["x"],
-                            "y": point["y"],
-                            "button": "left",
-                            "clickCount": 1
+
+                    # 1. Resolve, scroll, measure and hit-test in one round trip
+                    target = self._prepare_element(xpath)
+                    if not target or not target["visible"]:
+                        raise RuntimeError(f"Element not visible: {xpath}")
+
+                    # 2. Physical click when the center really lands on the element
+                    if target["hit"]:
+                        with self.input_batch() as batch:
+                            batch.mouse("mousePressed", target["x"], target["y"])
+                            batch.mouse("mouseReleased", target["x"], target["y"])
+                    else:
+                        # Fallback: covered by an overlay / sticky header -> JS click on the specific ID
+                        self._send("Runtime.callFunctionOn", {
+                            "functionDeclaration": "function() { this.click(); }",
+                            "objectId": target["objectId"]
                         })
-                        if entry: self.tracer.success(entry)
-                        return
-
-                    # Fallback: JS click on the specific ID
-                    self._send("Runtime.callFunctionOn", {
-                        "functionDeclaration": "function() { this.click(); }",
-                        "objectId": obj_id
-                    })
-                    if entry: self.tracer.success(entry)
+
+                    if entry:
+                        self._record_cdp_usage(entry, usage)
+                        self.tracer.success(entry)
                     return
 
                 except Exception:
                     if entry: self.tracer.record_retry(entry)
-                    time.sleep(STEP_DELAY)
+                    self._sleep(STEP_DELAY)
 
             self._save_debug_screenshot("click_failed")
-            raise TimeoutError(f"Click failed: {xpath}")
+            raise self._timeout_error(f"Click failed: {xpath}", timeout_ms)
         except Exception as e:
             if entry:
+                self._record_cdp_usage(entry, usage)
                 self.tracer.failure(entry, e)
                 self._capture_failure_artifacts(entry)
                 self.tracer.dump()
@@ -963,11 +1706,26 @@ class ChromeCDP:
         1. document.readyState == 'complete'
         2. Network is idle (Soft Check - doesn't block if busy)
         3. DOM is stable (no mutations > 500ms)
+
+        Skipped entirely when nothing (navigation, lifecycle event, DOM mutation)
+        happened since the last passing check and the network is quiet. Inside
+        shared_readiness(), the first action always runs it; after that only a
+        navigation brings the check back.
         """
-        deadline = time.monotonic() + timeout_ms / 1000
+        shared = getattr(self._call_ctx, "shared_readiness", None)
+        if shared is not None and shared[0] is self.readiness:
+            if self.readiness.is_ready(since=shared[1]):
+                return
+        elif self.network.idle_ms() >= 500 and self.readiness.is_ready():
+            return
+
+        deadline = self._deadline_for(timeout_ms)
 
         while time.monotonic() < deadline:
             try:
+                # Epochs before the checks: anything after them invalidates this verification
+                snapshot = self.readiness.snapshot()
+
                 # 1. Browser Lifecycle Check
                 ready_id = self._send("Runtime.evaluate", {
                     "expression": "document.readyState"
@@ -975,7 +1733,7 @@ class ChromeCDP:
                 state = self._recv(ready_id)["result"]["result"].get("value")
 
                 if state != "complete":
-                    time.sleep(STEP_DELAY)
+                    self._sleep(STEP_DELAY)
                     continue
 
                 # 2. Network Idle Check (SOFT CHECK)
@@ -994,14 +1752,16 @@ class ChromeCDP:
                     continue
 
                 # return if lifecycle and DOM stability pass
+                self.readiness.mark_verified(snapshot)
                 return
 
             except Exception:
                 # Ignore transient errors (e.g., context destroyed during nav)
-                time.sleep(STEP_DELAY)
+                self._sleep(STEP_DELAY)
 
-        raise TimeoutError(f"Page failed to stabilize within {timeout_ms}ms")
+        raise self._timeout_error(f"Page failed to stabilize within {timeout_ms}ms", timeout_ms)
 
+    @budgeted
     def send_keys(self, keys: str, xpath: str = None):
         """
         Send keyboard shortcuts or keys.
@@ -1019,12 +1779,11 @@ class ChromeCDP:
 
             self._send("DOM.scrollIntoViewIfNeeded", {"objectId": obj_id})
             
-            # Force focus via JS
-            self._send("Runtime.callFunctionOn", {
+            # Force focus via JS (awaited, so the keys below land on it)
+            self._recv(self._send("Runtime.callFunctionOn", {
                 "functionDeclaration": "function() { this.focus(); }",
                 "objectId": obj_id
-            })
-            time.sleep(STEP_DELAY) # Small delay for focus to register
+            }))
 
         # 2. Parse Keys
         modifiers, key = self._parse_key_combo(keys)
@@ -1067,49 +1826,17 @@ class ChromeCDP:
             type_down = "keyDown"
 
         # 3. Dispatch Events (KeyDown -> KeyUp)
-        self._send("Input.dispatchKeyEvent", {
-            "type": type_down,
-            "key": key_val,
-            "code": code_val,
-            "modifiers": mod_mask,
-            "windowsVirtualKeyCode": 0, 
-            "nativeVirtualKeyCode": 0
-        })
-        
-        self._send("Input.dispatchKeyEvent", {
-            "type": "keyUp",
-            "key": key_val,
-            "code": code_val,
-            "modifiers": mod_mask
-        })
+        with self.input_batch() as batch:
+            batch.key(type_down, key=key_val, code=code_val, modifiers=mod_mask,
+                      windowsVirtualKeyCode=0, nativeVirtualKeyCode=0)
+            batch.key("keyUp", key=key_val, code=code_val, modifiers=mod_mask)
 
+    @budgeted
     def scroll_into_view(self, xpath):
-        expr = f"""
-        (function () {{
-            const snapshot = document.evaluate("{xpath}", document, null,
-                XPathResult.ORDERED_NODE_SNAPSHOT_TYPE, null);
-            
-            for (let i = 0; i < snapshot.snapshotLength; i++) {{
-                const el = snapshot.snapshotItem(i);
-                const style = window.getComputedStyle(el);
-                
-                // Find the first visible one
-                if (style.display !== 'none' && style.visibility !== 'hidden') {{
-                    el.scrollIntoView({{
-                        block: 'center',
-                        inline: 'center',
-                        behavior: 'instant'
-                    }});
-                    return true;
-                }}
-            }}
-            return false;
-        }})()
-        """
-        msg_id = self._send("Runtime.evaluate", {"expression": expr})
-        result = self._recv(msg_id)["result"]["result"]
+        result = self._runtime_eval("scrollToShown", xpath)["result"]["result"]
         return result.get("value") is True
 
+    @budgeted
     def type_human(self, xpath: str, text: str):
         """
         Types text like a human (Appends to existing text).
@@ -1120,27 +1847,12 @@ class ChromeCDP:
         try:
             self._ensure_page_actionable()
 
-            # 1. Get ID & Scroll
-            obj_id = self._get_object_id(xpath)
-            if not obj_id:
-                raise RuntimeError(f"Element not found: {xpath}")
+            # 1. Resolve, scroll and measure in one round trip
+            target = self._wait_for_target(xpath)
 
-            self._send("DOM.scrollIntoViewIfNeeded", {"objectId": obj_id})
-            
             # 2. Focus to field
             # We use a physical click to ensure the browser strictly focuses it
-            point = self._get_center_by_id(obj_id)
-            if point:
-                self.mouse_move(point["x"], point["y"])
-                self.mouse_down(point["x"], point["y"])
-                self.mouse_up(point["x"], point["y"])
-            else:
-                self._send("Runtime.callFunctionOn", {
-                    "functionDeclaration": "function() { this.focus(); }",
-                    "objectId": obj_id
-                })
-            
-            time.sleep(STEP_DELAY)
+            self._focus_target(target)
 
             # 3. Human like typing (Loop)
             # REMOVED: The Ctrl+A + Backspace block is gone.
@@ -1148,19 +1860,21 @@ class ChromeCDP:
             print(f"Human typing into {xpath}...")
             for char in text:
                 # FIX: Send 'key' only for Up/Down, 'text' only for Char event
-                self._send("Input.dispatchKeyEvent", {"type": "keyDown", "key": char})
-                self._send("Input.dispatchKeyEvent", {"type": "char", "text": char})
-                self._send("Input.dispatchKeyEvent", {"type": "keyUp", "key": char})
+                with self.input_batch() as batch:
+                    batch.key("keyDown", key=char)
+                    batch.key("char", text=char)
+                    batch.key("keyUp", key=char)
                 
                 # Jitter the delay to look natural
                 jitter = (ord(char) % 3) * 0.02 
-            time.sleep(HUMAN_DELAY + jitter)
+            self._sleep(HUMAN_DELAY + jitter)
 
         except Exception as e:
             self._save_debug_screenshot("type_human_failed")
             raise e
 
     # ---------------- Data Extraction Tools ----------------
+    @budgeted
     def get_text(self, xpath: str) -> str:
         """
         Retrieves text from ANY element.
@@ -1175,52 +1889,7 @@ class ChromeCDP:
         if not obj_id:
             raise RuntimeError(f"Element not found for text retrieval: {xpath}")
 
-        expr = """
-        function() {
-            const el = this;
-            const tag = el.tagName.toLowerCase();
-            const inputTypes = ['text', 'password', 'email', 'number', 'search', 'url', 'tel', 'date'];
-            
-            // 1. Form Fields (Input, Textarea)
-            if (tag === 'textarea' || (tag === 'input' && inputTypes.includes(el.type))) {
-                return el.value || el.getAttribute('placeholder') || '';
-            }
-            
-            // 2. Buttons (Submit, Reset, Button)
-            // <input type="button" value="Save"> vs <button>Save</button>
-            if (tag === 'input' && ['button', 'submit', 'reset'].includes(el.type)) {
-                return el.value || '';
-            }
-            
-            // 3. Dropdowns
-            if (tag === 'select') {
-                return el.options[el.selectedIndex].text || '';
-            }
-
-            // 4. Wrapper Logic (e.g., <td><input value="123"></td>)
-            // If this element wraps a form field and has no text of its own, grab the child's value.
-            const childInput = el.querySelector('input, textarea, select');
-            if (childInput) {
-                const directText = el.innerText.replace(childInput.value || '', '').trim();
-                if (directText.length === 0) {
-                     if (childInput.tagName.toLowerCase() === 'select') {
-                        return childInput.options[childInput.selectedIndex].text || '';
-                     }
-                     return childInput.value || childInput.getAttribute('placeholder') || '';
-                }
-            }
-
-            // 5. Universal Fallback (h1, p, div, span, li, a, label, th, td...)
-            return el.innerText || el.textContent || '';
-        }
-        """
-        msg_id = self._send("Runtime.callFunctionOn", {
-            "objectId": obj_id,
-            "functionDeclaration": expr,
-            "returnByValue": True
-        })
-
-        result = self._recv(msg_id)
+        result = self._runtime_call_on(obj_id, "readText")
         
         # Safety for null/undefined results
         res_root = result.get("result", {})
@@ -1229,12 +1898,14 @@ class ChromeCDP:
         return str(val).strip()
     
 
+    @budgeted
     def scrape_table(
         self, 
         table_xpath: str, 
         next_page_xpath: str = None, 
         max_pages: int = 0,
-        total_pages_xpath: str = None
+        total_pages_xpath: str = None,
+        timeout_ms: int = None
     ):
         """
         Scrapes a table into a list of dictionaries.
@@ -1245,6 +1916,8 @@ class ChromeCDP:
             max_pages: Explicit limit (e.g., scrape 5 pages).
             total_pages_xpath: XPath to an element showing "Page 1 of N". 
                                We extract 'N' to determine the limit dynamically.
+            timeout_ms: Budget for the whole scrape (default: ACTION_TIMEOUT per page).
+                        Running out returns the rows collected so far.
         """
         # Safety cap to prevent infinite loops
         SAFETY_LIMIT = 50 
@@ -1277,68 +1950,34 @@ class ChromeCDP:
             print(f"No limit specified. Using safety cap: {limit} pages")
         
         all_data = []
-        
+        with self.budget(timeout_ms or ACTION_TIMEOUT * limit, "scrape_table"):
+            self._scrape_pages(table_xpath, next_page_xpath, limit, all_data)
+        return all_data
+
+    def _scrape_pages(self, table_xpath, next_page_xpath, limit, all_data):
+        """
+        The page loop of scrape_table; rows go into all_data as they are read,
+        so a page that times out still leaves the earlier pages' rows.
+        """
         # 2. Scrape Loop
         for page in range(limit):
-            # A. Ensure page is ready
-            if page > 0:
-                self._ensure_page_actionable()
-                time.sleep(DOM_IDLE_MS / 1000)
-
-            # B. Get Table ID (Re-fetch every loop)
-            table_id = self._get_object_id(table_xpath)
-            if not table_id:
-                print(f"Table not found on page {page + 1}. Stopping.")
+            try:
+                # A. Ensure page is ready
+                if page > 0:
+                    self._ensure_page_actionable()
+                    self._sleep(DOM_IDLE_MS / 1000)
+
+                # B. Get Table ID (Re-fetch every loop)
+                table_id = self._get_object_id(table_xpath)
+                if not table_id:
+                    print(f"Table not found on page {page + 1}. Stopping.")
+                    break
+
+                # C. Scrape Data (JS)
+                response = self._runtime_call_on(table_id, "scrapeTable")
+            except TimeoutError as e:
+                print(f"Page {page + 1} timed out ({e}). Returning {len(all_data)} rows.")
                 break
-                
-            # C. Scrape Data (JS)
-            scraper_js = """
-            function() {
-                const table = this;
-                const data = [];
-                const headers = [];
-                
-                // Headers
-                let headerCells = table.querySelectorAll('thead th');
-                if (headerCells.length === 0) headerCells = table.querySelectorAll('tr:first-child th');
-                headerCells.forEach(th => headers.push(th.innerText.trim()));
-                
-                // Rows
-                let rows = table.querySelectorAll('tbody tr');
-                if (rows.length === 0) rows = table.querySelectorAll('tr');
-                
-                for (const row of rows) {
-                    if (row.querySelector('th')) continue;
-                    const cells = row.querySelectorAll('td');
-                    if (cells.length === 0) continue;
-                    
-                    const rowObj = {};
-                    
-                    cells.forEach((cell, i) => {
-                        // FIX: Use double backslash \\n so Python sends \n to JS
-                        const txt = cell.innerText.trim().replace(/\\n/g, ' ');
-                        
-                        if (headers[i]) {
-                            rowObj[headers[i]] = txt;
-                        } else {
-                            rowObj[`column_${i}`] = txt;
-                        }
-                    });
-                    
-                    data.push(rowObj);
-                }
-                return data;
-            }
-            """
-            
-            msg_id = self._send("Runtime.callFunctionOn", {
-                "objectId": table_id,
-                "functionDeclaration": scraper_js,
-                "returnByValue": True
-            })
-            
-            #Receive Response
-            response = self._recv(msg_id)
 
             #Error Handling (had previous failures here)
             if "exceptionDetails" in response["result"]:
@@ -1369,13 +2008,7 @@ class ChromeCDP:
                     print("Pagination 'Next' button hidden. Stopping.")
                     break
                 
-                is_disabled_msgid = self._send("Runtime.callFunctionOn", {
-                    "objectId": next_id,
-                    "functionDeclaration": "function() { return this.disabled || this.classList.contains('disabled') || this.getAttribute('aria-disabled') === 'true'; }",
-                    "returnByValue": True
-                })
-                
-                response = self._recv(is_disabled_msgid)
+                response = self._runtime_call_on(next_id, "isDisabled")
 
                 # Safety Check 1: Did JS execution fail?
                 if "exceptionDetails" in response.get("result", {}):
@@ -1398,11 +2031,10 @@ class ChromeCDP:
                 print(f"Pagination failed: {e}")
                 self._save_debug_screenshot("pagination_click_failed")
                 break
-                
-        return all_data
     
 
     # ------------ Screenshot tools ------------
+    @budgeted
     def screenshot(self, full_page: bool = True):
         """
         Take a screenshot of the current page.
@@ -1437,6 +2069,7 @@ class ChromeCDP:
     
 
     # ------------ Element state checkers ------------
+    @budgeted
     def is_checked(self, xpath: str) -> bool:
         # 1. Get Stable Reference (first visible element)
         obj_id = self._get_object_id(xpath)
@@ -1444,13 +2077,14 @@ class ChromeCDP:
             return False # Or raise Error if you prefer strictness
 
         # 2. Check state directly on the object
-        result = self._send("Runtime.callFunctionOn", {
+        result = self._recv(self._send("Runtime.callFunctionOn", {
             "objectId": obj_id,
             "functionDeclaration": "function() { return this.checked; }",
             "returnByValue": True
-        })
-        return result["result"]["result"]["value"] is True
+        }))
+        return result.get("result", {}).get("result", {}).get("value") is True
     
+    @budgeted
     def is_selected(self, xpath: str) -> bool:
         # 1. Get Stable Reference
         obj_id = self._get_object_id(xpath)
@@ -1458,16 +2092,17 @@ class ChromeCDP:
             return False
 
         # 2. Check state directly on the object
-        result = self._send("Runtime.callFunctionOn", {
+        result = self._recv(self._send("Runtime.callFunctionOn", {
             "objectId": obj_id,
             "functionDeclaration": "function() { return this.selected; }",
             "returnByValue": True
-        })
-        return result["result"]["result"]["value"] is True
+        }))
+        return result.get("result", {}).get("result", {}).get("value") is True
 
 
     # ---------------- Multi options functions ----------------
     # select option by value / label / index
+    @budgeted
     def select_option(
         self,
         select_xpath: str,
@@ -1488,43 +2123,14 @@ class ChromeCDP:
             self._send("DOM.scrollIntoViewIfNeeded", {"objectId": obj_id})
 
             # 3. Execute Selection Logic on the ID
-            expr = f"""
-            function() {{
-                const select = this;
-                let option = null;
-                
-                if ({json.dumps(value)} !== null) {{
-                    option = [...select.options].find(o => o.value === {json.dumps(value)});
-                }} else if ({json.dumps(label)} !== null) {{
-                    option = [...select.options].find(o => o.text.trim() === {json.dumps(label)});
-                }} else if ({index} !== null) {{
-                    option = select.options[{index}];
-                }}
-
-                if (!option) return false;
-
-                select.value = option.value;
-                option.selected = true;
-
-                select.dispatchEvent(new Event('input', {{ bubbles: true }}));
-                select.dispatchEvent(new Event('change', {{ bubbles: true }}));
-                return true;
-            }}
-            """
-
-            msg_id = self._send("Runtime.callFunctionOn", {
-                "objectId": obj_id,
-                "functionDeclaration": expr,
-                "returnByValue": True
-            })
-            
-            result = self._recv(msg_id)["result"]["result"]
+            result = self._runtime_call_on(obj_id, "selectOption", value, label, index)["result"]["result"]
             if result.get("value") is not True:
                 raise RuntimeError(f"Option not found (Value: {value}, Label: {label}, Index: {index})")
         except Exception as e:
             self._save_debug_screenshot("select_option_failed")
             raise e
 
+    @budgeted
     def select_custom_option(self, trigger_xpath: str, option_text: str):
         """
         Selects an item from a modern dropdown using a 'Best Match' scoring system.
@@ -1536,58 +2142,10 @@ class ChromeCDP:
             # Step 1: Open Dropdown
             print(f"Clicking dropdown trigger: {trigger_xpath}")
             self.click(trigger_xpath)
-            time.sleep(UI_DELAY) 
-
-            # Step 2: Find Best Option using Scoring Logic
-            expr = f"""
-            (function() {{
-                const query = {json.dumps(option_text)}.toLowerCase();
-                const candidates = document.querySelectorAll('li, [role="option"], div, span, a, .item, .option');
-                
-                let bestEl = null;
-                let bestScore = -1;
-                
-                for (const el of candidates) {{
-                    // 1. Strict Visibility Check
-                    const rect = el.getBoundingClientRect();
-                    const style = window.getComputedStyle(el);
-                    if (rect.width < 5 || rect.height < 5 || 
-                        style.visibility === 'hidden' || style.display === 'none' || 
-                        style.opacity === '0') continue;
-                    
-                    const text = el.innerText.toLowerCase().trim();
-                    if (!text.includes(query)) continue;
-                    
-                    // --- SCORING SYSTEM ---
-                    let score = 0;
-                    
-                    // Rule A: Exact Match is King (Score: +100)
-                    if (text === query) score += 100;
-                    
-                    // Rule B: Semantic Tags are Queen (Score: +50)
-                    // Prefer actual list items over generic divs
-                    if (el.tagName === 'LI' || el.getAttribute('role') === 'option') score += 50;
-                    
-                    // Rule C: Penalize "Wrapper" Containers (Score: -1000)
-                    // If a div contains the text but also 50 other characters, it's likely a parent, not the button.
-                    if (text.length > query.length + 50) score -= 1000;
-                    
-                    // Update Best Candidate
-                    if (score > bestScore) {{
-                        bestScore = score;
-                        bestEl = el;
-                    }}
-                }}
-                return bestEl;
-            }})()
-            """
+            self._sleep(UI_DELAY) 
 
-            # 3. Get ID
-            msg_id = self._send("Runtime.evaluate", {
-                "expression": expr, 
-                "returnByValue": False 
-            })
-            result = self._recv(msg_id)
+            # Step 2: Find Best Option using Scoring Logic (returns the element handle)
+            result = self._runtime_eval("bestOption", option_text, False, return_by_value=False)
             remote_obj = result["result"]["result"]
             
             if remote_obj.get("subtype") == "null" or "objectId" not in remote_obj:
@@ -1609,19 +2167,29 @@ class ChromeCDP:
                     "objectId": option_id
                 })
                 
-            time.sleep(STEP_DELAY)
+            self._sleep(STEP_DELAY)
         except Exception as e:
             self._save_debug_screenshot("select_custom_option_failed")
             raise e
 
-    def select_autocomplete_option(self, input_xpath: str, select_text: str):
+    @budgeted
+    def select_autocomplete_option(self, input_xpath: str, select_text: str, timeout_ms: int = None):
         """
         Simpler Autocomplete:
         1. Focuses input.
         2. Types 'select_text' one char at a time.
         3. After EACH char, checks if 'select_text' option is visible.
         4. If found, clicks immediately and stops typing.
+
+        timeout_ms defaults to the page check plus one second per character
+        plus DEFAULT_TIMEOUT for picking the option.
         """
+        if timeout_ms is None:
+            timeout_ms = PAGE_LOAD_TIMEOUT + len(select_text) * (int(AUTO_DELAY * 1000) + 1000) + DEFAULT_TIMEOUT
+        with self.budget(timeout_ms, "select_autocomplete_option"):
+            self._select_autocomplete(input_xpath, select_text)
+
+    def _select_autocomplete(self, input_xpath, select_text):
         try:
             self._ensure_page_actionable()
 
@@ -1637,49 +2205,23 @@ class ChromeCDP:
                 "objectId": obj_id
             })
 
-            #2: Type and Check Loop        
-            check_js = f"""
-            (function() {{
-                const query = {json.dumps(select_text)}.toLowerCase().trim();
-                // Search all potential list items
-                const candidates = document.querySelectorAll('li, [role="option"], div, span, a, .item, .option');
-                
-                for (const el of candidates) {{
-                    // 1. Visibility Check
-                    const style = window.getComputedStyle(el);
-                    if (style.display === 'none' || style.visibility === 'hidden' || style.opacity === '0') continue;
-                    const rect = el.getBoundingClientRect();
-                    if (rect.width < 5 || rect.height < 5) continue;
-
-                    // 2. Text Match
-                    const text = el.innerText.toLowerCase().trim();
-                    
-                    // We want the element that IS the option, not just contains it
-                    // So we check if the text matches closely
-                    if (text === query || (text.includes(query) && text.length < query.length + 30)) {{
-                        return true;
-                    }}
-                }}
-                return false;
-            }})()
-            """
-
+            #2: Type and Check Loop
             found = False
             print(f"Typing '{select_text}'...")
 
             for i, char in enumerate(select_text):
                 # A. Type the character
-                self._send("Input.dispatchKeyEvent", {"type": "keyDown", "key": char})
-                self._send("Input.dispatchKeyEvent", {"type": "char", "text": char})
-                self._send("Input.dispatchKeyEvent", {"type": "keyUp", "key": char})
+                with self.input_batch() as batch:
+                    batch.key("keyDown", key=char)
+                    batch.key("char", text=char)
+                    batch.key("keyUp", key=char)
                 
                 # B. Small delay for JS to react
-                time.sleep(AUTO_DELAY) 
+                self._sleep(AUTO_DELAY) 
 
                 # C. Check if target appeared (Start checking after 2nd char to save resources)
                 if i >= 1: 
-                    msg_id = self._send("Runtime.evaluate", {"expression": check_js})
-                    if self._recv(msg_id)["result"]["result"]["value"]:
+                    if self._runtime_eval("optionVisible", select_text)["result"]["result"].get("value"):
                         print(f"Target '{select_text}' appeared! Stopping input.")
                         found = True
                         break
@@ -1687,7 +2229,7 @@ class ChromeCDP:
             # 3: Click the result
             if not found:
                 # wait one last second
-                time.sleep(1.0)
+                self._sleep(1.0)
                 
             self._select_visible_option(select_text)
         except Exception as e:
@@ -1700,43 +2242,7 @@ class ChromeCDP:
         Helper: Finds and clicks the best matching visible option.
         """
         # Find Best Option using Scoring Logic
-        expr = f"""
-        (function() {{
-            const query = {json.dumps(option_text)}.toLowerCase().trim();
-            const candidates = document.querySelectorAll('li, [role="option"], div, span, a, .item, .option');
-            
-            let bestEl = null;
-            let bestScore = -1;
-            
-            for (const el of candidates) {{
-                // Visibility
-                const rect = el.getBoundingClientRect();
-                const style = window.getComputedStyle(el);
-                if (rect.width < 5 || rect.height < 5 || 
-                    style.visibility === 'hidden' || style.display === 'none' || 
-                    style.opacity === '0') continue;
-                
-                const text = el.innerText.toLowerCase().trim();
-                if (!text.includes(query)) continue;
-                
-                // Scoring
-                let score = 0;
-                if (text === query) score += 100; // Exact match
-                if (el.tagName === 'LI' || el.getAttribute('role') === 'option') score += 50; // Semantic
-                if (text.length > query.length + 50) score -= 1000; // Penalty for wrappers
-                if (el.querySelector('.highlight') || el.classList.contains('highlight')) score += 20;
-
-                if (score > bestScore) {{
-                    bestScore = score;
-                    bestEl = el;
-                }}
-            }}
-            return bestEl;
-        }})()
-        """
-
-        msg_id = self._send("Runtime.evaluate", {"expression": expr, "returnByValue": False})
-        result = self._recv(msg_id)
+        result = self._runtime_eval("bestOption", option_text, True, return_by_value=False)
         remote_obj = result["result"]["result"]
         
         if remote_obj.get("subtype") == "null" or "objectId" not in remote_obj:
@@ -1758,6 +2264,7 @@ class ChromeCDP:
                 "objectId": option_id
             })
 
+    @budgeted
     def multi_select(self, select_xpath: str, values: list[str]):
         try:
             self._ensure_page_actionable()
@@ -1771,38 +2278,7 @@ class ChromeCDP:
             self._send("DOM.scrollIntoViewIfNeeded", {"objectId": obj_id})
 
             # 3. Execute on ID
-            expr = f"""
-            function() {{
-                const select = this;
-                if (!select.multiple) return false;
-
-                const values = {json.dumps(values)};
-                let foundAny = false;
-                
-                for (const option of select.options) {{
-                    if (values.includes(option.value) || values.includes(option.text.trim())) {{
-                        option.selected = true;
-                        foundAny = true;
-                    }} else {{
-                        option.selected = false;
-                    }}
-                }}
-                
-                if (foundAny) {{
-                    select.dispatchEvent(new Event('input', {{ bubbles: true }}));
-                    select.dispatchEvent(new Event('change', {{ bubbles: true }}));
-                }}
-                return true;
-            }}
-            """
-
-            msg_id = self._send("Runtime.callFunctionOn", {
-                "objectId": obj_id,
-                "functionDeclaration": expr,
-                "returnByValue": True
-            })
-            
-            result = self._recv(msg_id)["result"]["result"]
+            result = self._runtime_call_on(obj_id, "multiSelect", values)["result"]["result"]
             if result.get("value") is not True:
                 raise RuntimeError("Multi-select failed or element was not multiple")
         except Exception as e:
@@ -1810,6 +2286,131 @@ class ChromeCDP:
             raise e
 
 
+    # --------------- Action targets ----------------
+    def _prepare_element(self, xpath, scroll=True):
+        """
+        Resolves the first visible match, scrolls it into view and measures it in
+        ONE round trip: __mcp.prepare (measurement, by value) and __mcp.take
+        (element handle) are pipelined and awaited together.
+
+        Returns None if nothing matches, else a dict with objectId, visible,
+        x/y (post-scroll center), hit (center is not covered) and hitTarget.
+
+        A cached objectId for the XPath (or the node discovery reported for it)
+        is re-measured directly instead (one callFunctionOn, no XPath
+        evaluation) as long as it is still connected and visible.
+        """
+        cached = self.locators.get(xpath) or self._resolve_known_node(xpath)
+        if cached:
+            info = self._measure(cached, scroll)
+            if info and info.get("found") and info["visible"]:
+                self.locators.record(True)
+                return info
+            self._forget_locator(xpath, cached)
+        self.locators.record(False)
+
+        token = f"t{next(self._slot_ids)}"
+        for _ in range(3):
+            method, measure = self._runtime_request("prepare", xpath, token, scroll)
+            measure["returnByValue"] = True
+            _, take = self._runtime_request("take", token)
+            take["returnByValue"] = False
+            if self._locator_group():
+                take["objectGroup"] = self._locator_group() # Kept by the locator cache
+
+            measure_id = self._send(method, measure)
+            handle_id = self._send(method, take)
+            measured = self._recv(measure_id)
+            handle = self._recv(handle_id).get("result", {}).get("result", {})
+            if not self._runtime_retry(method, measure, measured):
+                break
+        else:
+            raise RuntimeError("Page runtime could not be installed in the current document")
+
+        info = measured.get("result", {}).get("result", {}).get("value")
+
+        if not isinstance(info, dict) or not info.get("found") or "objectId" not in handle:
+            return None
+        info["objectId"] = handle["objectId"]
+        self._remember_locator(xpath, handle["objectId"])
+        return info
+
+    def _ref_locator(self, value):
+        """
+        The locator behind an element ref from discovery; anything else as is.
+        """
+        if not isinstance(value, str) or not REF_PATTERN.fullmatch(value):
+            return value
+        locator = self.locators.locator_for_ref(value)
+        if locator is None:
+            raise ValueError(
+                f"Unknown element ref '{value}': refs last until the page navigates, run discovery again"
+            )
+        return locator
+
+    def _resolve_known_node(self, xpath):
+        """
+        Handle for a locator whose node discovery already identified, resolved
+        by backendNodeId (no XPath evaluation), or None.
+        """
+        backend_node_id = self.locators.node(xpath)
+        if backend_node_id is None:
+            return None
+        params = {"backendNodeId": backend_node_id}
+        if self._locator_group():
+            params["objectGroup"] = self._locator_group()
+        msg_id = self._send("DOM.resolveNode", params)
+        object_id = self._recv(msg_id).get("result", {}).get("object", {}).get("objectId")
+        if not object_id:
+            self.locators.discard_node(xpath) # Node is gone
+            return None
+        self._remember_locator(xpath, object_id)
+        return object_id
+
+    def _remember_locator(self, xpath, object_id):
+        for evicted in self.locators.put(xpath, object_id):
+            self._send("Runtime.releaseObject", {"objectId": evicted})
+
+    def _forget_locator(self, xpath, object_id):
+        self.locators.discard(xpath)
+        self.locators.discard_node(xpath) # Stale or hidden: resolve by XPath from now on
+        self._send("Runtime.releaseObject", {"objectId": object_id}) # Fails harmlessly if the context is gone
+
+    def _measure(self, object_id, scroll=False):
+        """
+        Re-measures an already resolved element (same fields as _prepare_element).
+        """
+        result = self._runtime_call_on(object_id, "measure", scroll)
+        info = result.get("result", {}).get("result", {}).get("value")
+        if not isinstance(info, dict):
+            return None
+        info["objectId"] = object_id
+        return info
+
+    def _wait_for_target(self, xpath, timeout_ms=DEFAULT_TIMEOUT, scroll=True):
+        """
+        Polls _prepare_element until the element is visible or the timeout expires.
+        """
+        deadline = self._deadline_for(timeout_ms)
+        while True:
+            target = self._prepare_element(xpath, scroll=scroll)
+            if target and target["visible"]:
+                return target
+            if time.monotonic() >= deadline:
+                raise self._timeout_error(f"Element not visible: {xpath}", timeout_ms)
+            self._sleep(STEP_DELAY)
+
+    def _record_cdp_usage(self, entry, before):
+        """
+        Attaches the commands / round trips an action cost to its trace entry.
+        """
+        if entry:
+            self.tracer.record_cdp_usage(
+                entry,
+                self.cdp_stats["commands"] - before["commands"],
+                self.cdp_stats["round_trips"] - before["round_trips"]
+            )
+
     # --------------- Box Model Design ----------------
     def _get_center_via_box_model(self, xpath):
         """
@@ -1819,30 +2420,8 @@ class ChromeCDP:
         # 1. Get the ObjectId of the FIRST VISIBLE match
         # We cannot just use DOM.getDocument because that finds hidden nodes.
         # We use Runtime.evaluate to filter, but return the HANDLE (objectId), not the value.
-        expr = f"""
-        (function () {{
-            const snapshot = document.evaluate("{xpath}", document, null,
-                XPathResult.ORDERED_NODE_SNAPSHOT_TYPE, null);
-            
-            for (let i = 0; i < snapshot.snapshotLength; i++) {{
-                const el = snapshot.snapshotItem(i);
-                const style = window.getComputedStyle(el);
-                const rect = el.getBoundingClientRect();
-                
-                if (rect.width > 0 && style.display !== 'none' && style.visibility !== 'hidden') {{
-                    return el; // Return the actual DOM Node
-                }}
-            }}
-            return null;
-        }})()
-        """
-        
         # returnByValue=False gives us the objectId reference instead of JSON
-        msg_id = self._send("Runtime.evaluate", {
-            "expression": expr, 
-            "returnByValue": False 
-        })
-        result = self._recv(msg_id)
+        result = self._runtime_eval("firstVisible", xpath, return_by_value=False)
         
         # Check if we got a valid object back
         remote_obj = result["result"]["result"]
@@ -1879,35 +2458,28 @@ class ChromeCDP:
         """
         Resolves an XPath to a specific Chrome Remote Object ID.
         This handle survives DOM movements (like sticky headers).
+        Cached per document; a cached handle is reused while it is still
+        connected and visible.
         """
-        expr = f"""
-        (function () {{
-            const snapshot = document.evaluate("{xpath}", document, null,
-                XPathResult.ORDERED_NODE_SNAPSHOT_TYPE, null);
-            
-            for (let i = 0; i < snapshot.snapshotLength; i++) {{
-                const el = snapshot.snapshotItem(i);
-                const style = window.getComputedStyle(el);
-                const rect = el.getBoundingClientRect();
-                
-                // Return the first VISIBLE match
-                if (rect.width > 0 && style.display !== 'none' && style.visibility !== 'hidden') {{
-                    return el; 
-                }}
-            }}
-            return null;
-        }})()
-        """
-        msg_id = self._send("Runtime.evaluate", {
-            "expression": expr, 
-            "returnByValue": False  # CRITICAL: Returns pointer, not data
-        })
-        result = self._recv(msg_id)
+        cached = self.locators.get(xpath) or self._resolve_known_node(xpath)
+        if cached:
+            live = self._runtime_call_on(cached, "isLive").get("result", {}).get("result", {})
+            if live.get("value") is True:
+                self.locators.record(True)
+                return cached
+            self._forget_locator(xpath, cached)
+        self.locators.record(False)
+
+        # returnByValue=False is CRITICAL: returns a pointer to the element, not data
+        result = self._runtime_eval(
+            "firstVisible", xpath, return_by_value=False, object_group=self._locator_group()
+        )
         
         remote_obj = result["result"]["result"]
         if remote_obj.get("subtype") == "null" or "objectId" not in remote_obj:
             return None
-            
+
+        self._remember_locator(xpath, remote_obj["objectId"])
         return remote_obj["objectId"]
     
     def _get_center_by_id(self, object_id):
@@ -1930,91 +2502,21 @@ class ChromeCDP:
             return None
 
     # ---------------- Discovery Helpers ----------------    
+    @budgeted
     def find_elements_by_text(self, query: str):
         """
         Scans the DOM for visible elements matching the query.
         Returns a 'Rich Fingerprint' of attributes for the LLM to analyze.
         """
-        js_script = f"""
-        (function() {{
-            const query = {json.dumps(query)}.toLowerCase().trim();
-            const candidates = [];
-            
-            const selectors = `
-                input, button, a, textarea, select, 
-                [role="button"], [role="link"], [role="menuitem"], [role="tab"],
-                [onclick], 
-                [class*="btn"], [class*="button"], [class*="icon"], [class*="arrow"], [class*="pager"], [class*="pagination"]
-            `;
-            
-            document.querySelectorAll(selectors).forEach(el => {{
-                // 1. Strict Visibility Check
-                const rect = el.getBoundingClientRect();
-                const style = window.getComputedStyle(el);
-                if (rect.width < 1 || rect.height < 1 || style.visibility === 'hidden' || style.display === 'none') return;
-                
-                // 2. Gather All Searchable Attributes
-                const text = (el.innerText || '').toLowerCase();
-                const val = (el.value || '').toLowerCase();
-                const ph = (el.getAttribute('placeholder') || '').toLowerCase();
-                const name = (el.getAttribute('name') || '').toLowerCase();
-                const id = (el.id || '').toLowerCase();
-                const aria = (el.getAttribute('aria-label') || '').toLowerCase();
-                const title = (el.getAttribute('title') || '').toLowerCase();
-                const className = (el.className || '').toLowerCase(); 
-                const role = (el.getAttribute('role') || '').toLowerCase();
-                
-                // 3. The Match Logic
-                if (text.includes(query) || val.includes(query) || ph.includes(query) || 
-                    name.includes(query) || id.includes(query) || aria.includes(query) ||
-                    title.includes(query) || className.includes(query) || role.includes(query)) {{
-                    
-                    // 4. Generate Robust XPath
-                    let xpath = '';
-                    if (el.id) {{
-                        xpath = `//*[@id='${{el.id}}']`;
-                    }} else {{
-                        const tag = el.tagName.toLowerCase();
-                        if (el.innerText && el.innerText.trim().length > 0 && el.innerText.trim().length < 50) {{
-                            const cleanText = el.innerText.trim().replace(/'/g, "");
-                            xpath = `//${{tag}}[contains(normalize-space(.), '${{cleanText}}')]`;
-                        }} else if (el.getAttribute('name')) {{
-                            xpath = `//${{tag}}[@name='${{el.getAttribute('name')}}']`;
-                        }} else if (el.className) {{
-                            // FIX: Changed '#' to '//' for JS comment to prevent Syntax Error
-                            const cleanClass = el.className.trim().split(' ')[0]; // Take first class
-                            if (cleanClass) xpath = `//${{tag}}[contains(@class, '${{cleanClass}}')]`;
-                        }}
-                        
-                        if (!xpath) {{
-                             xpath = `//${{tag}}`;
-                        }}
-                    }}
-                    
-                    // 5. Return The "Whole Shebang"
-                    candidates.push({{
-                        tag: el.tagName.toLowerCase(),
-                        text: (el.innerText || el.value || '').trim().substring(0, 50),
-                        xpath: xpath,
-                        attributes: {{
-                            id: el.id,
-                            class: el.className,
-                            title: el.getAttribute('title'),
-                            role: el.getAttribute('role'),
-                            type: el.getAttribute('type'),
-                            'aria-label': el.getAttribute('aria-label'),
-                            onclick: el.hasAttribute('onclick') ? 'true' : 'false'
-                        }}
-                    }});
-                }}
-            }});
-            return candidates;
-        }})()
-        """
-        
-        # Send command
-        msg_id = self._send("Runtime.evaluate", {"expression": js_script, "returnByValue": True})
-        response = self._recv(msg_id)
+        results = self._catalog_query("catalogFind", query) if DISCOVERY_BACKEND == "catalog" else None
+        if results is not None:
+            return results
+
+        snapshot = self._discovery_snapshot()
+        if snapshot:
+            return self._remember_nodes(snapshot.find_by_text(query))
+
+        response = self._runtime_eval("findByText", query)
 
         # --- ROBUST RESULT EXTRACTION ---
         
@@ -2028,53 +2530,22 @@ class ChromeCDP:
         result_val = response.get("result", {}).get("result", {}).get("value")
         
         # Ensure it's a list (in case JS returned null)
-        return result_val if isinstance(result_val, list) else []
+        return self._map_discovered(result_val) if isinstance(result_val, list) else []
 
+    @budgeted
     def get_all_interactive_elements(self, tag_name: str = "button"):
         """
         Returns a list of ALL visible elements of a specific type.
         """
-        js_script = f"""
-        (function() {{
-            const results = [];
-            let selector = '{tag_name}';
-            if ('{tag_name}' === 'button') selector = 'button, input[type="button"], input[type="submit"], [role="button"]';
-            if ('{tag_name}' === 'input') selector = 'input:not([type="hidden"])';
-            
-            document.querySelectorAll(selector).forEach(el => {{
-                const rect = el.getBoundingClientRect();
-                const style = window.getComputedStyle(el);
-                if (rect.width === 0 || style.visibility === 'hidden' || style.display === 'none') return;
-                
-                let xpath = '';
-                if (el.id) {{
-                    xpath = `//*[@id='${{el.id}}']`;
-                }} else {{
-                    const tag = el.tagName.toLowerCase();
-                    if (el.innerText && el.innerText.trim().length > 0) {{
-                        const cleanText = el.innerText.trim().substring(0, 30).replace(/'/g, "");
-                        xpath = `//${{tag}}[contains(normalize-space(.), '${{cleanText}}')]`;
-                    }} else if (el.getAttribute('name')) {{
-                        xpath = `//${{tag}}[@name='${{el.getAttribute('name')}}']`;
-                    }} else if (el.getAttribute('aria-label')) {{
-                        xpath = `//${{tag}}[@aria-label='${{el.getAttribute('aria-label')}}']`;
-                    }}
-                }}
-                
-                if (xpath) {{
-                    results.push({{
-                        tag: el.tagName,
-                        text: el.innerText || el.value || el.getAttribute('aria-label') || 'N/A',
-                        xpath: xpath,
-                        visible: true
-                    }});
-                }}
-            }});
-            return results;
-        }})()
-        """
-        msg_id = self._send("Runtime.evaluate", {"expression": js_script, "returnByValue": True})
-        response = self._recv(msg_id)
+        results = self._catalog_query("catalogInteractive", tag_name) if DISCOVERY_BACKEND == "catalog" else None
+        if results is not None:
+            return results
+
+        snapshot = self._discovery_snapshot()
+        if snapshot:
+            return self._remember_nodes(snapshot.interactive(tag_name))
+
+        response = self._runtime_eval("interactive", tag_name)
 
         # Robust Extraction
         if "exceptionDetails" in response.get("result", {}):
@@ -2082,94 +2553,227 @@ class ChromeCDP:
             return []
 
         result_val = response.get("result", {}).get("result", {}).get("value")
-        return result_val if isinstance(result_val, list) else []
+        return self._map_discovered(result_val) if isinstance(result_val, list) else []
 
-    # ---------------- Tab Management ----------------
+    @budgeted
+    def rank_elements(self, query: str, k: int = FIND_TOP_K):
+        """
+        The k visible elements that best match query, best first, each with a
+        'score'. Scoring (exact > prefix > tokens > substring > fuzzy over
+        text, aria-label, label, placeholder, name, id, title and value, plus
+        interactive-tag and viewport bonuses) runs in the page over the element
+        catalog, so only the k winners come back over CDP. DISCOVERY_BACKEND
+        does not apply here: the other backends have no ranking.
+        """
+        results = self._catalog_query("catalogRank", query, k)
+        if results is None:
+            raise RuntimeError("Element ranking failed in the page")
+        return results
 
-    def get_tabs(self):
+    def _catalog_query(self, fn, *args):
         """
-        Returns a list of all open browser tabs (targets).
+        Asks the in-page catalog, passing the (doc, version) of the results we
+        already hold for the same question: an unchanged DOM answers with a tiny
+        'unchanged' reply and the cached results are reused. None if the catalog
+        failed.
         """
+        cache = self._active.discovery
+        key = (fn,) + args
+        known = cache.get(key) or {}
         try:
-            response = self.http.get(f"http://localhost:{DEBUG_PORT}/json", timeout=2)
-            if not response.ok: 
-                return []
-            
-            # Filter for pages only (exclude service workers/extensions)
-            pages = [t for t in response.json() if t.get("type") == "page"]
-            return pages
+            reply = self._runtime_eval(fn, *args, known.get("doc"), known.get("version"))
         except Exception as e:
-            print(f"Error fetching tabs: {e}")
-            return []
+            print(f"Catalog discovery failed, falling back: {e}")
+            return None
+        value = reply.get("result", {}).get("result", {}).get("value")
+        if not isinstance(value, dict):
+            return None
+
+        if value.get("unchanged"):
+            cache.move_to_end(key)
+            self._assign_refs(known["results"]) # Same refs unless the locator cache was reset
+            return known["results"]
+        self._map_discovered(value.get("results", []))
+        if value.get("version") is not None:
+            cache[key] = value
+            cache.move_to_end(key)
+            while len(cache) > DISCOVERY_CACHE_SIZE:
+                cache.popitem(last=False)
+        return value.get("results", [])
+
+    def _map_discovered(self, results):
+        """
+        Ties fresh in-page discovery results to their nodes in one pipelined
+        round: the reported elements (__mcp.found) come back as handles, kept by
+        the locator cache under each result's locator, and are described for
+        their backendNodeId. A follow-up action on one of these locators then
+        skips XPath evaluation. Results gain 'ref' and 'backendNodeId'.
+        """
+        self._assign_refs(results)
+        mapped = results[:DISCOVERY_MAP_LIMIT]
+        if not mapped:
+            return results
+        group = self._locator_group()
+        try:
+            reply = self._runtime_eval("found", len(mapped), return_by_value=False, object_group=group)
+            array_id = reply.get("result", {}).get("result", {}).get("objectId")
+            if not array_id:
+                return results
+            msg_id = self._send("Runtime.getProperties", {"objectId": array_id, "ownProperties": True})
+            props = self._recv(msg_id).get("result", {}).get("result", [])
+            self._send("Runtime.releaseObject", {"objectId": array_id})
+            elements = sorted(
+                (int(p["name"]), p["value"]["objectId"])
+                for p in props if p.get("name", "").isdigit() and "objectId" in p.get("value", {})
+            )
+            if len(elements) != len(mapped):
+                return results # Page state moved on since the query
+
+            describe_ids = [self._send("DOM.describeNode", {"objectId": oid}) for _, oid in elements]
+            for item, (_, object_id), msg_id in zip(mapped, elements, describe_ids):
+                node = self._recv(msg_id).get("result", {}).get("node", {})
+                if "backendNodeId" in node:
+                    item["backendNodeId"] = node["backendNodeId"]
+                    self.locators.put_node(item["xpath"], node["backendNodeId"])
+                if group:
+                    self.handles.add(object_id, group)
+                    previous = self.locators.get(item["xpath"])
+                    if previous and previous != object_id:
+                        self._send("Runtime.releaseObject", {"objectId": previous})
+                    self._remember_locator(item["xpath"], object_id)
+        except Exception as e:
+            print(f"Could not map discovered elements to nodes: {e}")
+        return results
+
+    def _assign_refs(self, results):
+        """
+        Gives every discovery result a short ref ('ref': "e42") that action
+        methods accept in place of its locator.
+        """
+        for item in results:
+            item["ref"] = self.locators.ref_for(item["xpath"])
+
+    def _remember_nodes(self, results):
+        """
+        Snapshot results already carry backendNodeId; remember them per locator.
+        """
+        self._assign_refs(results)
+        for item in results[:DISCOVERY_MAP_LIMIT]:
+            if item.get("backendNodeId") is not None:
+                self.locators.put_node(item["xpath"], item["backendNodeId"])
+        return results
+
+    def _discovery_snapshot(self):
+        """
+        Whole-page DOMSnapshot for discovery (one round trip, visibility and
+        geometry of every node included), or None to use the in-page scan.
+        """
+        if DISCOVERY_BACKEND != "snapshot":
+            return None
+        try:
+            return DomSnapshot.capture(self)
+        except Exception as e:
+            print(f"DOMSnapshot discovery failed, scanning in page: {e}")
+            return None
 
+    # ---------------- Tab Management ----------------
+
+    @budgeted
+    def get_tabs(self):
+        """
+        Returns a list of all open browser tabs (targets) of this client's browser
+        context. They are all attached already; no HTTP round trip.
+        """
+        with self._targets_changed:
+            states = list(self._targets.values())
+        return [
+            {
+                "id": state.target_id,
+                "title": state.info.get("title", ""),
+                "url": state.info.get("url", ""),
+                "type": "page",
+                "active": state is self._current,
+            }
+            for state in states
+        ]
+    @budgeted
     def switch_to_tab(self, keyword: str = None, index: int = None):
         """
         Switches the automation connection to a different tab.
+        Every tab is already attached, so this only changes where commands go.
         
         Args:
             keyword: A word to match in the Title or URL (case-insensitive).
             index: 0 for the first tab, -1 for the newest/last tab.
         """
         print(f"Switching tab matching: keyword='{keyword}', index={index}...")
-        
-        # 1. Fetch current tabs
-        # Retry a few times in case the new tab is still initializing
-        target = None
-        for _ in range(5):
-            tabs = self.get_tabs()
-            
-            # Strategy A: Match by Index (e.g., -1 for newest)
-            if index is not None:
-                if 0 <= index < len(tabs):
-                    target = tabs[index]
-                elif index < 0 and abs(index) <= len(tabs):
-                    # Chrome usually appends new tabs to the end of the list
-                    target = tabs[index]
-            
-            # Strategy B: Match by Keyword (Title or URL)
-            elif keyword:
-                for t in tabs:
-                    title = t.get("title", "").lower()
-                    url = t.get("url", "").lower()
-                    if keyword.lower() in title or keyword.lower() in url:
-                        target = t
-                        break
-            
-            if target:
-                break
-            time.sleep(0.5) # Wait for tab to appear
-            
+
+        # 1. Find the tab, waiting (event-driven) in case it is still opening
+        target = self._wait_for_tab(
+            lambda tabs: self._match_tab(tabs, keyword, index),
+            self._deadline_for(NEW_TAB_TIMEOUT)
+        )
+
         if not target:
             raise RuntimeError(f"No tab found matching keyword='{keyword}' or index={index}")
 
-        # 2. Hot-Swap the WebSocket
-        print(f"Connecting to target: {target.get('title')} ({target['id']})")
-        
-        # Close old connection safely
-        if self.ws:
-            try:
-                self.ws.close()
-            except Exception:
-                pass
-        
-        # Connect to new target
-        try:
-            self.ws = websocket.WebSocket()
-            self.ws.connect(target["webSocketDebuggerUrl"], timeout=5)
-            self.ws.settimeout(1)
-        except Exception as e:
-            raise RuntimeError(f"Failed to connect to new tab: {e}")
-
-        # 3. Re-Initialize Domains
-        # The new tab doesn't know we are automating it, so we must re-enable everything.
-        self._inflight_requests = 0 # Reset network counter
-        self._enable_domains()
+        # 2. Point commands at it
+        print(f"Switching to target: {target.info.get('title')} ({target.target_id})")
+        self._current = target
+        self._send("Page.bringToFront")
         self.force_viewport(VIEWPORT_WIDTH, VIEWPORT_HEIGHT)
         
-        # 4. Stabilize
+        # 3. Stabilize
         self._ensure_page_actionable(timeout_ms=5000)
         print("Tab switch successful.")
 
+    @budgeted
+    def open_tab(self, url: str = None, timeout_ms: int = DEFAULT_TIMEOUT):
+        """
+        Opens a background tab in this client's browser context and returns its
+        targetId once it is attached. The current tab does not change; drive the
+        new one with on_tab().
+        """
+        params = {"url": "about:blank", "background": True}
+        if self.browser_context_id:
+            params["browserContextId"] = self.browser_context_id
+        target_id = self.execute("Target.createTarget", params)["targetId"]
+
+        attached = self._wait_for_tab(
+            lambda tabs: any(t.target_id == target_id for t in tabs),
+            self._deadline_for(timeout_ms)
+        )
+        if not attached:
+            raise self._timeout_error(f"new tab {target_id} was not attached", timeout_ms)
+
+        if url:
+            with self.on_tab(target_id):
+                self.execute("Page.navigate", {"url": url})
+        return target_id
+
+    @budgeted
+    def close_tab(self, target_id: str):
+        """
+        Closes one tab. Closing the current tab falls back to the newest remaining one.
+        """
+        self.execute("Target.closeTarget", {"targetId": target_id})
+
+    def _match_tab(self, tabs, keyword=None, index=None):
+        # Strategy A: Match by Index (e.g., -1 for newest; tabs are kept in opening order)
+        if index is not None:
+            if -len(tabs) <= index < len(tabs):
+                return tabs[index]
+            return None
+
+        # Strategy B: Match by Keyword (Title or URL)
+        if keyword:
+            for t in tabs:
+                title = t.info.get("title", "").lower()
+                url = t.info.get("url", "").lower()
+                if keyword.lower() in title or keyword.lower() in url:
+                    return t
+        return None
+
 
     # ---------------- Clean Up Tool ----------------
     def _clean_old_profiles(self, max_age_seconds=300):        
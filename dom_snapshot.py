@@ -0,0 +1,313 @@
+import re
+
+# Computed styles requested per layout node, in this order
+SNAPSHOT_STYLES = ["display", "visibility"]
+
+# Rendered text kept per node (enough for matching and for locators)
+SNAPSHOT_TEXT_LIMIT = 200
+
+DISCOVERY_TAGS = {"INPUT", "BUTTON", "A", "TEXTAREA", "SELECT"}
+DISCOVERY_ROLES = {"button", "link", "menuitem", "tab"}
+DISCOVERY_CLASS_HINTS = ("btn", "button", "icon", "arrow", "pager", "pagination")
+
+# Longest text used as an exact-text locator anchor (as in page_runtime.py)
+TEXT_ANCHOR_MAX = 80
+# textContent gathered per node for anchors; longer subtrees are never anchors
+CONTENT_TEXT_LIMIT = 2000
+
+ELEMENT_NODE = 1
+TEXT_NODE = 3
+CDATA_SECTION_NODE = 4
+DOCUMENT_FRAGMENT_NODE = 11
+
+
+def xpath_literal(value):
+    """
+    value as an XPath string literal (concat() when it holds both quote kinds).
+    """
+    if "'" not in value:
+        return f"'{value}'"
+    if '"' not in value:
+        return f'"{value}"'
+    return "concat(" + ", \"'\", ".join(f"'{part}'" for part in value.split("'")) + ")"
+
+
+def xpath_space(text):
+    """
+    XPath normalize-space(): only ASCII whitespace collapses.
+    """
+    return re.sub(r"[ \t\r\n]+", " ", text).strip()
+
+
+class DomSnapshot:
+    """
+    One DOMSnapshot.captureSnapshot of the main document, read as columns.
+
+    Chrome returns every node's name, attributes, layout box and the computed
+    styles asked for in a single reply (interned strings plus parallel arrays),
+    so visibility and geometry of the whole page cost one round trip and no
+    per-element style/layout work in the page. Columns are decoded lazily.
+    """
+
+    def __init__(self, raw, document_index=0):
+        self.strings = raw["strings"]
+        doc = raw["documents"][document_index]
+        nodes = doc["nodes"]
+        self.parent = nodes.get("parentIndex", [])
+        self.node_type = nodes.get("nodeType", [])
+        self.node_name = nodes.get("nodeName", [])
+        self.node_value = nodes.get("nodeValue", [])
+        self.backend_ids = nodes.get("backendNodeId", [])
+        self._attributes = nodes.get("attributes", [])
+        self._input_values = dict(zip(
+            nodes.get("inputValue", {}).get("index", []),
+            nodes.get("inputValue", {}).get("value", [])
+        ))
+
+        layout = doc["layout"]
+        self._layout_index = {node: i for i, node in enumerate(layout.get("nodeIndex", []))}
+        self._bounds = layout.get("bounds", [])
+        self._styles = layout.get("styles", [])
+        self._layout_text = layout.get("text", [])
+        self._text = None
+        self._locator_index = None
+        self._content = None
+
+    @classmethod
+    def capture(cls, cdp):
+        raw = cdp.execute("DOMSnapshot.captureSnapshot", {"computedStyles": SNAPSHOT_STYLES})
+        return cls(raw)
+
+    def __len__(self):
+        return len(self.node_type)
+
+    # ---------------- Columns ----------------
+    def string(self, index):
+        return self.strings[index] if index is not None and index >= 0 else ""
+
+    def tag(self, i):
+        return self.string(self.node_name[i]).upper()
+
+    def attributes(self, i):
+        flat = self._attributes[i] if i < len(self._attributes) else []
+        return {self.string(flat[k]): self.string(flat[k + 1]) for k in range(0, len(flat) - 1, 2)}
+
+    def input_value(self, i):
+        return self.string(self._input_values.get(i, -1))
+
+    def bounds(self, i):
+        """
+        [x, y, width, height] in document coordinates, or None if not rendered.
+        """
+        li = self._layout_index.get(i)
+        return self._bounds[li] if li is not None else None
+
+    def style(self, i, name):
+        li = self._layout_index.get(i)
+        if li is None:
+            return ""
+        return self.string(self._styles[li][SNAPSHOT_STYLES.index(name)])
+
+    def is_visible(self, i, min_size=1):
+        box = self.bounds(i)
+        if not box or box[2] < min_size or box[3] < min_size:
+            return False
+        return self.style(i, "display") != "none" and self.style(i, "visibility") not in ("hidden", "collapse")
+
+    def text(self, i):
+        """
+        Rendered text of the subtree (like innerText, whitespace-normalised,
+        capped at SNAPSHOT_TEXT_LIMIT).
+        """
+        if self._text is None:
+            self._text = self._aggregate_text()
+        return self._text[i]
+
+    def _aggregate_text(self):
+        # Children always follow their parent, so one reverse pass builds every subtree's text
+        rendered = {}
+        for node, li in self._layout_index.items():
+            if li < len(self._layout_text) and self._layout_text[li] >= 0 and self.node_type[node] == TEXT_NODE:
+                rendered[node] = self.string(self._layout_text[li])
+
+        parts = [[] for _ in self.node_type]
+        text = [""] * len(self.node_type)
+        for i in reversed(range(len(self.node_type))):
+            own = rendered.get(i, "")
+            joined = " ".join([own] + parts[i][::-1]) if own else " ".join(parts[i][::-1])
+            text[i] = re.sub(r"\s+", " ", joined).strip()[:SNAPSHOT_TEXT_LIMIT]
+            parent = self.parent[i] if i < len(self.parent) else -1
+            if parent >= 0 and text[i]:
+                parts[parent].append(text[i])
+        return text
+
+    def raw_name(self, i):
+        return self.string(self.node_name[i])
+
+    def _content_text(self):
+        # textContent per node, None past CONTENT_TEXT_LIMIT; one reverse pass as in _aggregate_text
+        parts = [[] for _ in self.node_type]
+        content = [None] * len(self.node_type)
+        for i in reversed(range(len(self.node_type))):
+            if self.node_type[i] in (TEXT_NODE, CDATA_SECTION_NODE):
+                own = self.string(self.node_value[i]) if i < len(self.node_value) else ""
+            elif None in parts[i]:
+                own = None
+            else:
+                own = "".join(parts[i][::-1])
+            content[i] = own if own is not None and len(own) <= CONTENT_TEXT_LIMIT else None
+            parent = self.parent[i] if i < len(self.parent) else -1
+            if parent >= 0 and self.node_type[i] != DOCUMENT_FRAGMENT_NODE:
+                parts[parent].append(content[i])
+        return content
+
+    def elements(self):
+        return (i for i, t in enumerate(self.node_type) if t == ELEMENT_NODE)
+
+    # ---------------- Locators ----------------
+    def _scope(self, i):
+        name = self.raw_name(i)
+        return name.lower() if name == name.upper() else f"*[local-name()={xpath_literal(name)}]" # e.g. SVG
+
+    def _anchor_text(self, i):
+        text = self._content[i]
+        text = xpath_space(text) if text is not None else ""
+        return text if len(text) <= TEXT_ANCHOR_MAX else ""
+
+    def _build_locator_index(self):
+        """
+        Elements per locator key, in document order, for every element an XPath
+        from the document can reach (not inside shadow roots or templates).
+        """
+        self._content = self._content_text()
+        index = {}
+        hidden = [False] * len(self.node_type)
+        for i in range(len(self.node_type)):
+            parent = self.parent[i] if i < len(self.parent) else -1
+            if parent >= 0:
+                hidden[i] = hidden[parent] or self.node_type[parent] == DOCUMENT_FRAGMENT_NODE
+            if hidden[i] or self.node_type[i] != ELEMENT_NODE or self.raw_name(i).startswith("::"):
+                continue
+            attrs = self.attributes(i)
+            scope = self._scope(i)
+            keys = [(scope,)]
+            keys += [("*", name, attrs[name]) for name in ("id", "data-testid") if attrs.get(name)]
+            keys += [(scope, name, attrs[name]) for name in ("name", "aria-label") if attrs.get(name)]
+            if self._anchor_text(i):
+                keys.append((scope, "text", self._anchor_text(i)))
+            for key in keys:
+                index.setdefault(key, []).append(i)
+        return index
+
+    def unique_xpath(self, i):
+        """
+        First of id, data-testid, name, aria-label and exact-text XPaths that
+        matches only node i, else i's position among the matches of the
+        narrowest of them (same rules as __mcp.uniqueLocator).
+        """
+        if self._locator_index is None:
+            self._locator_index = self._build_locator_index()
+        index = self._locator_index
+        attrs = self.attributes(i)
+        scope = self._scope(i)
+
+        tried = []
+        for name, on in (("id", "*"), ("data-testid", "*"), ("name", scope), ("aria-label", scope)):
+            if attrs.get(name):
+                tried.append((f"//{on}[@{name}={xpath_literal(attrs[name])}]", index.get((on, name, attrs[name]), [])))
+                if len(tried[-1][1]) == 1:
+                    return tried[-1][0]
+        text = self._anchor_text(i)
+        if text:
+            tried.append((f"//{scope}[normalize-space(.)={xpath_literal(text)}]", index.get((scope, "text", text), [])))
+            if len(tried[-1][1]) == 1:
+                return tried[-1][0]
+
+        base, matches = min(
+            ((xpath, matches) for xpath, matches in tried if matches),
+            key=lambda t: len(t[1]),
+            default=(f"//{scope}", index.get((scope,), []))
+        )
+        if i in matches:
+            return f"({base})[{matches.index(i) + 1}]"
+        return base # Not reachable by XPath from the document
+
+    # ---------------- Discovery ----------------
+    def _is_discoverable(self, i, attrs):
+        if self.tag(i) in DISCOVERY_TAGS or "onclick" in attrs:
+            return True
+        if attrs.get("role", "").lower() in DISCOVERY_ROLES:
+            return True
+        css_class = attrs.get("class", "")
+        return any(hint in css_class for hint in DISCOVERY_CLASS_HINTS)
+
+    def find_by_text(self, query):
+        """
+        Visible discoverable elements whose text, value or main attributes
+        contain query (same rules and result shape as __mcp.findByText).
+        """
+        query = query.lower().strip()
+        results = []
+        for i in self.elements():
+            attrs = self.attributes(i)
+            if not self._is_discoverable(i, attrs) or not self.is_visible(i):
+                continue
+            text = self.text(i)
+            value = self.input_value(i)
+            fields = (
+                text, value, attrs.get("placeholder", ""), attrs.get("name", ""), attrs.get("id", ""),
+                attrs.get("aria-label", ""), attrs.get("title", ""), attrs.get("class", ""), attrs.get("role", "")
+            )
+            if not any(query in f.lower() for f in fields):
+                continue
+            results.append({
+                "tag": self.tag(i).lower(),
+                "text": (text or value)[:50],
+                "xpath": self.unique_xpath(i),
+                "backendNodeId": self.backend_ids[i],
+                "attributes": {
+                    "id": attrs.get("id", ""),
+                    "class": attrs.get("class", ""),
+                    "title": attrs.get("title"),
+                    "role": attrs.get("role"),
+                    "type": attrs.get("type"),
+                    "aria-label": attrs.get("aria-label"),
+                    "onclick": "true" if "onclick" in attrs else "false",
+                },
+            })
+        return results
+
+    def interactive(self, tag_name="button"):
+        """
+        Every visible element of one kind (same rules and result shape as
+        __mcp.interactive).
+        """
+        tag_name = tag_name.lower()
+
+        def wanted(i, attrs):
+            tag = self.tag(i)
+            if tag_name == "button":
+                return tag == "BUTTON" or attrs.get("role") == "button" or (
+                    tag == "INPUT" and attrs.get("type", "").lower() in ("button", "submit")
+                )
+            if tag_name == "input":
+                return tag == "INPUT" and attrs.get("type", "").lower() != "hidden"
+            return tag == tag_name.upper()
+
+        results = []
+        for i in self.elements():
+            attrs = self.attributes(i)
+            if not wanted(i, attrs):
+                continue
+            box = self.bounds(i)
+            if not box or box[2] == 0 or not self.is_visible(i, min_size=0):
+                continue
+            text = self.text(i)
+            results.append({
+                "tag": self.tag(i),
+                "text": text or self.input_value(i) or attrs.get("aria-label") or "N/A",
+                "xpath": self.unique_xpath(i),
+                "backendNodeId": self.backend_ids[i],
+                "visible": True,
+            })
+        return results
@@ -0,0 +1,154 @@
+import collections
+import itertools
+import os
+import re
+import threading
+
+# Max locators remembered per page; the least recently used objectId is released beyond it
+LOCATOR_CACHE_SIZE = int(os.getenv("LOCATOR_CACHE_SIZE", "256"))
+
+# Short element refs handed out by discovery ("e42")
+REF_PATTERN = re.compile(r"e\d+")
+
+
+class LocatorCache:
+    """
+    Per-document map from locator (XPath) to the objectId it last resolved to.
+
+    A hit still has to pass a cheap liveness check on the element itself
+    (isConnected + visible) before it is used, but skips XPath evaluation
+    entirely. Everything is dropped when the document's execution context goes
+    away, since its objectIds die with it.
+
+    Locators handed out by discovery also map to the element's backendNodeId,
+    which holds no remote object: when their objectId has been evicted, the
+    node is resolved again by id instead of by XPath. Each of them also gets a
+    short ref ("e42") that stands for the locator until the document goes away;
+    ref numbers are never reused within a tab, so an old ref cannot silently
+    point at an element of a later page.
+    """
+
+    def __init__(self, size=LOCATOR_CACHE_SIZE):
+        self.size = size
+        self._entries = collections.OrderedDict() # locator -> objectId
+        self._nodes = collections.OrderedDict() # locator -> backendNodeId (discovered elements)
+        self._refs = {} # ref -> locator (discovered elements)
+        self._ref_of = {} # locator -> ref
+        self._ref_numbers = itertools.count(1)
+        self._lock = threading.Lock()
+        self._main_context_id = None # Default context of the main frame, once seen
+        self.hits = 0
+        self.misses = 0
+        self.invalidations = 0
+
+    def get(self, locator):
+        with self._lock:
+            object_id = self._entries.get(locator)
+            if object_id is not None:
+                self._entries.move_to_end(locator)
+            return object_id
+
+    def put(self, locator, object_id):
+        """
+        Remembers a resolution; returns objectIds evicted to stay within size
+        (the caller releases them).
+        """
+        evicted = []
+        if self.size <= 0:
+            return evicted
+        with self._lock:
+            self._entries[locator] = object_id
+            self._entries.move_to_end(locator)
+            while len(self._entries) > self.size:
+                evicted.append(self._entries.popitem(last=False)[1])
+        return evicted
+
+    def node(self, locator):
+        with self._lock:
+            return self._nodes.get(locator)
+
+    def put_node(self, locator, backend_node_id):
+        if self.size <= 0:
+            return
+        with self._lock:
+            self._nodes[locator] = backend_node_id
+            self._nodes.move_to_end(locator)
+            while len(self._nodes) > self.size:
+                self._nodes.popitem(last=False)
+
+    def discard_node(self, locator):
+        with self._lock:
+            self._nodes.pop(locator, None)
+
+    def ref_for(self, locator):
+        """
+        The ref of a discovered locator (the same one every time it is seen in
+        this document).
+        """
+        with self._lock:
+            ref = self._ref_of.get(locator)
+            if ref is None:
+                ref = f"e{next(self._ref_numbers)}"
+                self._ref_of[locator] = ref
+                self._refs[ref] = locator
+            return ref
+
+    def locator_for_ref(self, ref):
+        with self._lock:
+            return self._refs.get(ref)
+
+    def record(self, hit):
+        with self._lock:
+            if hit:
+                self.hits += 1
+            else:
+                self.misses += 1
+
+    def discard(self, locator):
+        with self._lock:
+            self._entries.pop(locator, None)
+
+    def clear(self):
+        with self._lock:
+            if self._entries or self._nodes or self._refs:
+                self.invalidations += 1
+            self._entries.clear()
+            self._nodes.clear()
+            self._refs.clear()
+            self._ref_of.clear()
+
+    def handle(self, method, params, main_frame_id=None):
+        """
+        Feeds one CDP event; called from the websocket reader thread.
+        Only the main frame's default context matters: iframes coming and going
+        (ads, widgets) do not invalidate anything once that context is known.
+        """
+        if method == "Runtime.executionContextCreated":
+            context = params.get("context", {})
+            aux = context.get("auxData", {})
+            if aux.get("isDefault") and main_frame_id and aux.get("frameId") == main_frame_id:
+                self._main_context_id = context.get("id")
+
+        elif method == "Runtime.executionContextDestroyed":
+            context_id = params.get("executionContextId")
+            if self._main_context_id is None or context_id == self._main_context_id:
+                self.clear()
+
+        elif method == "Runtime.executionContextsCleared":
+            self.clear()
+
+        elif method == "Page.frameNavigated" and not params.get("frame", {}).get("parentId"):
+            self.clear()
+
+    def stats(self):
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "entries": len(self._entries),
+                "nodes": len(self._nodes),
+                "refs": len(self._refs),
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": round(self.hits / lookups, 3) if lookups else None,
+                "invalidations": self.invalidations,
+            }
@@ -0,0 +1,137 @@
+import json
+import os
+import re
+import threading
+import time
+
+# Resource types that never "finish" in a useful sense (streams, beacons)
+NETWORK_IGNORE_TYPES = os.getenv("NETWORK_IGNORE_TYPES", "WebSocket,EventSource,Ping,CSPViolationReport")
+# JSON list of regexes matched against the request URL (long-polling, analytics, ...)
+# ([.] rather than \. keeps the value free of backslashes, which .env files treat as escapes)
+NETWORK_IGNORE_URLS = os.getenv("NETWORK_IGNORE_URLS", json.dumps([
+    "^data:", "^blob:", "google-analytics[.]com", "googletagmanager[.]com", "doubleclick[.]net",
+    "hotjar[.]com", "segment[.]io", "/collect[?]", "/longpoll", "/socket[.]io/",
+]))
+
+
+def _split(value):
+    return [item.strip() for item in value.split(",") if item.strip()]
+
+
+def _url_patterns(value):
+    """
+    A JSON list of regexes. Anything else is read as the older comma-separated
+    form, which cannot hold a regex with a comma in it (e.g. {2,4}).
+    """
+    if value.lstrip().startswith("["):
+        return [pattern for pattern in json.loads(value) if pattern]
+    return _split(value)
+
+
+class NetworkTracker:
+    """
+    Tracks in-flight requests by requestId from the Network.* event stream.
+
+    Redirects reuse the requestId of the original request, so they never count
+    twice. Requests matching the ignore rules are not tracked at all, which keeps
+    websockets, long-polling and analytics beacons from blocking an idle wait.
+
+    wait_for_idle() sleeps on a condition variable and returns as soon as the
+    quiet window has elapsed; it does not poll.
+    """
+
+    def __init__(self, ignore_types=NETWORK_IGNORE_TYPES, ignore_urls=NETWORK_IGNORE_URLS):
+        if isinstance(ignore_types, str):
+            ignore_types = _split(ignore_types)
+        if isinstance(ignore_urls, str):
+            ignore_urls = _url_patterns(ignore_urls)
+        self.ignore_types = set(ignore_types)
+        self.ignore_urls = [re.compile(p) for p in ignore_urls]
+        self._inflight = {}  # requestId -> (url, resource type, start time)
+        self._idle_since = time.monotonic()
+        self._cond = threading.Condition()
+
+    def is_ignored(self, url, resource_type=None):
+        if resource_type in self.ignore_types:
+            return True
+        return any(p.search(url or "") for p in self.ignore_urls)
+
+    def handle(self, method, params):
+        """
+        Feeds one CDP event; called from the websocket reader thread.
+        """
+        if method == "Network.requestWillBeSent":
+            request_id = params.get("requestId")
+            request = params.get("request", {})
+            url = request.get("url", "")
+            resource_type = params.get("type")
+            with self._cond:
+                if request_id in self._inflight:
+                    # Redirect hop: same request, new URL
+                    self._inflight[request_id] = (url, resource_type, self._inflight[request_id][2])
+                    return
+                if self.is_ignored(url, resource_type):
+                    return
+                self._inflight[request_id] = (url, resource_type, time.monotonic())
+                self._idle_since = None
+                self._cond.notify_all()
+
+        elif method in ("Network.loadingFinished", "Network.loadingFailed"):
+            self._finish(params.get("requestId"))
+
+    def _finish(self, request_id):
+        with self._cond:
+            if self._inflight.pop(request_id, None) is None:
+                return
+            if not self._inflight:
+                self._idle_since = time.monotonic()
+            self._cond.notify_all()
+
+    @property
+    def inflight(self):
+        with self._cond:
+            return len(self._inflight)
+
+    def idle_ms(self):
+        """
+        How long no tracked request has been in flight (0 while busy).
+        """
+        with self._cond:
+            if self._idle_since is None:
+                return 0
+            return (time.monotonic() - self._idle_since) * 1000
+
+    def pending(self, limit=5):
+        """
+        URLs of the oldest in-flight requests, for timeout messages.
+        """
+        with self._cond:
+            entries = sorted(self._inflight.values(), key=lambda e: e[2])
+        return [url for url, _, _ in entries[:limit]]
+
+    def wait_for_idle(self, idle_ms, timeout_ms, check=None, check_interval=0.1):
+        """
+        Blocks until no tracked request has been in flight for idle_ms.
+        Returns False on timeout. `check` (if given) is called at least every
+        check_interval seconds and may raise to abort the wait.
+        """
+        deadline = time.monotonic() + timeout_ms / 1000
+        idle = idle_ms / 1000
+
+        with self._cond:
+            while True:
+                now = time.monotonic()
+                if self._idle_since is not None and now - self._idle_since >= idle:
+                    return True
+                if now >= deadline:
+                    return False
+
+                # Idle: sleep until the quiet window ends. Busy: until something finishes.
+                wait = deadline - now
+                if self._idle_since is not None:
+                    wait = min(wait, self._idle_since + idle - now)
+                if check is not None:
+                    wait = min(wait, check_interval)
+                self._cond.wait(wait)
+                if check is not None:
+                    check()
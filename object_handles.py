@@ -0,0 +1,87 @@
+import collections
+import threading
+
+# Methods whose reply can create a remote object (and accept an objectGroup)
+HANDLE_METHODS = ("Runtime.evaluate", "Runtime.callFunctionOn", "DOM.resolveNode")
+
+# Group for handles that outlive one action (the locator cache)
+LOCATOR_GROUP = "mcp-locators"
+
+# Bucket for handles created outside any group (released only by navigation)
+UNGROUPED = "(ungrouped)"
+
+
+class HandleTracker:
+    """
+    Counts the remote objects a tab's renderer is keeping alive for us, by
+    object group. Handles are recorded from command replies and dropped when
+    their group or object is released, or when the main document goes away
+    (its objects die with it).
+
+    This mirrors what we asked Chrome to keep; it is how we confirm the
+    handle count stays flat over long sessions.
+    """
+
+    def __init__(self):
+        self._objects = {} # objectId -> group
+        self._lock = threading.Lock()
+        self.created = 0
+        self.released = 0
+
+    def add(self, object_id, group=None):
+        with self._lock:
+            if object_id not in self._objects:
+                self.created += 1
+            self._objects[object_id] = group or UNGROUPED
+
+    def add_from_reply(self, method, group, msg):
+        """
+        Records the handles in one reply to a HANDLE_METHODS command (the result
+        and, for a thrown exception, the exception object).
+        """
+        result = msg.get("result", {})
+        remote = result.get("object") if method == "DOM.resolveNode" else result.get("result")
+        exception = result.get("exceptionDetails", {}).get("exception")
+        for obj in (remote, exception):
+            if obj and "objectId" in obj:
+                self.add(obj["objectId"], group)
+
+    def release(self, object_id):
+        with self._lock:
+            if self._objects.pop(object_id, None) is not None:
+                self.released += 1
+
+    def release_group(self, group):
+        with self._lock:
+            gone = [oid for oid, g in self._objects.items() if g == group]
+            for oid in gone:
+                del self._objects[oid]
+            self.released += len(gone)
+
+    def clear(self):
+        with self._lock:
+            self.released += len(self._objects)
+            self._objects.clear()
+
+    def handle(self, method, params):
+        """
+        Feeds one CDP event; called from the websocket reader thread.
+        """
+        if method == "Runtime.executionContextsCleared":
+            self.clear()
+        elif method == "Page.frameNavigated" and not params.get("frame", {}).get("parentId"):
+            self.clear()
+
+    @property
+    def live(self):
+        with self._lock:
+            return len(self._objects)
+
+    def stats(self):
+        with self._lock:
+            return {
+                "live": len(self._objects),
+                "by_group": dict(collections.Counter(self._objects.values())),
+                "created": self.created,
+                "released": self.released,
+            }
@@ -0,0 +1,125 @@
+import threading
+
+# Name of the Runtime binding the page runtime calls on the first mutation after a settle
+DIRTY_BINDING = "__mcpDirty"
+
+
+class PageReadiness:
+    """
+    Cached answer to "is the page actionable?", so an action on a page that has
+    not changed since the last full check costs no CDP traffic at all.
+
+    States:
+        loading  - a main-frame navigation started and 'load' has not fired yet
+        loaded   - the document loaded but has not been verified stable since
+        ready    - a full check passed and nothing has happened since
+
+    Anything that can change what is on screen bumps an epoch: navigations,
+    lifecycle events and execution-context resets bump nav_epoch; the page
+    runtime calls the DIRTY_BINDING on its first DOM mutation after a settle,
+    which bumps mutation_epoch. A verification is only reused while both epochs
+    are unchanged.
+    """
+
+    def __init__(self, main_frame_id=None):
+        self.main_frame_id = main_frame_id
+        self.nav_epoch = 0
+        self.mutation_epoch = 0
+        self.loading = False
+        self._verified = None
+        self._lock = threading.Lock()
+        self.checks = 0 # full checks passed so far; see is_ready(since=...)
+        self.hits = 0
+        self.misses = 0
+
+    def _is_main(self, frame_id):
+        # Until the main frame is known, treat every frame as main (only costs a re-check)
+        return self.main_frame_id is None or frame_id == self.main_frame_id
+
+    def _navigated(self):
+        self.nav_epoch += 1
+        self.loading = True
+
+    def handle(self, method, params):
+        """
+        Feeds one CDP event; called from the websocket reader thread.
+        """
+        with self._lock:
+            if method == "Page.lifecycleEvent":
+                if not self._is_main(params.get("frameId")):
+                    return
+                name = params.get("name")
+                if name == "init":
+                    self._navigated()
+                elif name == "load":
+                    self.loading = False
+                    self.nav_epoch += 1
+
+            elif method == "Page.frameStartedLoading":
+                if self._is_main(params.get("frameId")):
+                    self._navigated()
+
+            elif method == "Page.frameNavigated":
+                frame = params.get("frame", {})
+                if not frame.get("parentId"):
+                    self.main_frame_id = frame.get("id")
+                self.nav_epoch += 1 # iframe content is invisible to the page's MutationObserver
+
+            elif method == "Runtime.executionContextsCleared":
+                self.nav_epoch += 1
+
+            elif method == "Runtime.bindingCalled" and params.get("name") == DIRTY_BINDING:
+                self.mutation_epoch += 1
+
+    def snapshot(self):
+        """
+        Epochs to pass to mark_verified() once a full check that started now passes.
+        """
+        with self._lock:
+            return (self.nav_epoch, self.mutation_epoch)
+
+    def mark_verified(self, snapshot):
+        with self._lock:
+            self._verified = snapshot
+            self.checks += 1
+            if snapshot[0] == self.nav_epoch:
+                self.loading = False # readyState was 'complete' during the check
+
+    def is_ready(self, since=None):
+        """
+        True if the last full check still holds. `since` is the `checks` count
+        taken when an action script started: once a full check has passed after
+        that point, DOM mutations are tolerated (only a navigation invalidates
+        it), since the script's own typing and clicking mutate the page. Until
+        then the script gets no relaxation at all.
+        """
+        with self._lock:
+            if since is not None:
+                verified = (self.checks > since and self._verified is not None
+                            and self._verified[0] == self.nav_epoch)
+            else:
+                verified = self._verified == (self.nav_epoch, self.mutation_epoch)
+            ready = not self.loading and verified
+            if ready:
+                self.hits += 1
+            else:
+                self.misses += 1
+            return ready
+
+    @property
+    def state(self):
+        with self._lock:
+            if self.loading:
+                return "loading"
+            if self._verified == (self.nav_epoch, self.mutation_epoch):
+                return "ready"
+            return "loaded"
+
+    def stats(self):
+        return {
+            "state": self.state,
+            "nav_epoch": self.nav_epoch,
+            "mutation_epoch": self.mutation_epoch,
+            "hits": self.hits,
+            "misses": self.misses,
+        }
@@ -0,0 +1,1235 @@
+"""
+In-page helper library installed once per document as `window.__mcp`.
+
+ChromeCDP registers it with Page.addScriptToEvaluateOnNewDocument (so every new
+document gets it before page scripts run) and evaluates it once in the current
+document. Calls then go through one constant Runtime.callFunctionOn declaration
+with the arguments passed as values (see ChromeCDP._runtime_request) instead of
+re-sending (and re-compiling) JS source on every poll.
+
+Bump PAGE_RUNTIME_VERSION whenever PAGE_RUNTIME_JS changes so an older copy
+left in a long-lived document is replaced.
+"""
+
+PAGE_RUNTIME_VERSION = 15
+
+# Returned by the call guard when the library is missing from the current document
+RUNTIME_MISSING = "__mcp_missing__"
+
+PAGE_RUNTIME_JS = """
+(function () {
+    const VERSION = %(version)d;
+    if (window.__mcp && window.__mcp.version >= VERSION) return;
+
+    const OPTION_SELECTOR = 'li, [role="option"], div, span, a, .item, .option';
+    const DISCOVERY_SELECTOR = `
+        input, button, a, textarea, select,
+        [role="button"], [role="link"], [role="menuitem"], [role="tab"],
+        [onclick],
+        [class*="btn"], [class*="button"], [class*="icon"], [class*="arrow"], [class*="pager"], [class*="pagination"]
+    `;
+
+    // ---------------- Visibility ----------------
+    function isShown(el) {
+        const style = window.getComputedStyle(el);
+        return style.display !== 'none' && style.visibility !== 'hidden';
+    }
+
+    function hasBox(el, minSize) {
+        const r = el.getBoundingClientRect();
+        return r.width > (minSize || 0) && r.height > (minSize || 0);
+    }
+
+    // ---------------- Locators ----------------
+    // A locator is a bare XPath or "<engine>=<body>". Every engine is a generator
+    // yielding candidates lazily in document order, so a caller filtering for
+    // visibility stops at the first visible match instead of materialising all.
+    function normalize(s) {
+        return (s || '').replace(/\\s+/g, ' ').trim();
+    }
+
+    // "quoted" matches exactly (whitespace-normalised); unquoted is a case-insensitive substring
+    function textMatcher(query) {
+        query = query.trim();
+        const q = query[0];
+        if (query.length >= 2 && (q === '"' || q === "'") && query[query.length - 1] === q) {
+            const exact = normalize(query.slice(1, -1));
+            return s => normalize(s) === exact;
+        }
+        const needle = normalize(query).toLowerCase();
+        return s => normalize(s).toLowerCase().includes(needle);
+    }
+
+    // //*[@id='x'] / //*[@id="x"] -> 'x', else null
+    function idFastPath(xpath) {
+        const prefix = '//*[@id=';
+        if (!xpath.startsWith(prefix) || !xpath.endsWith(']')) return null;
+        const quoted = xpath.slice(prefix.length, -1);
+        const q = quoted[0];
+        if (quoted.length < 2 || (q !== '"' && q !== "'") || quoted[quoted.length - 1] !== q) return null;
+        const id = quoted.slice(1, -1);
+        return id.includes(q) ? null : id;
+    }
+
+    function* byXPath(xpath) {
+        const id = idFastPath(xpath);
+        let seen = null;
+        if (id !== null) {
+            seen = document.getElementById(id);
+            if (!seen) return;
+            yield seen;
+            // Still here: rejected by the caller, so look for duplicate ids
+        }
+        const it = document.evaluate(xpath, document, null, XPathResult.ORDERED_NODE_ITERATOR_TYPE, null);
+        for (let node = it.iterateNext(); node; node = it.iterateNext()) {
+            const el = node.nodeType === Node.ELEMENT_NODE ? node : node.parentElement; // text() -> its element
+            if (el && el !== seen) yield el;
+        }
+    }
+
+    function* byCss(selector) {
+        yield* document.querySelectorAll(selector);
+    }
+
+    const NON_TEXT_TAGS = ['SCRIPT', 'STYLE', 'NOSCRIPT', 'TEMPLATE'];
+    const VALUE_BUTTON_TYPES = ['button', 'submit', 'reset'];
+
+    function* byText(query) {
+        const matches = textMatcher(query);
+        const root = document.body || document.documentElement;
+        const seen = new Set();
+        const walker = document.createTreeWalker(root, NodeFilter.SHOW_ELEMENT | NodeFilter.SHOW_TEXT);
+        while (walker.nextNode()) {
+            const node = walker.currentNode;
+            let el = null;
+            if (node.nodeType === Node.TEXT_NODE) {
+                const parent = node.parentElement;
+                if (parent && !NON_TEXT_TAGS.includes(parent.tagName) && matches(node.nodeValue)) el = parent;
+            } else if (node.tagName === 'INPUT' && VALUE_BUTTON_TYPES.includes(node.type) && matches(node.value)) {
+                el = node; // Its label is the value attribute, not a text node
+            }
+            if (el && !seen.has(el)) {
+                seen.add(el);
+                yield el;
+            }
+        }
+        if (seen.size) return;
+        // Text split across inline children ("Sign <b>in</b>"): deepest element whose text matches
+        for (const el of root.querySelectorAll('*')) {
+            if (NON_TEXT_TAGS.includes(el.tagName) || !matches(el.textContent)) continue;
+            if (!Array.from(el.children).some(child => matches(child.textContent))) yield el;
+        }
+    }
+
+    const IMPLICIT_ROLES = {
+        button: 'button, input[type="button"], input[type="submit"], input[type="reset"], input[type="image"], summary',
+        link: 'a[href], area[href]',
+        textbox: 'input:not([type]), input[type="text"], input[type="email"], input[type="tel"], input[type="url"], input[type="password"], textarea',
+        searchbox: 'input[type="search"]',
+        checkbox: 'input[type="checkbox"]',
+        radio: 'input[type="radio"]',
+        combobox: 'select:not([multiple])',
+        listbox: 'select[multiple]',
+        option: 'option',
+        slider: 'input[type="range"]',
+        spinbutton: 'input[type="number"]',
+        heading: 'h1, h2, h3, h4, h5, h6',
+        img: 'img[alt]',
+        list: 'ul, ol',
+        listitem: 'li',
+        table: 'table',
+        row: 'tr',
+        cell: 'td',
+        dialog: 'dialog',
+        form: 'form',
+        navigation: 'nav',
+        main: 'main',
+    };
+
+    function roleOf(el) {
+        const explicit = (el.getAttribute('role') || '').trim().split(' ')[0];
+        if (explicit) return explicit.toLowerCase();
+        for (const role in IMPLICIT_ROLES) {
+            if (el.matches(IMPLICIT_ROLES[role])) return role;
+        }
+        return null;
+    }
+
+    function labelledByText(el) {
+        const ids = (el.getAttribute('aria-labelledby') || '').split(' ').filter(Boolean);
+        return ids.map(id => {
+            const node = document.getElementById(id);
+            return node ? node.textContent : '';
+        }).join(' ');
+    }
+
+    // Simplified accessible name: aria-labelledby, aria-label, <label>, value/alt, text, title/placeholder
+    function accessibleName(el) {
+        const labelledBy = labelledByText(el);
+        if (normalize(labelledBy)) return labelledBy;
+        const aria = el.getAttribute('aria-label');
+        if (normalize(aria)) return aria;
+        if (el.labels && el.labels.length) return Array.from(el.labels).map(l => l.textContent).join(' ');
+        if (el.tagName === 'INPUT' && VALUE_BUTTON_TYPES.includes(el.type)) return el.value;
+        if (el.tagName === 'IMG') return el.alt;
+        if (normalize(el.textContent)) return el.textContent;
+        return el.getAttribute('title') || el.getAttribute('placeholder') || '';
+    }
+
+    // role=button  |  role=button[name="Save"]  |  role=link[name=more]
+    function* byRole(body) {
+        const open = body.indexOf('[');
+        const role = (open < 0 ? body : body.slice(0, open)).trim().toLowerCase();
+        let matches = null;
+        if (open >= 0) {
+            const attr = body.slice(open + 1, body.lastIndexOf(']')).trim();
+            if (attr.startsWith('name=')) matches = textMatcher(attr.slice(5));
+        }
+        const selector = IMPLICIT_ROLES[role] ? '[role], ' + IMPLICIT_ROLES[role] : '[role]';
+        for (const el of document.querySelectorAll(selector)) {
+            if (roleOf(el) !== role) continue;
+            if (matches && !matches(accessibleName(el))) continue;
+            yield el;
+        }
+    }
+
+    const LABELLED_SELECTOR = 'input, textarea, select, [contenteditable=""], [contenteditable="true"], ' +
+        '[role="textbox"], [role="searchbox"], [role="combobox"], [role="checkbox"], [role="radio"], ' +
+        '[role="switch"], [role="slider"], [role="spinbutton"]';
+
+    // Form controls by <label> (for= or wrapping), aria-label or aria-labelledby
+    function* byLabel(query) {
+        const matches = textMatcher(query);
+        for (const el of document.querySelectorAll(LABELLED_SELECTOR)) {
+            const texts = el.labels ? Array.from(el.labels).map(l => l.textContent) : [];
+            texts.push(el.getAttribute('aria-label') || '', labelledByText(el));
+            if (texts.some(t => normalize(t) && matches(t))) yield el;
+        }
+    }
+
+    // Pluggable: __mcp.engines.<name> = function* (body) { ... } adds "<name>=..." locators
+    const ENGINES = { xpath: byXPath, css: byCss, text: byText, role: byRole, label: byLabel };
+
+    function candidates(locator) {
+        const m = /^([a-z][a-z0-9_-]*)=/.exec(locator);
+        if (m && Object.prototype.hasOwnProperty.call(ENGINES, m[1])) {
+            return ENGINES[m[1]](locator.slice(m[0].length));
+        }
+        return byXPath(locator);
+    }
+
+    function firstMatch(locator, accept) {
+        for (const el of candidates(locator)) {
+            if (!accept || accept(el)) return el;
+        }
+        return null;
+    }
+
+    // First match that is rendered with a width (the element actions operate on)
+    function firstVisible(locator) {
+        return firstMatch(locator, el => el.getBoundingClientRect().width > 0 && isShown(el));
+    }
+
+    // First match that is not display:none / visibility:hidden (size ignored)
+    function firstShown(locator) {
+        return firstMatch(locator, isShown);
+    }
+
+    function hasVisible(locator) {
+        return !!firstMatch(locator, el => hasBox(el) && isShown(el));
+    }
+
+    function firstNodeVisible(locator) {
+        const el = firstMatch(locator);
+        return !!el && isShown(el) && hasBox(el);
+    }
+
+    // ---------------- Page state ----------------
+    let lastMutation = Date.now();
+    // Disarmed until the page has settled once; then the first mutation is
+    // reported to Python (readiness cache) and reporting disarms again.
+    let dirtyReported = true;
+    function observe() {
+        new MutationObserver(() => {
+            lastMutation = Date.now();
+            if (!dirtyReported) {
+                dirtyReported = true;
+                if (typeof window.__mcpDirty === 'function') window.__mcpDirty('');
+            }
+        }).observe(document, { subtree: true, childList: true, attributes: true });
+    }
+
+    function domIdleMs() {
+        return Date.now() - lastMutation;
+    }
+
+    function textVisible(text) {
+        if (!document.body) return false;
+        const walker = document.createTreeWalker(document.body, NodeFilter.SHOW_TEXT, null, false);
+        while (walker.nextNode()) {
+            const node = walker.currentNode;
+            if (node.nodeValue && node.nodeValue.includes(text)) {
+                const parent = node.parentElement;
+                if (parent && isShown(parent)) return true;
+            }
+        }
+        return false;
+    }
+
+    // ---------------- Waits ----------------
+    // Resolves true as soon as check() holds, false at the deadline. Re-checks on
+    // DOM mutations (coalesced per animation frame) plus a slow timer for changes
+    // no mutation reports (CSS transitions, media queries, background tabs).
+    function until(check, timeoutMs) {
+        return new Promise(resolve => {
+            let done = false, frame = null, observer = null, timer = null, poll = null;
+            const finish = value => {
+                if (done) return;
+                done = true;
+                if (observer) observer.disconnect();
+                if (frame !== null) cancelAnimationFrame(frame);
+                clearTimeout(timer);
+                clearInterval(poll);
+                resolve(value);
+            };
+            const test = () => {
+                frame = null;
+                try { if (check()) finish(true); } catch (e) { /* keep waiting */ }
+            };
+            test();
+            if (done) return;
+            observer = new MutationObserver(() => {
+                if (frame === null) frame = requestAnimationFrame(test);
+            });
+            observer.observe(document, { subtree: true, childList: true, attributes: true, characterData: true });
+            poll = setInterval(test, 250);
+            timer = setTimeout(() => finish(false), timeoutMs);
+        });
+    }
+
+    function untilVisible(locator, timeoutMs) {
+        return until(() => hasVisible(locator), timeoutMs);
+    }
+
+    function untilNodeVisible(locator, timeoutMs) {
+        return until(() => firstNodeVisible(locator), timeoutMs);
+    }
+
+    function untilText(text, timeoutMs) {
+        return until(() => textVisible(text), timeoutMs);
+    }
+
+    // Resolves once no mutation has been seen for idleMs; timer-driven, no polling
+    function untilDomIdle(idleMs, timeoutMs) {
+        return new Promise(resolve => {
+            const deadline = Date.now() + timeoutMs;
+            const check = () => {
+                const idle = domIdleMs();
+                if (idle >= idleMs) {
+                    dirtyReported = false;
+                    return resolve(true);
+                }
+                const wait = idleMs - idle;
+                // The quiet window cannot complete in time: fail at the deadline
+                if (Date.now() + wait > deadline) return setTimeout(() => resolve(false), Math.max(0, deadline - Date.now()));
+                setTimeout(check, wait);
+            };
+            check();
+        });
+    }
+
+    // ---------------- Action targets ----------------
+    // Elements resolved by prepare(), claimed by take() in the pipelined follow-up call
+    const slots = {};
+
+    function describe(el) {
+        let out = el.tagName.toLowerCase();
+        if (el.id) out += '#' + el.id;
+        if (typeof el.className === 'string' && el.className.trim()) out += '.' + el.className.trim().split(/\\s+/)[0];
+        return out;
+    }
+
+    // What fill() needs to pick a text entry strategy; null for non-text elements
+    function fieldInfo(el) {
+        const tag = el.tagName.toLowerCase();
+        if (tag !== 'input' && tag !== 'textarea' && !el.isContentEditable) return null;
+        return {
+            type: tag === 'input' ? (el.type || 'text') : tag,
+            editable: el.isContentEditable,
+            // Widgets that react to individual keystrokes rather than the final value
+            keyed: el.hasAttribute('data-mask') || el.hasAttribute('data-inputmask') ||
+                el.getAttribute('role') === 'combobox' || el.hasAttribute('aria-autocomplete') ||
+                el.hasAttribute('list')
+        };
+    }
+
+    function fieldValue(el) {
+        if (el.isContentEditable) return el.innerText.replace(/\\n$/, '');
+        return 'value' in el ? el.value : null;
+    }
+
+    // Scrolls el into view if needed and reports where a real click would land
+    function measure(el, scroll) {
+        if (!el.isConnected) return { found: false };
+        let scrolled = false;
+        if (scroll) {
+            const b = el.getBoundingClientRect();
+            if (b.top < 0 || b.left < 0 || b.bottom > window.innerHeight || b.right > window.innerWidth) {
+                el.scrollIntoView({ block: 'center', inline: 'center', behavior: 'instant' });
+                scrolled = true;
+            }
+        }
+        const r = el.getBoundingClientRect();
+        const x = r.left + r.width / 2;
+        const y = r.top + r.height / 2;
+        const top = document.elementFromPoint(x, y);
+        return {
+            field: fieldInfo(el),
+            found: true,
+            visible: r.width > 0 && r.height > 0 && isShown(el),
+            x: x,
+            y: y,
+            scrolled: scrolled,
+            hit: !!top && (top === el || el.contains(top)),
+            hitTarget: top ? describe(top) : null
+        };
+    }
+
+    // Cheap validation of a cached element handle
+    function isLive(el) {
+        return el.isConnected && hasBox(el) && isShown(el);
+    }
+
+    function prepare(locator, token, scroll) {
+        const el = firstVisible(locator);
+        if (!el) return { found: false };
+        slots[token] = el;
+        return measure(el, scroll);
+    }
+
+    function take(token) {
+        const el = slots[token] || null;
+        delete slots[token];
+        return el;
+    }
+
+    // ---------------- Element actions ----------------
+    function hoverEvents(el) {
+        if (!el) return;
+        ['mouseover', 'mouseenter', 'pointerover', 'pointerenter'].forEach(type => {
+            el.dispatchEvent(new MouseEvent(type, {
+                view: window,
+                bubbles: true,
+                cancelable: true,
+                buttons: 0,
+                clientX: el.getBoundingClientRect().left,
+                clientY: el.getBoundingClientRect().top
+            }));
+        });
+    }
+
+    function hoverLocator(locator) {
+        hoverEvents(firstShown(locator));
+    }
+
+    function clearInput(locator) {
+        const el = firstMatch(locator);
+        if (!el) return false;
+        el.value = '';
+        el.dispatchEvent(new Event('input', { bubbles: true }));
+        el.dispatchEvent(new Event('change', { bubbles: true }));
+        return true;
+    }
+
+    function scrollToShown(locator) {
+        const el = firstShown(locator);
+        if (!el) return false;
+        el.scrollIntoView({ block: 'center', inline: 'center', behavior: 'instant' });
+        return true;
+    }
+
+    function readText(el) {
+        const tag = el.tagName.toLowerCase();
+        const inputTypes = ['text', 'password', 'email', 'number', 'search', 'url', 'tel', 'date'];
+
+        // 1. Form Fields (Input, Textarea)
+        if (tag === 'textarea' || (tag === 'input' && inputTypes.includes(el.type))) {
+            return el.value || el.getAttribute('placeholder') || '';
+        }
+        // 2. Buttons: <input type="button" value="Save"> vs <button>Save</button>
+        if (tag === 'input' && ['button', 'submit', 'reset'].includes(el.type)) {
+            return el.value || '';
+        }
+        // 3. Dropdowns
+        if (tag === 'select') {
+            return el.options[el.selectedIndex].text || '';
+        }
+        // 4. Wrapper Logic (e.g., <td><input value="123"></td>)
+        const childInput = el.querySelector('input, textarea, select');
+        if (childInput) {
+            const directText = el.innerText.replace(childInput.value || '', '').trim();
+            if (directText.length === 0) {
+                if (childInput.tagName.toLowerCase() === 'select') {
+                    return childInput.options[childInput.selectedIndex].text || '';
+                }
+                return childInput.value || childInput.getAttribute('placeholder') || '';
+            }
+        }
+        // 5. Universal Fallback (h1, p, div, span, li, a, label, th, td...)
+        return el.innerText || el.textContent || '';
+    }
+
+    function isDisabled(el) {
+        return el.disabled || el.classList.contains('disabled') || el.getAttribute('aria-disabled') === 'true';
+    }
+
+    function scrapeTable(table) {
+        const data = [];
+        const headers = [];
+
+        let headerCells = table.querySelectorAll('thead th');
+        if (headerCells.length === 0) headerCells = table.querySelectorAll('tr:first-child th');
+        headerCells.forEach(th => headers.push(th.innerText.trim()));
+
+        let rows = table.querySelectorAll('tbody tr');
+        if (rows.length === 0) rows = table.querySelectorAll('tr');
+
+        for (const row of rows) {
+            if (row.querySelector('th')) continue;
+            const cells = row.querySelectorAll('td');
+            if (cells.length === 0) continue;
+
+            const rowObj = {};
+            cells.forEach((cell, i) => {
+                const txt = cell.innerText.trim().replace(/\\n/g, ' ');
+                rowObj[headers[i] || `column_${i}`] = txt;
+            });
+            data.push(rowObj);
+        }
+        return data;
+    }
+
+    // ---------------- Selects ----------------
+    function selectOption(select, value, label, index) {
+        let option = null;
+        // Loose != so both null and a missing (undefined) argument count as "not given"
+        if (value != null) {
+            option = [...select.options].find(o => o.value === value);
+        } else if (label != null) {
+            option = [...select.options].find(o => o.text.trim() === label);
+        } else if (index != null) {
+            option = select.options[index];
+        }
+        if (!option) return false;
+
+        select.value = option.value;
+        option.selected = true;
+        select.dispatchEvent(new Event('input', { bubbles: true }));
+        select.dispatchEvent(new Event('change', { bubbles: true }));
+        return true;
+    }
+
+    function multiSelect(select, values) {
+        if (!select.multiple) return false;
+        let foundAny = false;
+        for (const option of select.options) {
+            if (values.includes(option.value) || values.includes(option.text.trim())) {
+                option.selected = true;
+                foundAny = true;
+            } else {
+                option.selected = false;
+            }
+        }
+        if (foundAny) {
+            select.dispatchEvent(new Event('input', { bubbles: true }));
+            select.dispatchEvent(new Event('change', { bubbles: true }));
+        }
+        return true;
+    }
+
+    // ---------------- Custom dropdown options ----------------
+    function optionCandidates() {
+        const out = [];
+        for (const el of document.querySelectorAll(OPTION_SELECTOR)) {
+            const rect = el.getBoundingClientRect();
+            if (rect.width < 5 || rect.height < 5) continue;
+            const style = window.getComputedStyle(el);
+            if (style.visibility === 'hidden' || style.display === 'none' || style.opacity === '0') continue;
+            out.push(el);
+        }
+        return out;
+    }
+
+    // Best matching visible option: exact match > semantic tags > generic text,
+    // wrappers with much more text than the query are penalized.
+    function bestOption(query, preferHighlighted) {
+        query = query.toLowerCase().trim();
+        let bestEl = null;
+        let bestScore = -1;
+        for (const el of optionCandidates()) {
+            const text = el.innerText.toLowerCase().trim();
+            if (!text.includes(query)) continue;
+
+            let score = 0;
+            if (text === query) score += 100;
+            if (el.tagName === 'LI' || el.getAttribute('role') === 'option') score += 50;
+            if (text.length > query.length + 50) score -= 1000;
+            if (preferHighlighted && (el.querySelector('.highlight') || el.classList.contains('highlight'))) score += 20;
+
+            if (score > bestScore) {
+                bestScore = score;
+                bestEl = el;
+            }
+        }
+        return bestEl;
+    }
+
+    function optionVisible(query) {
+        query = query.toLowerCase().trim();
+        for (const el of optionCandidates()) {
+            const text = el.innerText.toLowerCase().trim();
+            if (text === query || (text.includes(query) && text.length < query.length + 30)) return true;
+        }
+        return false;
+    }
+
+    // ---------------- Discovery ----------------
+    function findVisible(el) {
+        const rect = el.getBoundingClientRect();
+        const style = window.getComputedStyle(el);
+        return !(rect.width < 1 || rect.height < 1 || style.visibility === 'hidden' || style.display === 'none');
+    }
+
+    // Search fields of one element, lowercased (text from textContent: no layout needed)
+    function searchFields(el) {
+        return {
+            text: normalize(el.textContent).slice(0, 200).toLowerCase(),
+            placeholder: (el.getAttribute('placeholder') || '').toLowerCase(),
+            name: (el.getAttribute('name') || '').toLowerCase(),
+            id: (el.id || '').toLowerCase(),
+            aria: (el.getAttribute('aria-label') || '').toLowerCase(),
+            title: (el.getAttribute('title') || '').toLowerCase(),
+            className: (typeof el.className === 'string' ? el.className : '').toLowerCase(),
+            role: (el.getAttribute('role') || '').toLowerCase(),
+        };
+    }
+
+    function fieldsMatch(el, f, query) {
+        const val = (typeof el.value === 'string' ? el.value : '').toLowerCase(); // Live: typing mutates no attribute
+        return f.text.includes(query) || val.includes(query) || f.placeholder.includes(query) ||
+            f.name.includes(query) || f.id.includes(query) || f.aria.includes(query) ||
+            f.title.includes(query) || f.className.includes(query) || f.role.includes(query);
+    }
+
+    // ---------------- Locator synthesis ----------------
+    // Discovery results carry the first of these locators that matches exactly
+    // one node right now: id, data-testid, name, aria-label, exact text. If none
+    // is unique, the element's position among the matches of the narrowest one.
+    // Match lists come from one locatorIndex() per discovery call, not one
+    // document-wide XPath evaluation per locator tried.
+    const TEXT_ANCHOR_MAX = 80;
+    const XHTML = 'http://www.w3.org/1999/xhtml';
+
+    function xpathLiteral(s) {
+        if (!s.includes("'")) return `'${s}'`;
+        if (!s.includes('"')) return `"${s}"`;
+        return 'concat(' + s.split("'").map(p => `'${p}'`).join(`, "'", `) + ')';
+    }
+
+    // Like XPath normalize-space(): only ASCII whitespace collapses
+    function xpathSpace(s) {
+        return (s || '').replace(/[ \\t\\r\\n]+/g, ' ').trim();
+    }
+
+    function locatorScope(el) {
+        return el.namespaceURI === XHTML ? el.localName : `*[local-name()=${xpathLiteral(el.localName)}]`; // e.g. SVG
+    }
+
+    function locatorKeys(el, scope) {
+        return [['id', '*'], ['data-testid', '*'], ['name', scope], ['aria-label', scope]]
+            .map(([name, on]) => [on, name, el.getAttribute(name)])
+            .filter(([, , value]) => value)
+            .map(([on, name, value]) => `//${on}[@${name}=${xpathLiteral(value)}]`);
+    }
+
+    // Locator -> elements it matches, in document order (like dom_snapshot's
+    // _build_locator_index): tag and attribute locators from one pass over
+    // every element an XPath from the document reaches (no shadow roots or
+    // template contents); exact-text locators are evaluated once on first use.
+    function locatorIndex() {
+        const index = new Map();
+        const add = (xpath, el) => {
+            const list = index.get(xpath);
+            if (list) list.push(el);
+            else index.set(xpath, [el]);
+        };
+        for (const el of document.getElementsByTagName('*')) {
+            const scope = locatorScope(el);
+            add(`//${scope}`, el);
+            for (const xpath of locatorKeys(el, scope)) add(xpath, el);
+        }
+        const positions = new Map(); // xpath -> Map element -> index in its list
+        index.position = (xpath, el) => {
+            if (!positions.has(xpath)) positions.set(xpath, new Map((index.get(xpath) || []).map((e, i) => [e, i])));
+            const at = positions.get(xpath).get(el);
+            return at === undefined ? -1 : at;
+        };
+        index.text = xpath => {
+            if (!index.has(xpath)) {
+                const list = [];
+                try {
+                    const snap = document.evaluate(xpath, document, null, XPathResult.ORDERED_NODE_SNAPSHOT_TYPE, null);
+                    for (let i = 0; i < snap.snapshotLength; i++) list.push(snap.snapshotItem(i));
+                } catch (e) {}
+                index.set(xpath, list);
+            }
+            return index.get(xpath);
+        };
+        return index;
+    }
+
+    function uniqueLocator(el, index) {
+        index = index || locatorIndex();
+        const scope = locatorScope(el);
+        const tried = [];
+        for (const xpath of locatorKeys(el, scope)) {
+            tried.push([xpath, index.get(xpath) || []]);
+            if (tried[tried.length - 1][1].length === 1) return xpath;
+        }
+        const text = xpathSpace(el.textContent);
+        if (text && text.length <= TEXT_ANCHOR_MAX) {
+            const xpath = `//${scope}[normalize-space(.)=${xpathLiteral(text)}]`;
+            tried.push([xpath, index.text(xpath)]);
+            if (tried[tried.length - 1][1].length === 1) return xpath;
+        }
+
+        let base = `//${scope}`;
+        let fewest = Infinity;
+        for (const [xpath, list] of tried) {
+            if (list.length > 0 && list.length < fewest) [base, fewest] = [xpath, list.length];
+        }
+        const at = index.position(base, el);
+        return at < 0 ? base : `(${base})[${at + 1}]`; // Not reachable by XPath from the document (e.g. shadow DOM)
+    }
+
+    // Elements behind the last fresh discovery results, in result order (see found())
+    let lastFound = [];
+
+    function found(limit) {
+        return lastFound.slice(0, limit);
+    }
+
+    function findDescribe(el, index) {
+        return {
+            tag: el.tagName.toLowerCase(),
+            text: (el.innerText || el.value || '').trim().substring(0, 50),
+            xpath: uniqueLocator(el, index),
+            attributes: {
+                id: el.id,
+                class: el.className,
+                title: el.getAttribute('title'),
+                role: el.getAttribute('role'),
+                type: el.getAttribute('type'),
+                'aria-label': el.getAttribute('aria-label'),
+                onclick: el.hasAttribute('onclick') ? 'true' : 'false'
+            }
+        };
+    }
+
+    function findByText(query) {
+        query = query.toLowerCase().trim();
+        lastFound = Array.from(document.querySelectorAll(DISCOVERY_SELECTOR))
+            .filter(el => findVisible(el) && fieldsMatch(el, searchFields(el), query));
+        const index = locatorIndex();
+        return lastFound.map(el => findDescribe(el, index));
+    }
+
+    function interactiveSelector(tagName) {
+        if (tagName === 'button') return 'button, input[type="button"], input[type="submit"], [role="button"]';
+        if (tagName === 'input') return 'input:not([type="hidden"])';
+        return tagName;
+    }
+
+    function interactiveVisible(el) {
+        const rect = el.getBoundingClientRect();
+        const style = window.getComputedStyle(el);
+        return !(rect.width === 0 || style.visibility === 'hidden' || style.display === 'none');
+    }
+
+    function interactiveDescribe(el, index) {
+        return {
+            tag: el.tagName,
+            text: el.innerText || el.value || el.getAttribute('aria-label') || 'N/A',
+            xpath: uniqueLocator(el, index),
+            visible: true
+        };
+    }
+
+    function interactive(tagName) {
+        lastFound = Array.from(document.querySelectorAll(interactiveSelector(tagName))).filter(interactiveVisible);
+        const index = locatorIndex();
+        return lastFound.map(el => interactiveDescribe(el, index));
+    }
+
+    // ---------------- Element catalog ----------------
+    // Discoverable elements with precomputed search fields, kept current from
+    // MutationObserver records that are applied lazily on the next query. A
+    // query then filters precomputed strings and only measures the matches.
+    // The version changes whenever the DOM did, so callers holding results for
+    // (CATALOG_DOC, version) can reuse them. Matching also reads live values and
+    // computed visibility, which change without a mutation: input/change and
+    // transition/animation ends bump the version too.
+    const CATALOG_DOC = Date.now().toString(36) + Math.random().toString(36).slice(2);
+    const CATALOG_MAX_PENDING = 5000;
+    // Tags interactive() can answer from the catalog (covered by DISCOVERY_SELECTOR)
+    const CATALOG_TAGS = ['button', 'input', 'a', 'select', 'textarea'];
+    const CATALOG_EVENTS = ['input', 'change', 'transitionend', 'animationend'];
+    let catalog = null; // Map element -> search fields; null = (re)build on next query
+    let catalogObserver = null;
+    let catalogVersion = 0;
+    let pending = [];
+    let catalogTouched = false; // A CATALOG_EVENTS event fired since the last sync
+
+    function catalogAdd(root) {
+        if (root.nodeType !== Node.ELEMENT_NODE || !root.isConnected) return;
+        if (root.matches(DISCOVERY_SELECTOR)) catalog.set(root, searchFields(root));
+        root.querySelectorAll(DISCOVERY_SELECTOR).forEach(el => catalog.set(el, searchFields(el)));
+    }
+
+    function catalogRemove(root) {
+        if (root.nodeType !== Node.ELEMENT_NODE) return;
+        catalog.delete(root);
+        root.querySelectorAll(DISCOVERY_SELECTOR).forEach(el => catalog.delete(el));
+    }
+
+    // Text of every catalogued ancestor changed; refreshed when next read
+    function catalogStale(node) {
+        for (let el = node; el; el = el.parentElement) {
+            const fields = catalog.get(el);
+            if (fields) fields.stale = true;
+        }
+    }
+
+    function syncCatalog() {
+        if (!catalogObserver) {
+            catalogObserver = new MutationObserver(records => {
+                if (!catalog) return;
+                if (pending.length + records.length > CATALOG_MAX_PENDING) {
+                    catalog = null; // Cheaper to rebuild than to replay
+                    pending = [];
+                    return;
+                }
+                for (const r of records) pending.push(r);
+            });
+            catalogObserver.observe(document, { subtree: true, childList: true, attributes: true, characterData: true });
+            CATALOG_EVENTS.forEach(type => document.addEventListener(type, () => { catalogTouched = true; }, true));
+        }
+
+        if (!catalog) {
+            catalog = new Map();
+            pending = [];
+            catalogAdd(document.documentElement);
+            catalogVersion++;
+            catalogTouched = false;
+            return;
+        }
+        if (!pending.length && !catalogTouched) return;
+
+        const records = pending;
+        pending = [];
+        catalogVersion++;
+        catalogTouched = false;
+        for (const r of records) {
+            if (r.type === 'childList') {
+                r.removedNodes.forEach(catalogRemove);
+                r.addedNodes.forEach(catalogAdd);
+                catalogStale(r.target);
+            } else if (r.type === 'attributes') {
+                const el = r.target;
+                if (el.isConnected && el.matches(DISCOVERY_SELECTOR)) catalog.set(el, searchFields(el));
+                else catalog.delete(el);
+            } else {
+                catalogStale(r.target.parentElement);
+            }
+        }
+    }
+
+    function catalogQuery(accept, describe, knownDoc, knownVersion) {
+        syncCatalog();
+        const head = { doc: CATALOG_DOC, version: catalogVersion };
+        if (knownDoc === CATALOG_DOC && knownVersion === catalogVersion) {
+            return Object.assign(head, { unchanged: true });
+        }
+        const matches = [];
+        for (let [el, fields] of catalog) {
+            if (fields.stale) catalog.set(el, fields = searchFields(el));
+            if (accept(el, fields)) matches.push(el);
+        }
+        // Map order is insertion order; report in document order like a DOM scan
+        matches.sort((a, b) => a.compareDocumentPosition(b) & Node.DOCUMENT_POSITION_FOLLOWING ? -1 : 1);
+        lastFound = matches;
+        const index = matches.length ? locatorIndex() : null; // One index for every result's locator
+        return Object.assign(head, { results: matches.map(el => describe(el, index)) });
+    }
+
+    function catalogFind(query, knownDoc, knownVersion) {
+        query = query.toLowerCase().trim();
+        return catalogQuery(
+            (el, f) => fieldsMatch(el, f, query) && findVisible(el),
+            findDescribe, knownDoc, knownVersion
+        );
+    }
+
+    function catalogInteractive(tagName, knownDoc, knownVersion) {
+        if (!CATALOG_TAGS.includes(tagName)) {
+            return { doc: CATALOG_DOC, version: null, results: interactive(tagName) }; // Not catalogued; never cached
+        }
+        const selector = interactiveSelector(tagName);
+        return catalogQuery(
+            el => el.matches(selector) && interactiveVisible(el),
+            interactiveDescribe, knownDoc, knownVersion
+        );
+    }
+
+    // ---------------- Ranking ----------------
+    // Scores catalogued elements against a query in the page and keeps only the
+    // best k, so the candidate list never crosses CDP. Per field: exact > prefix
+    // > all tokens > substring > fuzzy (edit distance); fields are weighted,
+    // then interactive tags and nearness to the viewport add a bonus.
+    const RANK_FIELDS = [
+        ['text', 1.0], ['aria', 1.0], ['label', 1.0], ['placeholder', 0.9],
+        ['name', 0.8], ['id', 0.8], ['title', 0.7], ['value', 0.6],
+    ];
+    const RANK_MIN_SCORE = 20;
+    const INTERACTIVE_TAGS = ['BUTTON', 'A', 'INPUT', 'SELECT', 'TEXTAREA'];
+    const INTERACTIVE_ROLES = ['button', 'link', 'menuitem', 'tab', 'checkbox', 'radio', 'option', 'textbox', 'combobox'];
+
+    // "firstName" / "first_name" / "First name" -> ['first', 'name']
+    function tokens(s) {
+        return (s || '').replace(/([a-z])([A-Z])/g, '$1 $2').toLowerCase().split(/[^a-z0-9]+/).filter(Boolean);
+    }
+
+    // 1 - edit distance / length, counting an adjacent swap as one edit ("sumbit" ~ "submit")
+    function similarity(a, b) {
+        if (!a.length || !b.length) return 0;
+        if (Math.abs(a.length - b.length) > Math.max(a.length, b.length) / 2) return 0;
+        const d = [];
+        for (let i = 0; i <= a.length; i++) {
+            d.push([i]);
+            for (let j = 1; j <= b.length; j++) {
+                if (i === 0) { d[0].push(j); continue; }
+                const cost = a[i - 1] === b[j - 1] ? 0 : 1;
+                d[i][j] = Math.min(d[i - 1][j] + 1, d[i][j - 1] + 1, d[i - 1][j - 1] + cost);
+                if (i > 1 && j > 1 && a[i - 1] === b[j - 2] && a[i - 2] === b[j - 1]) {
+                    d[i][j] = Math.min(d[i][j], d[i - 2][j - 2] + 1);
+                }
+            }
+        }
+        return 1 - d[a.length][b.length] / Math.max(a.length, b.length);
+    }
+
+    function fieldScore(field, query, queryTokens) {
+        if (!field) return 0;
+        if (field === query) return 100;
+        if (field.startsWith(query)) return 80;
+        const fieldTokens = tokens(field);
+        if (queryTokens.length && queryTokens.every(q => fieldTokens.some(t => t === q || t.startsWith(q)))) return 65;
+        if (field.includes(query)) return 50;
+        // Fuzzy: the whole field, or any one word of it, close to the query
+        let sim = similarity(field, query);
+        for (const t of fieldTokens) sim = Math.max(sim, similarity(t, query));
+        return sim >= 0.6 ? 40 * sim : 0;
+    }
+
+    function rankFields(el, f) {
+        return {
+            text: f.text, aria: f.aria, placeholder: f.placeholder, name: f.name, id: f.id, title: f.title,
+            label: el.labels && el.labels.length ? normalize(Array.from(el.labels).map(l => l.textContent).join(' ')).toLowerCase() : '',
+            value: (typeof el.value === 'string' ? el.value : '').toLowerCase(),
+        };
+    }
+
+    function textScore(el, f, query, queryTokens) {
+        const fields = rankFields(el, f);
+        let best = 0;
+        for (const [key, weight] of RANK_FIELDS) {
+            best = Math.max(best, fieldScore(fields[key], query, queryTokens) * weight);
+        }
+        return best;
+    }
+
+    function tagBonus(el, f) {
+        if (INTERACTIVE_TAGS.includes(el.tagName) || INTERACTIVE_ROLES.includes(f.role)) return 10;
+        return el.hasAttribute('onclick') ? 5 : 0;
+    }
+
+    // 8 inside the viewport, fading to 0 two screens away
+    function viewportBonus(rect) {
+        const vh = window.innerHeight || 1, vw = window.innerWidth || 1;
+        const dy = rect.bottom < 0 ? -rect.bottom : Math.max(0, rect.top - vh);
+        const dx = rect.right < 0 ? -rect.right : Math.max(0, rect.left - vw);
+        return 8 * Math.max(0, 1 - Math.max(dx, dy) / (2 * vh));
+    }
+
+    function rankVersion() {
+        return catalogVersion + '@' + Math.round(window.scrollX) + ',' + Math.round(window.scrollY);
+    }
+
+    function catalogRank(query, k, knownDoc, knownVersion) {
+        syncCatalog();
+        const version = rankVersion(); // Proximity depends on scroll, not only on the DOM
+        if (knownDoc === CATALOG_DOC && knownVersion === version) {
+            return { doc: CATALOG_DOC, version: version, unchanged: true };
+        }
+        query = normalize(query).toLowerCase();
+        const queryTokens = tokens(query);
+        k = k || 10;
+
+        const top = []; // [{el, score}], best first, at most k
+        let scored = 0;
+        for (let [el, fields] of catalog) {
+            if (fields.stale) catalog.set(el, fields = searchFields(el));
+            const base = textScore(el, fields, query, queryTokens) + tagBonus(el, fields);
+            if (base < RANK_MIN_SCORE) continue;
+            scored++;
+            // Measuring is the expensive part: skip what cannot enter the top k even with a full bonus
+            if (top.length === k && base + 8 <= top[k - 1].score) continue;
+            if (!findVisible(el)) continue;
+            const score = base + viewportBonus(el.getBoundingClientRect());
+            let at = top.findIndex(t => score > t.score);
+            if (at < 0) at = top.length;
+            top.splice(at, 0, { el, score });
+            if (top.length > k) top.pop();
+        }
+        lastFound = top.map(t => t.el);
+        const index = top.length ? locatorIndex() : null;
+        return {
+            doc: CATALOG_DOC,
+            version: version,
+            matched: scored,
+            results: top.map(t => Object.assign(findDescribe(t.el, index), { score: Math.round(t.score * 10) / 10 })),
+        };
+    }
+
+    // ---------------- Forms ----------------
+    // fillForm resolves a whole {label/name/placeholder: value} mapping in one
+    // pass over the form controls and sets what it can without keystrokes.
+    const FORM_CONTROLS = 'input:not([type="hidden"]):not([type="submit"]):not([type="button"]):not([type="reset"])' +
+        ':not([type="image"]):not([type="file"]), textarea, select, [contenteditable=""], [contenteditable="true"]';
+    const FORM_MIN_SCORE = 40;
+    const TRUE_VALUES = ['true', 'yes', 'on', '1', 'checked', 'x'];
+    const KEYED_TYPES = ['date', 'time', 'datetime-local', 'month', 'week']; // As KEYED_INPUT_TYPES in cdp_client.py
+
+    function fieldKind(el) {
+        if (el.tagName === 'SELECT') return 'select';
+        if (el.tagName === 'INPUT' && (el.type === 'checkbox' || el.type === 'radio')) return el.type;
+        if (el.isContentEditable) return 'editable';
+        return 'text';
+    }
+
+    // Text right before a control ("Email: <input>", a label-like cell or div), up to 3 levels up
+    function nearbyText(el) {
+        let node = el;
+        for (let depth = 0; depth < 3 && node && node !== document.body; depth++) {
+            for (let prev = node.previousSibling; prev; prev = prev.previousSibling) {
+                if (prev.nodeType === Node.ELEMENT_NODE && (prev.matches(FORM_CONTROLS) || prev.querySelector(FORM_CONTROLS))) {
+                    return ''; // Belongs to the previous field
+                }
+                const text = normalize(prev.textContent);
+                if (text) return text.length <= TEXT_ANCHOR_MAX ? text : '';
+            }
+            node = node.parentElement;
+        }
+        return '';
+    }
+
+    function fieldLabel(text) {
+        return normalize(text).toLowerCase().replace(/[\\s:*]+$/, '');
+    }
+
+    // [text, weight] names a control answers to
+    function fieldNames(el) {
+        const names = [];
+        const add = (text, weight) => {
+            text = fieldLabel(text);
+            if (text) names.push([text, weight]);
+        };
+        if (el.type !== 'radio') {
+            if (el.labels) Array.from(el.labels).forEach(l => add(l.textContent, 100));
+            add(el.id, 85);
+            add(el.getAttribute('placeholder'), 80);
+            add(el.getAttribute('title'), 70);
+        } else {
+            // A radio's own label is an option; the group is named by its legend or radiogroup
+            const fieldset = el.closest('fieldset');
+            const legend = fieldset && fieldset.querySelector('legend');
+            if (legend) add(legend.textContent, 100);
+            const group = el.closest('[role="radiogroup"]');
+            if (group) {
+                add(group.getAttribute('aria-label'), 100);
+                add(labelledByText(group), 100);
+            }
+        }
+        add(labelledByText(el), 100);
+        add(el.getAttribute('aria-label'), 100);
+        add(el.getAttribute('name'), 90);
+        add(nearbyText(el), 60);
+        return names;
+    }
+
+    function nameScore(key, names) {
+        const keyTokens = tokens(key).join(' ');
+        let best = 0;
+        for (const [text, weight] of names) {
+            let score = 0;
+            if (text === key) score = weight;
+            else if (keyTokens && tokens(text).join(' ') === keyTokens) score = weight * 0.9; // first_name ~ First name
+            else if (text.startsWith(key)) score = weight * 0.7;
+            else if (text.includes(key)) score = weight * 0.5;
+            best = Math.max(best, score);
+        }
+        return best;
+    }
+
+    // One candidate per control; radios grouped by name (the group gets the value)
+    function formCandidates() {
+        const candidates = [];
+        const groups = new Map();
+        for (const el of document.querySelectorAll(FORM_CONTROLS)) {
+            const labels = el.labels ? Array.from(el.labels) : [];
+            const shown = isShown(el) && hasBox(el) || labels.some(l => isShown(l) && hasBox(l)); // Styled checkboxes hide the input
+            if (!shown) continue;
+            if (el.type === 'radio' && el.name) {
+                if (!groups.has(el.name)) {
+                    const group = { el, kind: 'radio', radios: [] };
+                    groups.set(el.name, group);
+                    candidates.push(group);
+                }
+                groups.get(el.name).radios.push(el);
+                continue;
+            }
+            candidates.push({ el, kind: fieldKind(el), radios: el.type === 'radio' ? [el] : null });
+        }
+        candidates.forEach(c => { c.names = fieldNames(c.el); });
+        return candidates;
+    }
+
+    function optionMatch(options, value, textOf, valueOf) {
+        const want = fieldLabel(String(value));
+        return options.find(o => fieldLabel(textOf(o)) === want) ||
+            options.find(o => valueOf(o) === String(value)) ||
+            options.find(o => fieldLabel(textOf(o)).includes(want)) || null;
+    }
+
+    function radioText(radio) {
+        const label = radio.labels && radio.labels.length ? radio.labels[0].textContent : radio.getAttribute('aria-label');
+        return label || radio.value;
+    }
+
+    function setTextValue(el, value) {
+        const proto = el.tagName === 'TEXTAREA' ? HTMLTextAreaElement.prototype : HTMLInputElement.prototype;
+        el.focus();
+        Object.getOwnPropertyDescriptor(proto, 'value').set.call(el, value); // Seen by React's value tracking
+        el.dispatchEvent(new Event('input', { bubbles: true }));
+        el.dispatchEvent(new Event('change', { bubbles: true }));
+        el.blur();
+    }
+
+    // Applies one value; returns the verification entry
+    function applyField(c, value, index) {
+        const el = c.el;
+        const out = { kind: c.kind, xpath: uniqueLocator(el, index) };
+        if (el.disabled || el.readOnly) return Object.assign(out, { status: 'DISABLED', value: fieldValue(el) });
+
+        if (c.kind === 'select') {
+            const option = optionMatch(Array.from(el.options), value, o => o.text, o => o.value);
+            if (option && !option.selected) selectOption(el, option.value);
+            const selected = el.options[el.selectedIndex];
+            return Object.assign(out, {
+                status: option && option.selected ? 'OK' : 'MISMATCH',
+                value: selected ? normalize(selected.text) : null,
+            });
+        }
+        if (c.kind === 'checkbox') {
+            const want = value === true || TRUE_VALUES.includes(String(value).trim().toLowerCase());
+            if (el.checked !== want) el.click(); // Fires click, input and change like a user would
+            return Object.assign(out, { status: el.checked === want ? 'OK' : 'MISMATCH', value: el.checked });
+        }
+        if (c.kind === 'radio') {
+            const radio = optionMatch(c.radios, value, radioText, r => r.value);
+            if (radio && !radio.checked) radio.click();
+            const checked = c.radios.find(r => r.checked);
+            if (radio) out.xpath = uniqueLocator(radio, index);
+            return Object.assign(out, {
+                status: radio && radio.checked ? 'OK' : 'MISMATCH',
+                value: checked ? normalize(radioText(checked)) : null,
+            });
+        }
+
+        // Text: masks, autocompletes and editors need real keystrokes (done by the caller)
+        const info = fieldInfo(el);
+        if (c.kind === 'editable' || (info && (info.keyed || KEYED_TYPES.includes(info.type)))) {
+            return Object.assign(out, { status: 'TYPE', value: fieldValue(el) });
+        }
+        setTextValue(el, String(value));
+        return Object.assign(out, { status: el.value === String(value) ? 'OK' : 'MISMATCH', value: el.value });
+    }
+
+    function fillForm(fields) {
+        const keys = Object.keys(fields);
+        const candidates = formCandidates();
+
+        // Best pairs first; a control serves one key, a key gets one control
+        const pairs = [];
+        keys.forEach((key, k) => {
+            const wanted = fieldLabel(key);
+            candidates.forEach((c, i) => {
+                const score = nameScore(wanted, c.names);
+                if (score >= FORM_MIN_SCORE) pairs.push([score, k, i]);
+            });
+        });
+        pairs.sort((a, b) => b[0] - a[0] || a[1] - b[1] || a[2] - b[2]);
+        const chosen = new Map(); // key index -> candidate index
+        const taken = new Set();
+        for (const [, k, i] of pairs) {
+            if (chosen.has(k) || taken.has(i)) continue;
+            chosen.set(k, i);
+            taken.add(i);
+        }
+
+        const index = chosen.size ? locatorIndex() : null; // One pass for every field's locator
+        return keys.map((key, k) => {
+            if (!chosen.has(k)) return { field: key, status: 'NOT_FOUND' };
+            const entry = applyField(candidates[chosen.get(k)], fields[key], index);
+            return Object.assign({ field: key, expected: fields[key] }, entry);
+        });
+    }
+
+    // Re-reads text fields after the caller typed into them: [{xpath, expected}] -> [{status, value}]
+    function checkFields(entries) {
+        return entries.map(({ xpath, expected }) => {
+            const el = firstMatch(xpath);
+            const value = el ? fieldValue(el) : null;
+            return { status: value === String(expected) ? 'OK' : 'MISMATCH', value: value };
+        });
+    }
+
+    observe();
+
+    window.__mcp = {
+        version: VERSION,
+        isShown, hasBox,
+        engines: ENGINES, candidates, firstMatch, accessibleName,
+        firstVisible, firstShown, hasVisible, firstNodeVisible,
+        domIdleMs, textVisible,
+        untilVisible, untilNodeVisible, untilText, untilDomIdle,
+        measure, prepare, take, isLive, fieldValue,
+        hoverEvents, hoverLocator, clearInput, scrollToShown, readText, isDisabled, scrapeTable,
+        selectOption, multiSelect,
+        bestOption, optionVisible,
+        findByText, interactive,
+        catalogFind, catalogInteractive, catalogRank, uniqueLocator, found,
+        fillForm, checkFields,
+    };
+})();
+""" % {"version": PAGE_RUNTIME_VERSION}
@@ -0,0 +1,213 @@
+import os
+import threading
+import time
+from concurrent.futures import Future
+
+from cdp_client import ChromeCDP, DEBUG_PORT
+from browser_pool import BrowserPool, BROWSER_POOL_SIZE
+
+# Session limits
+MAX_SESSIONS = int(os.getenv("MAX_SESSIONS", "16"))
+SESSION_IDLE_TIMEOUT = int(os.getenv("SESSION_IDLE_TIMEOUT", "600000")) # ms
+
+
+class BrowserSession:
+    def __init__(self, key, cdp, context_id, target_id):
+        self.key = key
+        self.cdp = cdp
+        self.context_id = context_id
+        self.target_id = target_id
+        self.created = time.monotonic()
+        self.last_used = self.created
+
+
+class SessionManager:
+    """
+    Gives every MCP client its own isolated browser context (cookies, storage, tabs)
+    inside ONE shared Chrome process.
+
+    - Chrome is launched lazily on the first acquire() (or by warm_up()). Without a
+      pool it is shut down when the last session is released; with one it stays up
+      so the pooled contexts remain warm.
+    - New sessions are served from a BrowserPool of ready contexts when possible.
+    - At most `max_sessions` contexts exist at a time.
+    - Sessions idle for longer than `idle_timeout_ms` are evicted by a reaper thread.
+
+    The manager lock only guards the session table: launching Chrome and creating
+    a context happen outside it, so one client's cold start never stalls the
+    others. Concurrent acquire() calls for the same key share one creation.
+    """
+
+    def __init__(self, max_sessions=MAX_SESSIONS, idle_timeout_ms=SESSION_IDLE_TIMEOUT,
+                 port=DEBUG_PORT, pool_size=BROWSER_POOL_SIZE):
+        self.max_sessions = max_sessions
+        self.pool_size = pool_size
+        self.pool = None
+        self.idle_timeout_ms = idle_timeout_ms
+        self.port = port
+        self.host = None # Owns the Chrome process
+        self.browser = None # Browser-level connection for Target.* commands
+        self._sessions = {}
+        self._creating = {} # key -> Future of the BrowserSession being created
+        self._lock = threading.RLock()
+        self._browser_lock = threading.Lock() # Serializes launching Chrome only
+        self._reaper = None
+        self._reaper_stop = threading.Event()
+
+    # ---------------- Browser lifecycle ----------------
+    def _ensure_browser(self):
+        if self.browser:
+            return
+        self.host = ChromeCDP(port=self.port)
+        self.host.start_browser()
+        self.browser = ChromeCDP(port=self.port)
+        self.browser.connect_browser()
+        self.pool = BrowserPool(self.browser, self.port, size=self.pool_size)
+        self.pool.start()
+
+        self._reaper_stop.clear()
+        self._reaper = threading.Thread(target=self._reap_loop, name="session-reaper", daemon=True)
+        self._reaper.start()
+
+    def warm_up(self, background=False):
+        """
+        Launches Chrome and starts filling the pool before the first client arrives.
+        """
+        if background:
+            threading.Thread(target=self.warm_up, name="session-warm-up", daemon=True).start()
+            return
+        with self._browser_lock:
+            self._ensure_browser()
+
+    def shutdown(self):
+        with self._lock:
+            for key in list(self._sessions):
+                self._dispose(self._sessions.pop(key))
+            with self._browser_lock:
+                self._reaper_stop.set()
+                if self.pool:
+                    self.pool.stop()
+                    self.pool = None
+                if self.browser:
+                    self.browser.close()
+                if self.host:
+                    self.host.close()
+                self.browser = None
+                self.host = None
+
+    # ---------------- Sessions ----------------
+    def acquire(self, key) -> ChromeCDP:
+        """
+        Returns the ChromeCDP bound to `key`, creating a new browser context for it if needed.
+        """
+        session = self._lookup(key)
+        if session:
+            return session.cdp
+
+        self.evict_idle()
+        with self._lock:
+            session = self._lookup(key)
+            if session:
+                return session.cdp
+            creating = self._creating.get(key)
+            owner = creating is None
+            if owner:
+                if len(self._sessions) + len(self._creating) >= self.max_sessions:
+                    raise RuntimeError(f"Session limit reached ({self.max_sessions} active sessions)")
+                creating = self._creating[key] = Future()
+        if not owner:
+            return creating.result().cdp # Another call for this key is creating it
+
+        try:
+            with self._browser_lock:
+                self._ensure_browser()
+            session = self._create_session(key)
+        except BaseException as e:
+            with self._lock:
+                self._creating.pop(key, None)
+            creating.set_exception(e)
+            raise
+        with self._lock:
+            self._creating.pop(key, None)
+            self._sessions[key] = session
+            print(f"Session {key} started in context {session.context_id} ({len(self._sessions)} active)")
+        creating.set_result(session)
+        return session.cdp
+
+    def _lookup(self, key):
+        with self._lock:
+            session = self._sessions.get(key)
+            if session:
+                session.last_used = time.monotonic()
+            return session
+
+    def get(self, key):
+        with self._lock:
+            session = self._sessions.get(key)
+            return session.cdp if session else None
+
+    def release(self, key):
+        """
+        Disposes the session's browser context. Shuts Chrome down when it was the last one.
+        """
+        with self._lock:
+            session = self._sessions.pop(key, None)
+            remaining = len(self._sessions)
+        if session:
+            self._dispose(session)
+            print(f"Session {key} closed ({remaining} active)")
+        if self.pool_size <= 0:
+            with self._lock:
+                if not self._sessions and not self._creating:
+                    self.shutdown()
+
+    def evict_idle(self):
+        now = time.monotonic()
+        with self._lock:
+            idle = [self._sessions.pop(key) for key, session in list(self._sessions.items())
+                    if (now - session.last_used) * 1000 >= self.idle_timeout_ms]
+        for session in idle:
+            print(f"Evicting idle session {session.key}")
+            self._dispose(session)
+
+    def active_sessions(self):
+        with self._lock:
+            return len(self._sessions)
+
+    def stats(self):
+        with self._lock:
+            hits = sum(s.cdp.locators.hits for s in self._sessions.values())
+            misses = sum(s.cdp.locators.misses for s in self._sessions.values())
+            handles = [tab for s in self._sessions.values() for tab in s.cdp.live_handles().values()]
+            return {
+                "active_sessions": len(self._sessions),
+                "max_sessions": self.max_sessions,
+                "pool": self.pool.stats() if self.pool else None,
+                "locator_cache": {
+                    "hits": hits,
+                    "misses": misses,
+                    "hit_rate": round(hits / (hits + misses), 3) if hits + misses else None,
+                },
+                "remote_objects": {
+                    "live": sum(h["live"] for h in handles),
+                    "created": sum(h["created"] for h in handles),
+                    "released": sum(h["released"] for h in handles),
+                },
+            }
+
+    def _create_session(self, key):
+        start = time.monotonic()
+        entry = self.pool.take() or self.pool.create()
+        print(f"Session {key} ready in {(time.monotonic() - start) * 1000:.0f}ms")
+        return BrowserSession(key, entry.cdp, entry.context_id, entry.target_id)
+
+    def _dispose(self, session):
+        self.pool.dispose(session.cdp, session.context_id)
+
+    def _reap_loop(self):
+        interval = max(1.0, self.idle_timeout_ms / 1000 / 4)
+        while not self._reaper_stop.wait(interval):
+            try:
+                self.evict_idle()
+            except Exception as e:
+                print(f"Session reaper failed: {e}")
@@ -0,0 +1,100 @@
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from cdp_client import DEFAULT_TIMEOUT
+
+# Max tabs of one group doing work at the same time
+TAB_GROUP_PARALLELISM = int(os.getenv("TAB_GROUP_PARALLELISM", "4"))
+
+
+class TabGroup:
+    """
+    N background tabs in one client's browser context, worked on concurrently.
+
+    All tabs share the client's single browser connection; every worker thread
+    pins its commands to one tab (ChromeCDP.on_tab), so the client's current
+    tab never changes and replies are matched per session. At most max_parallel
+    tabs are busy at once.
+
+        with TabGroup(cdp, urls, max_parallel=4) as group:
+            results = group.run(lambda cdp, url: cdp.get_text("//h1"))
+
+    Every result is a dict per tab, in the order the URLs were given:
+        {"tab": targetId, "url": url, "status": "OK", "result": ..., "elapsed_ms": ...}
+        {"tab": targetId, "url": url, "status": "ERROR", "error": "...", "elapsed_ms": ...}
+    """
+
+    def __init__(self, cdp, urls=(), max_parallel=None, timeout_ms=DEFAULT_TIMEOUT):
+        self.cdp = cdp
+        self.max_parallel = max(1, max_parallel or TAB_GROUP_PARALLELISM)
+        self.tabs = [] # [(targetId, url)]; targetId is None if the tab failed to open
+        self.open_errors = {} # url -> error message
+        if urls:
+            self.open(urls, timeout_ms=timeout_ms)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def _fan_out(self, work, items):
+        """
+        Runs work(item) for every item on up to max_parallel threads and returns
+        the per-item results in input order. Workers inherit the caller's cancel
+        token and deadline.
+        """
+        work = self.cdp.carry_call_context(work)
+        if len(items) <= 1:
+            return [work(item) for item in items]
+        with ThreadPoolExecutor(max_workers=min(self.max_parallel, len(items)), thread_name_prefix="tab-group") as pool:
+            return list(pool.map(work, items))
+
+    def open(self, urls, timeout_ms=DEFAULT_TIMEOUT):
+        """
+        Opens one tab per URL (in parallel) and starts loading it.
+        """
+        def open_one(url):
+            try:
+                return self.cdp.open_tab(url, timeout_ms=timeout_ms), url
+            except Exception as e:
+                self.open_errors[url] = str(e)
+                return None, url
+
+        self.tabs.extend(self._fan_out(open_one, list(urls)))
+        return [target_id for target_id, _ in self.tabs]
+
+    def run(self, fn, timeout_ms=DEFAULT_TIMEOUT):
+        """
+        Calls fn(cdp, url) once per tab, with the tab pinned, and collects a
+        result dict per tab. One tab failing does not stop the others.
+        """
+        def run_one(tab):
+            target_id, url = tab
+            start = time.monotonic()
+            outcome = {"tab": target_id, "url": url}
+            try:
+                if target_id is None:
+                    raise RuntimeError(self.open_errors.get(url, "Tab failed to open"))
+                with self.cdp.budget(timeout_ms, "tab_group"), self.cdp.on_tab(target_id):
+                    outcome.update(status="OK", result=fn(self.cdp, url))
+            except Exception as e:
+                outcome.update(status="ERROR", error=str(e))
+            outcome["elapsed_ms"] = int((time.monotonic() - start) * 1000)
+            return outcome
+
+        return self._fan_out(run_one, list(self.tabs))
+
+    def close(self):
+        """
+        Closes every tab of the group (best effort).
+        """
+        for target_id, _ in self.tabs:
+            if target_id is None:
+                continue
+            try:
+                self.cdp.close_tab(target_id)
+            except Exception as e:
+                print(f"Failed to close tab {target_id}: {e}")
+        self.tabs = []
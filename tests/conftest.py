@@ -0,0 +1,13 @@
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+# cdp_client looks for a Chrome executable at import time. These tests never
+# launch it, so let the lookup succeed on machines without one.
+_exists = os.path.exists
+os.path.exists = lambda path: path.endswith(("chrome.exe", "msedge.exe")) or _exists(path)
+try:
+    import cdp_client # noqa: F401
+finally:
+    os.path.exists = _exists
@@ -0,0 +1,207 @@
+import json
+import shutil
+import subprocess
+
+import pytest
+
+import cdp_client
+from cdp_client import ChromeCDP, DISCOVERY_MAP_LIMIT
+from dom_snapshot import DomSnapshot, xpath_literal
+from page_runtime import PAGE_RUNTIME_JS
+
+SVG_TAGS = {"svg", "path"}
+
+# (tag, attributes, children); children are elements or text
+PAGE = ("html", {}, [("body", {}, [
+    ("button", {"id": "dup"}, ["Save"]),
+    ("button", {"id": "dup"}, ["Save"]),
+    ("button", {"data-testid": "ok"}, ["Save"]),
+    ("button", {}, ["  It's \"q\"\n "]),
+    ("input", {"name": "q"}, []),
+    ("input", {"name": "q", "aria-label": "Find"}, []),
+    ("a", {}, ["Home"]),
+    ("div", {}, [("span", {}, ["Home"]), ("span", {}, ["Away"]), ("span", {}, ["Away"])]),
+    ("svg", {"name": "icon"}, [("path", {}, [])]),
+])])
+
+
+def snapshot_of(tree):
+    """DomSnapshot of `tree` as DOMSnapshot.captureSnapshot would report it."""
+    strings, nodes = [], {"parentIndex": [], "nodeType": [], "nodeName": [], "nodeValue": [],
+                          "backendNodeId": [], "attributes": []}
+
+    def intern(value):
+        if value not in strings:
+            strings.append(value)
+        return strings.index(value)
+
+    def add(parent, node_type, name, attrs=(), value=None):
+        nodes["parentIndex"].append(parent)
+        nodes["nodeType"].append(node_type)
+        nodes["nodeName"].append(intern(name))
+        nodes["nodeValue"].append(intern(value) if value is not None else -1)
+        nodes["backendNodeId"].append(100 + len(nodes["backendNodeId"]))
+        nodes["attributes"].append([intern(part) for pair in attrs for part in pair])
+        return len(nodes["nodeType"]) - 1
+
+    def walk(node, parent):
+        if isinstance(node, str):
+            add(parent, 3, "#text", value=node)
+            return
+        tag, attrs, children = node
+        index = add(parent, 1, tag if tag in SVG_TAGS else tag.upper(), attrs.items())
+        for child in children:
+            walk(child, index)
+
+    walk(tree, add(-1, 9, "#document"))
+    return DomSnapshot({"strings": strings, "documents": [{"nodes": nodes, "layout": {}}]})
+
+
+def test_unique_xpath_prefers_unique_attributes_then_text():
+    snap = snapshot_of(PAGE)
+    locators = [snap.unique_xpath(i) for i in snap.elements() if snap.tag(i) not in ("HTML", "BODY")]
+    assert locators == [
+        "(//*[@id='dup'])[1]",
+        "(//*[@id='dup'])[2]",
+        "//*[@data-testid='ok']",
+        "//button[normalize-space(.)=concat('It', \"'\", 's \"q\"')]",
+        "(//input[@name='q'])[1]",
+        "//input[@aria-label='Find']",
+        "//a[normalize-space(.)='Home']",
+        "//div[normalize-space(.)='HomeAwayAway']",
+        "//span[normalize-space(.)='Home']",
+        "(//span[normalize-space(.)='Away'])[1]",
+        "(//span[normalize-space(.)='Away'])[2]",
+        "//*[local-name()='svg'][@name='icon']",
+        "(//*[local-name()='path'])[1]",
+    ]
+
+
+def test_xpath_literal_quotes():
+    assert xpath_literal("a") == "'a'"
+    assert xpath_literal("a'b") == '"a\'b"'
+    assert xpath_literal("a'b\"c") == "concat('a', \"'\", 'b\"c')"
+
+
+# A minimal DOM for page_runtime.py: enough for uniqueLocator and the XPaths it builds
+FAKE_DOM_JS = r"""
+const spec = JSON.parse(process.argv[1]);
+const XHTML = 'http://www.w3.org/1999/xhtml', SVG = 'http://www.w3.org/2000/svg';
+const all = [];
+function build(node, parent) {
+    if (typeof node === 'string') return { nodeType: 3, nodeValue: node, parentElement: parent, get textContent() { return this.nodeValue; } };
+    const [tag, attrs, kids] = node;
+    const svg = ['svg', 'path'].includes(tag);
+    const el = { nodeType: 1, localName: tag, tagName: svg ? tag : tag.toUpperCase(), namespaceURI: svg ? SVG : XHTML,
+                 attrs, parentElement: parent, getAttribute: n => n in attrs ? attrs[n] : null,
+                 get textContent() { return this.childNodes.map(k => k.textContent).join(''); } };
+    all.push(el);
+    el.childNodes = kids.map(k => build(k, el));
+    return el;
+}
+const root = build(spec, null);
+function literal(s) {
+    return s.startsWith('concat(') ? s.match(/'[^']*'|"[^"]*"/g).map(p => p.slice(1, -1)).join('') : s.slice(1, -1);
+}
+function evaluate(xpath) {
+    const m = /^\/\/(?:\*\[local-name\(\)=(.+?)\]|([a-z]+))\[normalize-space\(\.\)=(.*)\]$/.exec(xpath);
+    if (!m) throw new Error('unsupported ' + xpath);
+    const name = m[1] ? literal(m[1]) : m[2], text = literal(m[3]);
+    return all.filter(e => e.localName === name && (m[1] || e.namespaceURI === XHTML) &&
+        e.textContent.replace(/[ \t\r\n]+/g, ' ').trim() === text);
+}
+global.window = { scrollX: 0, scrollY: 0 };
+global.Node = { ELEMENT_NODE: 1, TEXT_NODE: 3, DOCUMENT_POSITION_FOLLOWING: 4 };
+global.NodeFilter = {};
+global.XPathResult = { ORDERED_NODE_SNAPSHOT_TYPE: 7 };
+global.MutationObserver = class { observe() {} };
+global.document = {
+    documentElement: root,
+    getElementsByTagName: () => all,
+    evaluate: xpath => { const r = evaluate(xpath); return { snapshotLength: r.length, snapshotItem: i => r[i] }; },
+    addEventListener() {},
+};
+eval(RUNTIME);
+console.log(JSON.stringify(all.map(el => window.__mcp.uniqueLocator(el))));
+"""
+
+
+@pytest.mark.skipif(not shutil.which("node"), reason="node is needed to run the page runtime")
+def test_unique_xpath_matches_page_runtime():
+    script = FAKE_DOM_JS.replace("eval(RUNTIME);", f"eval({json.dumps(PAGE_RUNTIME_JS)});")
+    result = subprocess.run(["node", "-e", script, json.dumps(PAGE)], capture_output=True, text=True, check=True)
+    in_page = json.loads(result.stdout)
+    snap = snapshot_of(PAGE)
+    assert [snap.unique_xpath(i) for i in snap.elements()] == in_page
+
+
+# ---------------- Catalog queries ----------------
+def catalog_reply(value):
+    return {"result": {"result": {"value": value}}}
+
+
+@pytest.fixture
+def cdp():
+    """A ChromeCDP whose page runtime calls are answered by `cdp.replies[fn]`."""
+    client = ChromeCDP()
+    client.evals = []
+    client.replies = {}
+
+    def runtime_eval(fn, *args, **kwargs):
+        client.evals.append((fn,) + args)
+        reply = client.replies.get(fn)
+        return catalog_reply(reply(*args) if callable(reply) else reply)
+
+    client._runtime_eval = runtime_eval
+    client._ensure_page_actionable = lambda **kwargs: None
+    return client
+
+
+def buttons(n):
+    return [{"tag": "BUTTON", "text": f"b{i}", "xpath": f"(//button)[{i + 1}]", "visible": True} for i in range(n)]
+
+
+def test_catalog_returns_every_match_and_maps_the_first_ones(cdp, monkeypatch):
+    monkeypatch.setattr(cdp_client, "DISCOVERY_BACKEND", "catalog")
+    count = DISCOVERY_MAP_LIMIT + 10
+    cdp.replies["catalogInteractive"] = {"doc": "D", "version": 1, "results": buttons(count)}
+
+    results = cdp.get_all_interactive_elements("button")
+
+    assert len(results) == count
+    assert [r["ref"] for r in results] == [f"e{i + 1}" for i in range(count)]
+    assert ("found", DISCOVERY_MAP_LIMIT) in cdp.evals
+
+
+def test_unchanged_catalog_reuses_results_and_refs(cdp, monkeypatch):
+    monkeypatch.setattr(cdp_client, "DISCOVERY_BACKEND", "catalog")
+    cdp.replies["catalogFind"] = {"doc": "D", "version": 3, "results": buttons(2)}
+    first = [dict(r) for r in cdp.find_elements_by_text("save")]
+
+    cdp.replies["catalogFind"] = {"doc": "D", "version": 3, "unchanged": True}
+    second = cdp.find_elements_by_text("save")
+
+    assert ("catalogFind", "save", "D", 3) in cdp.evals
+    assert [(r["xpath"], r["ref"]) for r in second] == [(r["xpath"], r["ref"]) for r in first]
+
+
+def test_failed_catalog_falls_back_to_a_scan(cdp, monkeypatch):
+    monkeypatch.setattr(cdp_client, "DISCOVERY_BACKEND", "catalog")
+    cdp.replies["catalogInteractive"] = None
+    cdp.replies["interactive"] = buttons(3)
+    assert len(cdp.get_all_interactive_elements("button")) == 3
+
+
+@pytest.mark.parametrize("backend", ["catalog", "snapshot", "runtime"])
+def test_backends_return_the_same_count(cdp, monkeypatch, backend):
+    count = DISCOVERY_MAP_LIMIT + 5
+    monkeypatch.setattr(cdp_client, "DISCOVERY_BACKEND", backend)
+    cdp.replies["catalogInteractive"] = {"doc": "D", "version": 1, "results": buttons(count)}
+    cdp.replies["interactive"] = buttons(count)
+
+    class Snapshot:
+        def interactive(self, tag_name):
+            return buttons(count)
+
+    cdp._discovery_snapshot = lambda: Snapshot() if backend == "snapshot" else None
+    assert len(cdp.get_all_interactive_elements("button")) == count
@@ -0,0 +1,84 @@
+import pytest
+
+from cdp_client import ChromeCDP, FillMismatchError, fill_value_matches
+
+
+@pytest.fixture
+def cdp():
+    """A ChromeCDP whose page interaction is stubbed out and recorded."""
+    client = ChromeCDP()
+    client.calls = []
+    client.field = {"type": "text", "editable": False, "keyed": False}
+    client.page_value = None
+    client._ensure_page_actionable = lambda **kwargs: None
+    client._prepare_element = lambda xpath: {"visible": True, "objectId": "obj", "field": client.field}
+    client._focus_target = lambda target: client.calls.append("focus")
+    client._clear_focused_field = lambda: client.calls.append("clear")
+    client._enter_text = lambda value, strategy: client.calls.append(strategy)
+    client._field_value = lambda object_id: client.page_value
+    client._sleep = lambda seconds: None
+    client._save_debug_screenshot = lambda name: None
+    return client
+
+
+@pytest.mark.parametrize("strategy", ["key", "ime ", "", "INSERT"])
+def test_unknown_strategy_is_rejected_before_touching_the_field(cdp, strategy):
+    with pytest.raises(ValueError, match="Unknown fill strategy"):
+        cdp.fill("//input", "bob", timeout_ms=1000, strategy=strategy)
+    assert cdp.calls == []
+
+
+@pytest.mark.parametrize("field, value, expected", [
+    ({"type": "text"}, "bob", "insert"),
+    ({"type": "text"}, "東京", "ime"),
+    ({"type": "date"}, "01022024", "keys"),
+    ({"type": "text", "keyed": True}, "12345", "keys"),
+    ({"type": "text", "keyed": True}, "x" * 100, "insert"),
+    (None, "bob", "insert"),
+])
+def test_auto_strategy(cdp, field, value, expected):
+    assert cdp._fill_strategy(field, value, "auto") == expected
+
+
+def test_explicit_strategy_is_kept(cdp):
+    assert cdp._fill_strategy({"type": "date"}, "x", "insert") == "insert"
+
+
+def test_fill_succeeds_when_value_sticks(cdp):
+    cdp.page_value = "bob"
+    cdp.fill("//input", "bob", timeout_ms=1000)
+    assert cdp.calls == ["focus", "clear", "insert"]
+
+
+def test_rewritten_value_raises_after_retyping_by_key(cdp):
+    cdp.page_value = "12/34"
+    with pytest.raises(FillMismatchError) as info:
+        cdp.fill("//input", "1234", timeout_ms=1000)
+    assert info.value.to_dict() == {"xpath": "//input", "expected": "1234", "actual": "12/34"}
+    assert cdp.calls == ["focus", "clear", "insert", "clear", "keys"]
+
+
+def test_normalized_value_is_accepted(cdp):
+    cdp.field = {"type": "textarea"}
+    cdp.page_value = "line one\nline two"
+    cdp.fill("//textarea", "line one\r\nline two", timeout_ms=1000)
+    assert cdp.calls == ["focus", "clear", "insert"]
+
+
+@pytest.mark.parametrize("actual, expected, field", [
+    ("a\nb", "a\r\nb", {"type": "textarea"}),
+    ("a\nb", "a\rb", {"type": "textarea"}),
+    ("hello world", "hello  world", {"type": "text", "editable": True}),
+    ("hello\nworld", "hello\n\nworld", {"type": "text", "editable": True}),
+    ("a@b.c", " a@b.c ", {"type": "email"}),
+    ("", "not a number", {"type": "number"}),
+    ("https://x.y", "https://x.y\n", {"type": "url"}),
+    (None, "anything", {"type": "text"}),
+])
+def test_values_the_browser_normalizes_match(actual, expected, field):
+    assert fill_value_matches(actual, expected, field)
+
+
+@pytest.mark.parametrize("actual, expected", [("12/34", "1234"), ("bo", "bob"), ("", "bob")])
+def test_real_mismatches_do_not_match(actual, expected):
+    assert not fill_value_matches(actual, expected, {"type": "text"})
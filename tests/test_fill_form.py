@@ -0,0 +1,60 @@
+import pytest
+
+from cdp_client import ChromeCDP, FillMismatchError
+
+
+@pytest.fixture
+def cdp():
+    """A ChromeCDP whose page runtime answers fillForm/checkFields from `cdp.replies`."""
+    client = ChromeCDP()
+    client.evals, client.typed, client.replies = [], [], {}
+
+    def runtime_eval(fn, *args, **kwargs):
+        client.evals.append((fn,) + args)
+        return {"result": {"result": {"value": client.replies[fn]}}}
+
+    def fill(xpath, value, timeout_ms=None, **kwargs):
+        client.typed.append((xpath, value))
+        if xpath == "//bad":
+            raise FillMismatchError(xpath, value, "12/34")
+
+    client._runtime_eval = runtime_eval
+    client._ensure_page_actionable = lambda **kwargs: None
+    client.fill = fill
+    return client
+
+
+def test_fields_set_in_page_are_not_typed(cdp):
+    cdp.replies["fillForm"] = [
+        {"field": "Email", "expected": "a@b.c", "kind": "text", "xpath": "//e", "status": "OK", "value": "a@b.c"},
+        {"field": "Terms", "expected": True, "kind": "checkbox", "xpath": "//t", "status": "OK", "value": True},
+        {"field": "Fax", "status": "NOT_FOUND"},
+    ]
+    report = cdp.fill_form({"Email": "a@b.c", "Terms": True, "Fax": "1"})
+
+    assert cdp.typed == []
+    assert [item["status"] for item in report] == ["OK", "OK", "NOT_FOUND"]
+    assert [item.get("ref") for item in report] == ["e1", "e2", None]
+    assert [e[0] for e in cdp.evals] == ["fillForm"]
+
+
+def test_keyed_and_rejected_text_fields_are_typed_and_rechecked(cdp):
+    cdp.replies["fillForm"] = [
+        {"field": "Date", "expected": "01022024", "kind": "text", "xpath": "//d", "status": "TYPE", "value": ""},
+        {"field": "Phone", "expected": 1234, "kind": "text", "xpath": "//bad", "status": "MISMATCH", "value": ""},
+        {"field": "Plan", "expected": "Max", "kind": "radio", "xpath": "//p", "status": "MISMATCH", "value": "Pro"},
+    ]
+    cdp.replies["checkFields"] = [{"status": "OK", "value": "01022024"}, {"status": "MISMATCH", "value": "12/34"}]
+    report = cdp.fill_form({"Date": "01022024", "Phone": 1234, "Plan": "Max"})
+
+    assert cdp.typed == [("//d", "01022024"), ("//bad", "1234")] # Radios are never typed
+    assert cdp.evals[-1] == ("checkFields", [{"xpath": "//d", "expected": "01022024"}, {"xpath": "//bad", "expected": 1234}])
+    assert report[0]["status"] == "OK" and report[0]["value"] == "01022024"
+    assert report[1]["status"] == "MISMATCH" and "12/34" in report[1]["error"]
+    assert report[2]["status"] == "MISMATCH"
+
+
+def test_page_failure_raises(cdp):
+    cdp.replies["fillForm"] = None
+    with pytest.raises(RuntimeError):
+        cdp.fill_form({"Email": "a@b.c"})
@@ -0,0 +1,23 @@
+from network_tracker import NETWORK_IGNORE_URLS, NetworkTracker
+
+
+def test_json_list_keeps_regexes_with_commas():
+    tracker = NetworkTracker(ignore_urls='["/v[0-9]{1,2}/poll", "^blob:"]')
+    assert tracker.is_ignored("https://x.io/v12/poll")
+    assert not tracker.is_ignored("https://x.io/v123/poll")
+    assert tracker.is_ignored("blob:abc")
+
+
+def test_comma_separated_form_is_still_read():
+    tracker = NetworkTracker(ignore_urls=r"^data:, /longpoll")
+    assert tracker.is_ignored("data:text/plain,x")
+    assert tracker.is_ignored("https://x.io/longpoll?id=1")
+    assert not tracker.is_ignored("https://x.io/api")
+
+
+def test_default_ignores_beacons_and_types():
+    tracker = NetworkTracker(ignore_urls=NETWORK_IGNORE_URLS)
+    assert tracker.is_ignored("https://www.google-analytics.com/g/collect?v=2")
+    assert tracker.is_ignored("https://x.io/socket.io/?EIO=4")
+    assert not tracker.is_ignored("https://googleXanalytics.com/app.js")
+    assert tracker.is_ignored("wss://x.io", "WebSocket")
@@ -33,6 +33,10 @@ class TraceManager:
     def record_retry(self, entry):
         entry["retries"] += 1
 
+    def record_cdp_usage(self, entry, commands, round_trips):
+        entry["cdp_commands"] = commands
+        entry["cdp_round_trips"] = round_trips
+
     def success(self, entry):
         entry["end_time"] = datetime.utcnow().isoformat()
         entry["result"] = "SUCCESS"
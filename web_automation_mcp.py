@@ -1,38 +1,96 @@
-from mcp.server.fastmcp import FastMCP
+from mcp.server.fastmcp import FastMCP, Context
+import asyncio
+import inspect
+import itertools
 import json
-from cdp_client import ChromeCDP, DEFAULT_TIMEOUT
+import threading
+import weakref
+from cdp_client import DEFAULT_TIMEOUT, FIND_CONFIDENT_MARGIN, CDPTimeoutError, FillMismatchError
+from async_cdp import AsyncChromeCDP
+from session_manager import SessionManager
+from tab_group import TabGroup
+from action_script import run_script
 import base64
 
 app = FastMCP("web-automation-mcp")
-cdp = ChromeCDP()
+sessions = SessionManager() # One isolated browser context per MCP client, shared Chrome
+if sessions.pool_size > 0:
+    sessions.warm_up(background=True) # Pre-launch Chrome and fill the context pool
+
+client_keys = weakref.WeakKeyDictionary() # MCP session -> its SessionManager key (never reused)
+_key_numbers = itertools.count(1)
+
+def client_key(ctx: Context) -> str:
+    """
+    The calling client's session key. A client that goes away without
+    close_application has its browser context released once its MCP session
+    is garbage-collected.
+    """
+    key = client_keys.get(ctx.session)
+    if key is None:
+        key = client_keys[ctx.session] = f"client-{next(_key_numbers)}"
+        weakref.finalize(ctx.session, lambda: threading.Thread(target=sessions.release, args=(key,), daemon=True).start())
+    return key
+
+async def session_cdp(ctx: Context) -> AsyncChromeCDP:
+    """
+    Returns the calling client's own browser session (created on first use).
+    Blocking CDP work runs off the event loop.
+    """
+    client = await asyncio.to_thread(sessions.acquire, client_key(ctx))
+    return AsyncChromeCDP(client)
+
+LOCATOR_HELP = """
+Element arguments (xpath, *_xpath, fields) take an XPath or a prefixed locator:
+css=<selector>, text=<text> (text="<exact text>"), role=<role>[name="<name>"],
+label=<label text>. //*[@id='...'] resolves through getElementById.
+xpath and *_xpath also take an element ref (e.g. e42) from find_element or
+get_interactive_elements; it stays valid until the page navigates.
+"""
+
+def locator_tool(fn):
+    """
+    Registers a tool whose element arguments accept every locator form.
+    """
+    return app.tool(description=inspect.cleandoc(fn.__doc__ or "") + "\n" + LOCATOR_HELP)(fn)
 
 def ok(**k): return {"status": "OK", **k}
-def err(code, msg): return {"status": "ERROR", "error_code": code, "message": msg}
+def err(code, msg, **k): return {"status": "ERROR", "error_code": code, "message": msg, **k}
+def timeout_info(e): return {"timeout": e.to_dict()} if isinstance(e, CDPTimeoutError) else {}
 
 # ---------------- Browser tools ----------------
 
 @app.tool()
-async def launch_application(url: str):
-    cdp.launch()
-    cdp.navigate(url)
+async def launch_application(ctx: Context, url: str):
+    cdp = await session_cdp(ctx)
+    await cdp.navigate(url)
     return ok()
 
 @app.tool()
-async def close_application():
-    cdp.close()
+async def close_application(ctx: Context):
+    await asyncio.to_thread(sessions.release, client_key(ctx))
     return ok()
 
 @app.tool()
-async def get_page_html():
-    return ok(html=cdp.get_html())
+async def get_session_stats():
+    """
+    Reports active sessions and browser pool health (hits, misses, time-to-ready).
+    """
+    return ok(**sessions.stats())
+
+@app.tool()
+async def get_page_html(ctx: Context):
+    cdp = await session_cdp(ctx)
+    return ok(html=await cdp.get_html())
 
 @app.tool()
-async def navigate(url: str):
+async def navigate(ctx: Context, url: str):
     """
     Navigate to a URL without closing the browser.
     """
+    cdp = await session_cdp(ctx)
     try:
-        cdp.navigate(url)
+        await cdp.navigate(url)
         return ok()
     except Exception as e:
         return err("NAVIGATION_FAILED", str(e))
@@ -40,73 +98,87 @@ async def navigate(url: str):
 
 # ---------------- Mouse and keyboard tools ----------------
 
-@app.tool()
-async def click(xpath: str):
+@locator_tool
+async def click(ctx: Context, xpath: str):
+    cdp = await session_cdp(ctx)
     try:
-        cdp.click(xpath)
+        await cdp.click(xpath)
         return ok()
-    except TimeoutError:
-        return err("ELEMENT_NOT_FOUND", xpath)
+    except TimeoutError as e:
+        return err("ELEMENT_NOT_FOUND", xpath, **timeout_info(e))
     except Exception as e:
         return err("CLICK_FAILED", str(e))
 
-@app.tool()
-async def type_into(xpath: str, value: str):
+@locator_tool
+async def type_into(ctx: Context, xpath: str, value: str, strategy: str = "auto"):
+    """
+    strategy: auto | insert (bulk text) | ime (composition, non-ASCII) | keys (per-key events)
+    """
+    cdp = await session_cdp(ctx)
     try:
-        cdp.fill(xpath, value)
+        await cdp.fill(xpath, value, strategy=strategy)
         return ok()
-    except TimeoutError:
-        return err("ELEMENT_NOT_FOUND", xpath)
+    except FillMismatchError as e:
+        return err("VALUE_MISMATCH", str(e), **e.to_dict())
+    except ValueError as e:
+        return err("INVALID_ARGUMENT", str(e))
+    except TimeoutError as e:
+        return err("ELEMENT_NOT_FOUND", xpath, **timeout_info(e))
 
-@app.tool()
-async def hover(xpath: str):
+@locator_tool
+async def hover(ctx: Context, xpath: str):
+    cdp = await session_cdp(ctx)
     try:
-        cdp.hover(xpath)
+        await cdp.hover(xpath)
         return ok()
-    except TimeoutError:
-        return err("ELEMENT_NOT_FOUND", xpath)
+    except TimeoutError as e:
+        return err("ELEMENT_NOT_FOUND", xpath, **timeout_info(e))
 
 @app.tool()
-async def press_key(key: str):
-    cdp.press_key(key)
+async def press_key(ctx: Context, key: str):
+    cdp = await session_cdp(ctx)
+    await cdp.press_key(key)
     return ok()
 
-@app.tool()
-async def send_keys(keys: str, xpath: str = None):
+@locator_tool
+async def send_keys(ctx: Context, keys: str, xpath: str = None):
     """
     Send special keys or shortcuts (e.g. 'Enter', 'Tab', 'Ctrl+A').
     If xpath is provided, focuses that element before sending.
     """
+    cdp = await session_cdp(ctx)
     try:
-        cdp.send_keys(keys, xpath)
+        await cdp.send_keys(keys, xpath)
         return {"status": "OK"}
     except Exception as e:
         return err("KEY_ERROR", str(e))
 
-@app.tool()
-async def double_click(xpath: str):
+@locator_tool
+async def double_click(ctx: Context, xpath: str):
     """
     Double-click an element. Useful for selecting text or special UI actions.
     """
+    cdp = await session_cdp(ctx)
     try:
-        cdp.double_click(xpath)
+        await cdp.double_click(xpath)
         return ok()
     except Exception as e:
         return err("DOUBLE_CLICK_FAILED", str(e))
 
-@app.tool()
-async def drag_and_drop(source_xpath: str, target_xpath: str):
+@locator_tool
+async def drag_and_drop(ctx: Context, source_xpath: str, target_xpath: str):
     """
     Drag an element from source_xpath and drop it at target_xpath.
     """
+    cdp = await session_cdp(ctx)
     try:
-        cdp.drag_and_drop(source_xpath, target_xpath)
+        await cdp.drag_and_drop(source_xpath, target_xpath)
         return ok()
     except Exception as e:
         return err("DRAG_FAILED", str(e))
 
-@app.tool()
-async def type_like_human(xpath: str, value: str):
+@locator_tool
+async def type_like_human(ctx: Context, xpath: str, value: str):
     """
     Types text character-by-character into the field.
     
@@ -115,85 +187,144 @@ async def type_like_human(xpath: str, value: str):
     - Use this for "Type-ahead" fields, appending text, or when 'type_into' fails.
     - If you need to clear the field first, use 'send_keys' with Ctrl+A -> Backspace.
     """
+    cdp = await session_cdp(ctx)
     try:
-        cdp.type_human(xpath, value)
+        await cdp.type_human(xpath, value)
         return ok()
     except Exception as e:
         return err("HUMAN_TYPE_FAILED", str(e))
 
+@app.tool()
+async def fill_form(ctx: Context, fields: dict[str, str | bool], timeout_ms: int = DEFAULT_TIMEOUT):
+    """
+    Fills a whole form in one call and reports the final value of every field.
+
+    Args:
+        fields: Field label / name / placeholder -> value, e.g.
+            {"Email": "a@b.c", "Country": "Germany", "Accept terms": true, "Plan": "Pro"}
+            Selects take the option text, checkboxes true/false, radio groups the option label.
+    """
+    cdp = await session_cdp(ctx)
+    try:
+        report = await cdp.fill_form(fields, timeout_ms=timeout_ms)
+    except Exception as e:
+        return err("FILL_FORM_FAILED", str(e), **timeout_info(e))
+    problems = [f["field"] for f in report if f["status"] != "OK"]
+    if problems:
+        return err("FORM_INCOMPLETE", f"Not filled as asked: {', '.join(problems)}", fields=report)
+    return ok(fields=report)
+
+# ---------------- Script tool ----------------
+
+@locator_tool
+async def run_actions(ctx: Context, actions: list[dict], stop_on_error: bool = True, timeout_ms: int = DEFAULT_TIMEOUT):
+    """
+    Runs several actions back to back in one call (e.g. fill user, fill password, click login).
+
+    Args:
+        actions: Ordered steps, each {"action": ..., "xpath": ..., "timeout_ms": (optional)}:
+            {"action": "click", "xpath": "..."}
+            {"action": "fill", "xpath": "...", "value": "..."}
+            {"action": "select", "xpath": "<select>", "label": "..."} (or "value" / "index")
+            {"action": "wait", "xpath": "..."} or {"action": "wait", "text": "..."}
+            {"action": "get_text", "xpath": "..."}
+        stop_on_error: Skip the remaining steps after the first failure.
+        timeout_ms: Per-step timeout for steps that do not set their own.
+    Returns per-step status, get_text results and elapsed_ms.
+    """
+    cdp = await session_cdp(ctx)
+    try:
+        steps = await cdp.run(run_script, cdp.cdp, actions, stop_on_error=stop_on_error, default_timeout_ms=timeout_ms)
+    except ValueError as e:
+        return err("INVALID_SCRIPT", str(e))
+    failed = next((s for s in steps if s["status"] == "ERROR"), None)
+    if failed:
+        return err("STEP_FAILED", f"Step {failed['step']} ({failed['action']}) failed: {failed['error']}", steps=steps)
+    return ok(steps=steps)
+
 # ---------------- Discovery tool ----------------
 
 @app.tool()
-async def find_element(fieldName: str):
+async def find_element(ctx: Context, fieldName: str):
     """
     Smart Search: Finds visible elements (buttons, inputs, links) where text/id/name 
-    matches the search query (fieldName).
+    matches the search query (fieldName). Candidates are ranked by match quality
+    (exact, prefix, words, fuzzy); each carries a score and a short ref (e.g. e42)
+    that element tools accept in place of the xpath.
     """
+    cdp = await session_cdp(ctx)
     try:
-        # Delegate the heavy lifting to the client
-        matches = cdp.find_elements_by_text(fieldName)
+        # Ranked in the page; only the best FIND_TOP_K come back
+        matches = await cdp.rank_elements(fieldName)
         
-        if len(matches) == 1:
-            return ok(xpath=matches[0]["xpath"])
-            
         if not matches:
             return err("NOT_FOUND", f"No visible element found matching '{fieldName}'")
+
+        if len(matches) == 1 or matches[0]["score"] - matches[1]["score"] >= FIND_CONFIDENT_MARGIN:
+            return ok(xpath=matches[0]["xpath"], ref=matches[0].get("ref"), score=matches[0]["score"])
             
         # Ambiguous Matches (Let LLM decide)
         return {
             "status": "NEEDS_LLM",
-            "message": f"Found {len(matches)} candidates for '{fieldName}'. Please select one.",
-            "candidates": matches[:10] 
+            "message": f"Found {len(matches)} close candidates for '{fieldName}' (best first). Please select one.",
+            "candidates": matches
         }
     except Exception as e:
         return err("SEARCH_FAILED", str(e))
 
 @app.tool()
-async def get_interactive_elements(tag_name: str = "button"):
+async def get_interactive_elements(ctx: Context, tag_name: str = "button"):
     """
     Discovery Tool: Returns a list of ALL visible elements of a specific type.
     tag_name options: 'button', 'input', 'a', 'select', 'textarea'
+    Each element has a ref (e.g. e42) that element tools accept in place of the xpath.
     """
+    cdp = await session_cdp(ctx)
     try:
         # Delegate to client
-        items = cdp.get_all_interactive_elements(tag_name)
+        items = await cdp.get_all_interactive_elements(tag_name)
         return ok(count=len(items), elements=items[:50])
     except Exception as e:
         return err("DISCOVERY_FAILED", str(e))
 
 # ---------------- Wait tools ----------------
-@app.tool()
-async def wait_for_element(xpath: str, timeout_ms: int = DEFAULT_TIMEOUT):
+@locator_tool
+async def wait_for_element(ctx: Context, xpath: str, timeout_ms: int = DEFAULT_TIMEOUT):
+    cdp = await session_cdp(ctx)
     try:
-        cdp.wait_for_element(xpath, timeout_ms)
+        await cdp.wait_for_element(xpath, timeout_ms)
         return ok()
     except TimeoutError as e:
-        return err("TIMEOUT", str(e))
+        return err("TIMEOUT", str(e), **timeout_info(e))
 
 @app.tool()
-async def wait_for_network_idle(timeout_ms: int = DEFAULT_TIMEOUT):
+async def wait_for_network_idle(ctx: Context, timeout_ms: int = DEFAULT_TIMEOUT):
+    cdp = await session_cdp(ctx)
     try:
-        cdp.wait_for_network_idle(timeout_ms)
+        await cdp.wait_for_network_idle(timeout_ms)
         return ok()
     except TimeoutError as e:
-        return err("TIMEOUT", str(e))
+        return err("TIMEOUT", str(e), **timeout_info(e))
     
 @app.tool()
-async def wait_for_text(text: str, timeout_ms: int = DEFAULT_TIMEOUT):
+async def wait_for_text(ctx: Context, text: str, timeout_ms: int = DEFAULT_TIMEOUT):
+    cdp = await session_cdp(ctx)
     try:
-        cdp.wait_for_text(text, timeout_ms)
+        await cdp.wait_for_text(text, timeout_ms)
         return {"status": "OK"}
     except TimeoutError as e:
         return {
             "status": "ERROR",
             "error_code": "TIMEOUT",
-            "message": str(e)
+            "message": str(e),
+            **timeout_info(e)
         }
 
-@app.tool()
-async def scroll_to_element(xpath: str):
+@locator_tool
+async def scroll_to_element(ctx: Context, xpath: str):
+    cdp = await session_cdp(ctx)
     try:
-        if cdp.scroll_into_view(xpath):
+        if await cdp.scroll_into_view(xpath):
             return {"status": "OK"}
         return {"status": "ERROR", "error_code": "NOT_FOUND"}
     except Exception as e:
@@ -201,13 +332,14 @@ async def scroll_to_element(xpath: str):
 
 
 @app.tool()
-async def screenshot(full_page: bool = True):
+async def screenshot(ctx: Context, full_page: bool = True):
     """
     Take a screenshot of the current page.
     Returns base64 PNG.
     """
+    cdp = await session_cdp(ctx)
     try:
-        img = cdp.screenshot(full_page=full_page)
+        img = await cdp.screenshot(full_page=full_page)
         return {
             "status": "OK",
             "image_base64": base64.b64encode(img).decode("utf-8")
@@ -220,30 +352,34 @@ async def screenshot(full_page: bool = True):
         }
 
 
-@app.tool()
-async def is_checked(xpath: str):
+@locator_tool
+async def is_checked(ctx: Context, xpath: str):
+    cdp = await session_cdp(ctx)
     return {
         "status": "OK",
-        "checked": cdp.is_checked(xpath)
+        "checked": await cdp.is_checked(xpath)
     }
 
-@app.tool()
-async def is_selected(xpath: str):
+@locator_tool
+async def is_selected(ctx: Context, xpath: str):
+    cdp = await session_cdp(ctx)
     return {
         "status": "OK",
-        "selected": cdp.is_selected(xpath)
+        "selected": await cdp.is_selected(xpath)
     }
 
 
-@app.tool()
+@locator_tool
 async def select_dropdown(
+    ctx: Context,
     xpath: str,
     value: str | None = None,
     label: str | None = None,
     index: int | None = None
 ):
+    cdp = await session_cdp(ctx)
     try:
-        cdp.select_option(xpath, value=value, label=label, index=index)
+        await cdp.select_option(xpath, value=value, label=label, index=index)
         return {"status": "OK"}
     except Exception as e:
         return {
@@ -252,10 +388,11 @@ async def select_dropdown(
             "message": str(e)
         }
 
-@app.tool()
-async def multi_select_dropdown(xpath: str, values: list[str]):
+@locator_tool
+async def multi_select_dropdown(ctx: Context, xpath: str, values: list[str]):
+    cdp = await session_cdp(ctx)
     try:
-        cdp.multi_select(xpath, values)
+        await cdp.multi_select(xpath, values)
         return {"status": "OK"}
     except Exception as e:
         return {
@@ -264,8 +401,8 @@ async def multi_select_dropdown(xpath: str, values: list[str]):
             "message": str(e)
         }
 
-@app.tool()
-async def select_custom_dropdown(trigger_xpath: str, option_text: str):
+@locator_tool
+async def select_custom_dropdown(ctx: Context, trigger_xpath: str, option_text: str):
     """
     Selects an item from a modern UI dropdown (React/Vue/Angular/MUI).
     Use this when standard 'select_dropdown' fails.
@@ -274,22 +411,24 @@ async def select_custom_dropdown(trigger_xpath: str, option_text: str):
         trigger_xpath: The XPath of the input/div you click to open the list.
         option_text: The visible text of the option you want to choose.
     """
+    cdp = await session_cdp(ctx)
     try:
-        cdp.select_custom_option(trigger_xpath, option_text)
+        await cdp.select_custom_option(trigger_xpath, option_text)
         return ok()
     except Exception as e:
         return err("CUSTOM_SELECT_FAILED", str(e))
     
-@app.tool()
-async def select_autocomplete(input_xpath: str, select_text: str):
+@locator_tool
+async def select_autocomplete(ctx: Context, input_xpath: str, select_text: str):
     """
     Selects from a 'Type-to-Filter' dropdown.
     1. Focuses the input (input_xpath).
     2. Types 'select_text' character by character.
     3. Clicks 'select_text' as soon as it appears in the list.
     """
+    cdp = await session_cdp(ctx)
     try:
-        cdp.select_autocomplete_option(input_xpath, select_text)
+        await cdp.select_autocomplete_option(input_xpath, select_text)
         return ok()
     except Exception as e:
         return err("AUTOCOMPLETE_FAILED", str(e))
@@ -297,7 +436,7 @@ async def select_autocomplete(input_xpath: str, select_text: str):
 # ---------------- Tab Management Tool ----------------
 
 @app.tool()
-async def switch_tab(keyword: str = None, new_tab: bool = False):
+async def switch_tab(ctx: Context, keyword: str = None, new_tab: bool = False):
     """
     Switches the browser focus to a different tab.
     
@@ -306,11 +445,12 @@ async def switch_tab(keyword: str = None, new_tab: bool = False):
         new_tab: (Optional) If True, switches to the NEWEST tab (index -1). 
                  Use this immediately after clicking a link that opens a new window.
     """
+    cdp = await session_cdp(ctx)
     try:
         if new_tab:
-            cdp.switch_to_tab(index=-1)
+            await cdp.switch_to_tab(index=-1)
         elif keyword:
-            cdp.switch_to_tab(keyword=keyword)
+            await cdp.switch_to_tab(keyword=keyword)
         else:
             return err("INVALID_ARGS", "Must provide either 'keyword' or 'new_tab=True'")
             
@@ -318,21 +458,65 @@ async def switch_tab(keyword: str = None, new_tab: bool = False):
     except Exception as e:
         return err("SWITCH_FAILED", str(e))
 
+@locator_tool
+async def extract_from_tabs(
+    ctx: Context,
+    urls: list[str],
+    fields: dict[str, str],
+    wait_xpath: str = None,
+    max_parallel: int = None,
+    timeout_ms: int = DEFAULT_TIMEOUT
+):
+    """
+    Opens one background tab per URL and reads the same fields from all of them in parallel.
+    The current tab is left untouched and the extra tabs are closed afterwards.
+
+    Args:
+        urls: Pages to visit (e.g. several product pages).
+        fields: Output name -> XPath of the element to read, e.g. {"price": "//span[@class='price']"}.
+        wait_xpath: (Optional) XPath to wait for on every page before reading.
+        max_parallel: (Optional) Max tabs loading/reading at the same time.
+    """
+    cdp = await session_cdp(ctx)
+    group = TabGroup(cdp.cdp, max_parallel=max_parallel)
+
+    def extract(tab, url):
+        if wait_xpath:
+            tab.wait_for_element(wait_xpath, timeout_ms=timeout_ms)
+        data = {}
+        for name, xpath in fields.items():
+            try:
+                data[name] = tab.get_text(xpath)
+            except Exception:
+                data[name] = None # Missing on this page; the other fields still count
+        return data
+
+    try:
+        await cdp.run(group.open, urls, timeout_ms=timeout_ms)
+        results = await cdp.run(group.run, extract, timeout_ms=timeout_ms)
+        return ok(count=len(results), results=results)
+    except Exception as e:
+        return err("TAB_GROUP_FAILED", str(e), **timeout_info(e))
+    finally:
+        await cdp.run(group.close)
+
 # ---------------- Extraction tools ----------------
-@app.tool()
-async def get_text(xpath: str):
+@locator_tool
+async def get_text(ctx: Context, xpath: str):
     """
     Get the visible text or value from any element (label, input, div, span, etc).
     Use this to read data from the screen.
     """
+    cdp = await session_cdp(ctx)
     try:
-        text = cdp.get_text(xpath)
+        text = await cdp.get_text(xpath)
         return ok(text=text)
     except Exception as e:
         return err("GET_TEXT_FAILED", str(e))
 
-@app.tool()
+@locator_tool
 async def get_table_data(
+    ctx: Context,
     table_xpath: str, 
     next_page_xpath: str = None, 
     max_pages: int = 0,
@@ -348,8 +532,9 @@ async def get_table_data(
         total_pages_xpath: (Optional) XPath to a label like "Page 1 of 10". 
                            Use this to automatically determine how many pages to scrape.
     """
+    cdp = await session_cdp(ctx)
     try:
-        data = cdp.scrape_table(table_xpath, next_page_xpath, max_pages, total_pages_xpath)
+        data = await cdp.scrape_table(table_xpath, next_page_xpath, max_pages, total_pages_xpath)
         return ok(count=len(data), data=data)
     except Exception as e:
         return err("TABLE_SCRAPE_FAILED", str(e))
\ No newline at end of file